@@ -1,104 +1,173 @@
 # JRA.py
 
-import random
+import inspect
+import multiprocessing
+import os
+import queue
+import time
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from .browser import Browser
-from .navigator import Navigator
-from ..parsers.parsers import Parsers
-from ..models.models import DataType, Month, Match, Race, Horse, Jockey, Trainer, OddsTan
-from ..config import BASE_URL
+from .crawler import FrontierCrawler, seed_month
+from .parallel import ParallelCrawler, open_navigator
+from .async_crawler import AsyncCrawler
+from .http_navigator import open_browser_navigator
+from .pool import BrowserPool
+from .refresh import RefreshCrawler
+from ..config import MAX_BROWSERS, WORKER_POLL_INTERVAL
 from ..storage.database import ChevalDB
+from ..storage.frontier import CrawlFrontier
+from ..utils.misc import year_month_to_code, year_month_range
 from ..utils.logging import get_logger
 
 
-def parse_JRA(year: int, month: int):
-    month_code = str(year).zfill(4)+str(month).zfill(2)
+def parse_JRA(year: int, month: int, number_workers: int = 1, use_http: bool = False, use_async: bool = False,
+              use_tabs: bool = False, pool: Optional[BrowserPool] = None, replay: bool = False) -> Dict[str, int]:
+    """
+    Crawl the data of a month through the crawl frontier, returns the navigation report of the month.
+    If an earlier crawl of the month was interrupted, it is continued from the next unfinished page.
+    If number_workers is more than 1, the matches of the month are shared by that many browsers in worker processes.
+    If use_http is True, the pages are fetched by HTTP and the doAction scripts are replayed as form POSTs,
+    the browser is only started for the search of the month and for the pages which can not be fetched by HTTP.
+    If use_async is True, the pages are fetched by HTTP in an asyncio event loop with many requests in flight at once.
+    If use_tabs is True, the browser opens every page in a new tab and closes it, instead of entering the page directly.
+    If a pool is given, the browser is borrowed from it and given back, instead of started and closed for this month.
+    If replay is True, the pages which are current in the archive of HTMLStorage are served from it, see ReplayNavigator,
+    and only the others are fetched, by HTTP or the browser as above, use_async and the pool are not used then.
+    """
+    month_code = year_month_to_code(year, month)
+    logger = get_logger(f"cheval.test.browser")
     db = ChevalDB()
-    if db.check_code(code=month_code, datetype=DataType.MONTH) is not None:
+    frontier = CrawlFrontier()
+    try:
+        seed_month(db, frontier, year, month)
+        if frontier.count_unfinished(month_code) == 0:
+            logger.info(f"Skip: {month_code}")
+        elif use_async and not replay:
+            AsyncCrawler(db=db, frontier=frontier).run(root_code=month_code)
+        elif number_workers > 1:
+            navigator_factory = partial(open_navigator, use_http=use_http, use_tabs=use_tabs, replay=replay)
+            ParallelCrawler(db=db, frontier=frontier, number_workers=number_workers, navigator_factory=navigator_factory).run(root_code=month_code)
+        elif (pool is not None) and not replay:
+            with pool.lease() as navigator:
+                FrontierCrawler(navigator=navigator, db=db, frontier=frontier).run(root_code=month_code)
+        else:
+            navigator = open_navigator(use_http=use_http, use_tabs=use_tabs, replay=replay)
+            try:
+                FrontierCrawler(navigator=navigator, db=db, frontier=frontier).run(root_code=month_code)
+            finally:
+                navigator.close()
+        return FrontierCrawler(navigator=None, db=db, frontier=frontier).navigation_report(month_code)
+    finally:
+        frontier.close()
         db.close()
-        return
-    browser = Browser()
-    navigator = Navigator(browser)
-    parsers = Parsers()
-    logger = get_logger(f"cheval.test.browser")
-    navigator.go_to_search_page()
-    navigator.search_by_year_month(year, month)
-    html_month = navigator.get_html()
-    parse_month_list = parsers.month.parse(html=html_month, entity_code=month_code)
-    the_month: Month = parse_month_list.entity
-    for cnla_match in parse_month_list.links[DataType.MATCH]:
-        if db.check_code(code=cnla_match.code, datetype=DataType.MATCH) is not None:
-            logger.info(f"Skip: {cnla_match}")
-            continue
-        html_match = navigator.get_match_html(cnla_match.action)
-        parse_result_match = parsers.match.parse(html=html_match, entity_code=cnla_match.code, entity_name=cnla_match.name)
-        the_match: Match = parse_result_match.entity
-        for i in range(len(parse_result_match.links[DataType.RACE])):
-            cnla_race = parse_result_match.links[DataType.RACE][i]
-            if db.check_code(code=cnla_race.code, datetype=DataType.RACE) is not None:
-                logger.info(f"Skip: {cnla_race}")
+
+def refresh_JRA(use_http: bool = False, use_tabs: bool = False) -> Dict[str, int]:
+    """
+    Re-fetch the stored horses, jockeys and trainers which are stale by the freshness policy, see storage.freshness.
+    Returns the report of the refresh.
+    """
+    db = ChevalDB()
+    frontier = CrawlFrontier()
+    navigator = open_navigator(use_http=use_http, use_tabs=use_tabs)
+    try:
+        report = RefreshCrawler(navigator=navigator, db=db, frontier=frontier).run()
+    finally:
+        navigator.close()
+        frontier.close()
+        db.close()
+    return report
+
+def _crawl_months(worker_index: int, month_crawler: Callable[..., Dict[str, int]], options: Dict[str, Any],
+                  month_queue, result_queue):
+    """Loop of a month worker: crawl the months sent by the main process with one warm browser, and send back their reports"""
+    logger = get_logger(f"cheval.browser.month_worker{worker_index}")
+    pool = None
+    if not (options.get("use_http") or options.get("use_async") or options.get("replay")):
+        pool = BrowserPool(size=1, navigator_factory=partial(open_browser_navigator, use_tabs=options.get("use_tabs", False)))
+    try:
+        while True:
+            year_month: Optional[Tuple[int, int]] = month_queue.get()
+            if year_month is None:
+                break
+            year, month = year_month
+            start = time.monotonic()
+            try:
+                report = month_crawler(year, month, pool=pool, **options)
+                result_queue.put((worker_index, year_month, report, time.monotonic() - start, None))
+            except Exception as e:
+                logger.exception(f"An exception in {inspect.currentframe().f_code.co_name} of worker {worker_index}!")
+                logger.exception(f"Information: year={year}, month={month}")
+                result_queue.put((worker_index, year_month, None, time.monotonic() - start, repr(e)))
+    finally:
+        if pool is not None:
+            pool.close()
+
+def parse_JRA_range(start_year: int, start_month: int, end_year: int, end_month: int,
+                    number_workers: Optional[int] = None, month_crawler: Callable[..., Dict[str, int]] = parse_JRA,
+                    **options) -> Dict[str, Any]:
+    """
+    Crawl the months from the start year and month to the end year and month (not included), see year_month_range.
+    The months are shared by worker processes, each crawls one month at a time with its own warm browser,
+    and the main process merges their reports into the progress and a summary of the throughput, which is returned.
+    The options are passed to parse_JRA (use_http, use_async, use_tabs, replay).
+    A month is done only when none of its tasks is left unfinished in the frontier, else it is counted as failed.
+    """
+    logger = get_logger("cheval.browser.range")
+    months = year_month_range(start_year, start_month, end_year, end_month)
+    if number_workers is None:
+        number_workers = os.cpu_count() or 1
+    number_workers = max(1, min(number_workers, MAX_BROWSERS, len(months) or 1))
+    context = multiprocessing.get_context()
+    month_queue = context.Queue()
+    result_queue = context.Queue()
+    for year_month in months:
+        month_queue.put(year_month)
+    for _ in range(number_workers):
+        month_queue.put(None)
+    # the tables of the frontier are created here, before the workers open it
+    frontier = CrawlFrontier()
+    workers = [context.Process(target=_crawl_months, args=(i, month_crawler, options, month_queue, result_queue), daemon=True)
+               for i in range(number_workers)]
+    start = time.monotonic()
+    for worker in workers:
+        worker.start()
+    logger.info(f"Crawl {len(months)} month(s) from {start_year}-{start_month:02d} to {end_year}-{end_month:02d} (not included) with {number_workers} worker(s)")
+    summary: Dict[str, Any] = {"months": len(months), "done": 0, "failed": [], "pages": 0, "page_loads": 0, "page_loads_saved": 0}
+    number_received = 0
+    try:
+        while number_received < len(months):
+            try:
+                worker_index, (year, month), report, seconds, error = result_queue.get(timeout=WORKER_POLL_INTERVAL)
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in workers):
+                    raise RuntimeError("All month workers have died")
                 continue
-            html_race = navigator.get_race_html(BASE_URL+cnla_race.link)
-            parse_result_race = parsers.race.parse(html=html_race, entity_code=cnla_race.code, entity_name=cnla_race.name, father_entity_code=cnla_match.code)
-            the_race: Race = parse_result_race.entity
-            for cnla_horse in parse_result_race.links[DataType.HORSE]:
-                if db.check_code(code=cnla_horse.code, datetype=DataType.HORSE) is not None:
-                    logger.info(f"Skip: {cnla_horse}")
-                    continue
-                html_horse = navigator.get_horse_html(BASE_URL+cnla_horse.link)
-                parse_result_horse = parsers.horse.parse(html=html_horse, entity_code=cnla_horse.code, entity_name=cnla_horse.name)
-                the_horse: Horse = parse_result_horse.entity
-                db.insert_horse(the_horse)
-                db.insert_horse_result_list(the_horse._result_list)
-                navigator.back()
-            for cnla_jockey in parse_result_race.links[DataType.JOCKEY]:
-                if db.check_code(code=cnla_jockey.code, datetype=DataType.JOCKEY) is not None:
-                    logger.info(f"Skip: {cnla_jockey}")
-                    continue
-                html_jockey = navigator.get_jockey_trainer_html(cnla_jockey.action)
-                parse_result_jockey = parsers.jockey.parse(html=html_jockey, entity_code=cnla_jockey.code, entity_name=cnla_jockey.name)
-                the_jockey: Jockey = parse_result_jockey.entity
-                cnla_jockey_summary = parse_result_jockey.links[DataType.JOCKEY_SUMMARY][0]
-                html_jockey_summary = navigator.get_jockey_trainer_html(cnla_jockey_summary.action)
-                parse_result_jockey_summary = parsers.joceky_summary.parse(html=html_jockey_summary, entity_code=cnla_jockey_summary.code, entity_name=cnla_jockey_summary.name, father_entity_code=cnla_jockey.code)
-                the_jockey._summary_past = parse_result_jockey_summary.history
-                db.insert_jockey(the_jockey)
-                db.insert_jockey_trainer_summary_list(the_jockey._summary_this_year)
-                db.insert_jockey_trainer_summary_list(the_jockey._summary_total)
-                db.insert_jockey_trainer_summary_list(the_jockey._summary_past)
-                navigator.back()
-                navigator.back()
-            for cnla_trainer in parse_result_race.links[DataType.TRAINER]:
-                if db.check_code(code=cnla_trainer.code, datetype=DataType.TRAINER) is not None:
-                    logger.info(f"Skip: {cnla_trainer}")
-                    continue
-                html_trainer = navigator.get_jockey_trainer_html(cnla_trainer.action)
-                parse_result_trainer = parsers.trainer.parse(html=html_trainer, entity_code=cnla_trainer.code, entity_name=cnla_trainer.name)
-                the_trainer: Trainer = parse_result_trainer.entity
-                cnla_trainer_summary = parse_result_trainer.links[DataType.TRAINER_SUMMARY][0]
-                html_trainer_summary = navigator.get_jockey_trainer_html(cnla_trainer_summary.action)
-                parse_result_trainer_summary = parsers.trainer_summary.parse(html=html_trainer_summary, entity_code=cnla_trainer_summary.code, entity_name=cnla_trainer_summary.name, father_entity_code=cnla_trainer.code)
-                the_trainer._summary_past = parse_result_trainer_summary.history
-                db.insert_trainer(the_trainer)
-                db.insert_jockey_trainer_summary_list(the_trainer._summary_this_year)
-                db.insert_jockey_trainer_summary_list(the_trainer._summary_total)
-                db.insert_jockey_trainer_summary_list(the_trainer._summary_past)
-                navigator.back()
-                navigator.back()
-            navigator.back()
-            cnla_odds_tan = parse_result_match.links[DataType.ODDS_TAN][i]
-            odds_tan_html = navigator.get_odds_tan_html(cnla_odds_tan.action)
-            parse_result_odds_tan = parsers.odds_tan.parse(html=odds_tan_html, entity_code=cnla_odds_tan.code, entity_name=cnla_race.name)
-            the_odds_tan: OddsTan = parse_result_odds_tan.entity
-            the_race.add_odds_tan(the_odds_tan)
-            db.insert_race(the_race)
-            db.insert_race_result_list(the_race._result_list)
-            db.insert_odds_tan(the_odds_tan)
-            navigator.back()
-        db.insert_match(the_match)
-        navigator.back()
-    db.insert_month(the_month)
-    navigator.back()
-    navigator.close()
-    db.close()
-    logger.info(f"Finish: {the_month.code}")
\ No newline at end of file
+            number_received += 1
+            month_code = year_month_to_code(year, month)
+            if error is None:
+                summary["pages"] += report["pages"]
+                summary["page_loads"] += report["page_loads"]
+                summary["page_loads_saved"] += report["page_loads_saved"]
+                number_unfinished = frontier.count_unfinished(month_code)
+                if number_unfinished > 0:
+                    error = f"{number_unfinished} task(s) unfinished, {report}"
+            if error is not None:
+                summary["failed"].append(month_code)
+                logger.error(f"Failed: {year}-{month:02d} by worker {worker_index}, error={error}")
+            else:
+                summary["done"] += 1
+                logger.info(f"Finish: {year}-{month:02d} by worker {worker_index} in {seconds:.0f}s, {report}")
+            elapsed = time.monotonic() - start
+            remaining = elapsed / number_received * (len(months) - number_received)
+            logger.info(f"Progress: {number_received}/{len(months)} month(s), {summary['pages']} page(s), "
+                        f"{summary['pages'] / elapsed:.2f} page(s)/s, about {remaining:.0f}s left")
+    finally:
+        frontier.close()
+        for worker in workers:
+            worker.join()
+    summary["seconds"] = time.monotonic() - start
+    summary["pages_per_second"] = summary["pages"] / summary["seconds"] if summary["seconds"] > 0 else 0.0
+    summary["months_per_hour"] = summary["done"] / summary["seconds"] * 3600 if summary["seconds"] > 0 else 0.0
+    logger.info(f"Summary: {summary}")
+    return summary
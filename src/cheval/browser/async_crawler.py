@@ -0,0 +1,170 @@
+# async_crawler.py
+
+import asyncio
+import inspect
+import time
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+import aiohttp
+
+from .navigator import Navigator
+from .fetcher import decode_html, RETRY_STATUS
+from .crawler import FrontierCrawler, ACTION_TYPES
+from .http_navigator import check_page, open_browser_navigator
+from ..parsers.base import ParseResult
+from ..models.models import DataType, FrontierTask
+from ..config import (BASE_URL, WAIT_TIMEOUT, MAX_ATTEMPTS, HTTP_RETRIES, HTTP_HEADERS, ACTION_FORM_FIELD,
+                      ASYNC_CONCURRENCY, ASYNC_PER_HOST, DIR_FOR_SAVE_HTML)
+from ..storage.database import ChevalDB
+from ..storage.frontier import CrawlFrontier
+from ..utils.misc import parse_doaction
+from ..utils.scheduler import PolitenessScheduler
+from ..utils.logging import get_logger
+
+class AsyncFetcher:
+    """
+    Fetch the pages of JRA with an aiohttp session, many requests are in flight at once.
+    The requests in flight are bounded by a global semaphore, and the connections to one host by the connector.
+    The starts of the requests are paced by the politeness scheduler.
+    """
+
+    def __init__(self, concurrency: int = ASYNC_CONCURRENCY, per_host: int = ASYNC_PER_HOST, retries: int = HTTP_RETRIES,
+                 time_out: int = WAIT_TIMEOUT, scheduler: Optional[PolitenessScheduler] = None,
+                 headers: Optional[Dict[str, str]] = None, base_url: str = BASE_URL):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.retries = retries
+        self.time_out = time_out
+        self.headers = HTTP_HEADERS if headers is None else headers
+        self.base_url = base_url
+        self.scheduler = scheduler if scheduler is not None else PolitenessScheduler()
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.logger = get_logger("cheval.browser.async_fetcher")
+
+    async def open(self):
+        """Open the session, it must be done inside the event loop"""
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host)
+        self.session = aiohttp.ClientSession(connector=connector, headers=self.headers,
+                                             timeout=aiohttp.ClientTimeout(total=self.time_out))
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def close(self):
+        """Close the session and its connections"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def request(self, method: str, url: str, data: Optional[Dict[str, str]] = None) -> str:
+        """Send a request and return the decoded html of the response, retried with backoff on errors of the server"""
+        for attempt in range(self.retries + 1):
+            start = None
+            try:
+                async with self.semaphore:
+                    await self.scheduler.wait_async()
+                    start = time.monotonic()
+                    async with self.session.request(method, url, data=data) as response:
+                        if (response.status in RETRY_STATUS) and (attempt < self.retries):
+                            raise aiohttp.ClientResponseError(response.request_info, response.history, status=response.status)
+                        response.raise_for_status()
+                        content = await response.read()
+                self.scheduler.record(time.monotonic() - start, ok=True)
+                return decode_html(content, response.headers.get("Content-Type"))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if start is not None:
+                    self.scheduler.record(time.monotonic() - start, ok=False)
+                retryable = (not isinstance(e, aiohttp.ClientResponseError)) or (e.status in RETRY_STATUS)
+                if retryable and (attempt < self.retries):
+                    await asyncio.sleep(2 ** attempt)
+                    continue
+                self.logger.exception(f"An exception in {inspect.currentframe().f_code.co_name} of {self.__class__}!")
+                self.logger.exception(f"Information: method={method}, url={url}, data={data}")
+                raise e
+
+    async def post_action(self, action: str) -> str:
+        """Send the form POST of a doAction script"""
+        path, cname = parse_doaction(action)
+        if path is None:
+            raise ValueError(f"Not a doAction script: {action}")
+        return await self.request("POST", self.base_url + path, data={ACTION_FORM_FIELD: cname})
+
+    async def fetch(self, task: FrontierTask) -> str:
+        """Get the html of the page of a task, the month is not fetched by HTTP"""
+        if task.thetype in ACTION_TYPES:
+            html = await self.post_action(task.action)
+        elif task.thetype in (DataType.RACE, DataType.HORSE):
+            html = await self.request("GET", self.base_url + task.link)
+        else:
+            raise ValueError(f"Can not fetch a page of {task.thetype} by HTTP")
+        if not check_page(html, task.thetype):
+            raise ValueError(f"Not a page of {task.thetype.value}: {task.code}")
+        return html
+
+class AsyncCrawler:
+    """
+    Drain the crawl frontier with an asyncio event loop: every ready task is fetched at once up to the concurrency,
+    and each page is parsed and stored as soon as its response arrives, by the same parsers and the same
+    check_code skips as FrontierCrawler. The search of a month needs a browser, which is run in a thread.
+    The parse and the save of a page are run in threads too, so the event loop keeps serving the responses meanwhile.
+    """
+
+    def __init__(self, db: ChevalDB, frontier: CrawlFrontier, fetcher: Optional[AsyncFetcher] = None,
+                 month_navigator_factory: Callable[[], Navigator] = open_browser_navigator, max_attempts: int = MAX_ATTEMPTS,
+                 root_dir_for_save: str = DIR_FOR_SAVE_HTML):
+        self.frontier = frontier
+        self.fetcher = fetcher if fetcher is not None else AsyncFetcher()
+        self.month_navigator_factory = month_navigator_factory
+        self.max_attempts = max_attempts
+        self.crawler = FrontierCrawler(navigator=None, db=db, frontier=frontier, max_attempts=max_attempts,
+                                       root_dir_for_save=root_dir_for_save)
+        self.logger = get_logger("cheval.browser.async_crawler")
+
+    def run(self, root_code: Optional[str] = None) -> int:
+        """Process the ready tasks until the frontier is drained, returns the number of pages done"""
+        return asyncio.run(self._run(root_code))
+
+    async def _run(self, root_code: Optional[str]) -> int:
+        self.frontier.reset(max_attempts=self.max_attempts, root_code=root_code)
+        await self.fetcher.open()
+        in_flight: Set[asyncio.Task] = set()
+        number_done = 0
+        try:
+            while True:
+                while len(in_flight) < self.fetcher.concurrency:
+                    task = self.frontier.claim(root_code)
+                    if task is None:
+                        break
+                    in_flight.add(asyncio.create_task(self._fetch_parse(task)))
+                if not in_flight:
+                    break
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    task, result, error = future.result()
+                    if error is not None:
+                        self.crawler.fail(task, error=error)
+                    # the saves are awaited one at a time, so the frontier and the database are used by one thread at once
+                    elif await asyncio.to_thread(self.crawler.save, task, result):
+                        number_done += 1
+            self.crawler.complete_months(root_code)
+        finally:
+            for future in in_flight:
+                future.cancel()
+            await self.fetcher.close()
+            self.crawler.flush()
+            if self.crawler.navigator is not None:
+                self.crawler.navigator.close()
+        self.logger.info(f"Frontier drained: {number_done} page(s) done, {self.frontier.count_by_state(root_code)}")
+        return number_done
+
+    async def _fetch_parse(self, task: FrontierTask) -> Tuple[FrontierTask, Optional[ParseResult[Any]], Optional[str]]:
+        try:
+            if task.thetype == DataType.MONTH:
+                if self.crawler.navigator is None:
+                    self.crawler.navigator = await asyncio.to_thread(self.month_navigator_factory)
+                html = await asyncio.to_thread(self.crawler.fetch, task)
+            else:
+                html = await self.fetcher.fetch(task)
+            return task, await asyncio.to_thread(self.crawler.parse, task, html), None
+        except Exception as e:
+            self.logger.exception(f"An exception in {inspect.currentframe().f_code.co_name} of {self.__class__}!")
+            return task, None, repr(e)
@@ -10,28 +10,62 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select
 from selenium.webdriver.support.ui import WebDriverWait
 
+from .readiness import ReadinessEngine, ActionTimings, READINESS, STALE_SCRIPT, TAB_ACTION_SCRIPT
+from ..models.models import DataType
+from ..config import BROWSER_LEAN, LEAN_ARGUMENTS, LEAN_PREFS, LEAN_BLOCKED_URLS
 from ..utils.waiter import Waiter
+from ..utils.scheduler import PolitenessScheduler
 from ..utils.logging import get_logger
 
-class Browser:
-    def __init__(self):
-        options = webdriver.ChromeOptions()
+# the actions which load a page
+PAGE_ACTIONS = ("get", "back", "open_window_by_action", "open_tab", "open_tab_by_action")
+
+def build_options(lean: bool = False) -> webdriver.ChromeOptions:
+    """Options of Chrome, the lean profile runs headless without extensions, GPU and images"""
+    options = webdriver.ChromeOptions()
+    options.add_argument("--log-level=3")
+    if lean:
+        for argument in LEAN_ARGUMENTS:
+            options.add_argument(argument)
+        options.add_experimental_option("prefs", LEAN_PREFS)
+    else:
         options.add_argument("--start-maximized")
-        options.add_argument("--log-level=3")
         #options.add_argument("--headless")
+    return options
+
+class Browser:
+    def __init__(self, scheduler: Optional[PolitenessScheduler] = None, lean: bool = BROWSER_LEAN):
+        """
+        The loads of pages are paced by the politeness scheduler, and the readiness of pages is polled for,
+        instead of sleeping after them. Sleeps by wait_time_before and wait_time_after are only done when they are given,
+        except the short waits after switching windows, finding elements and selecting values, which are kept.
+        With the lean profile, Chrome runs headless and the requests for stylesheets, images, fonts and analytics are blocked,
+        the scripts of the site are still run, so doAction works and page_source is the same.
+        """
+        options = build_options(lean)
         service = Service()
         self.driver = webdriver.Chrome(service=service, options=options)
+        if lean:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(LEAN_BLOCKED_URLS)})
+        self.scheduler = scheduler if scheduler is not None else PolitenessScheduler()
+        self.readiness = ReadinessEngine()
+        self.timings = ActionTimings()
         self.logger = get_logger("cheval.parsers.browser")
 
     def get(self, url: str, wait_time_before: Optional[int] = None, wait_time_after: Optional[int] = None):
         if wait_time_before is None:
             wait_time_before = int(0)
         if wait_time_after is None:
-            wait_time_after = Waiter.get_wait_time_medium()
+            wait_time_after = int(0)
         try:
+            start = time.monotonic()
             Waiter.wait(wait_time_before)
-            self.driver.get(url)
+            self.mark_stale()
+            with self.scheduler.request():
+                self.driver.get(url)
             Waiter.wait(wait_time_after)
+            self.timings.record("get", time.monotonic() - start)
         except Exception as e:
             self.logger.exception(f"An exception in {inspect.currentframe().f_code.co_name} of {self.__class__}!")
             self.logger.exception(f"Information: url={url}")
@@ -43,24 +77,69 @@ class Browser:
         if wait_time_before is None:
             wait_time_before = int(0)
         if wait_time_after is None:
-            wait_time_after = Waiter.get_wait_time_medium()
+            wait_time_after = int(0)
         try:
+            start = time.monotonic()
             Waiter.wait(wait_time_before)
             WebDriverWait(self.driver, timeout=time_out).until(lambda d: d.execute_script("return document.readyState") == "complete")
             Waiter.wait(wait_time_after)
+            self.timings.record("wait_for_load", time.monotonic() - start)
         except Exception as e:
             self.logger.exception(f"An exception in {inspect.currentframe().f_code.co_name} of {self.__class__}!")
             raise e
         
+    @property
+    def number_pages(self) -> int:
+        """the number of pages loaded by this browser"""
+        return sum(self.timings.count[action] for action in PAGE_ACTIONS)
+
+    def is_alive(self) -> bool:
+        """whether the session of the driver still answers"""
+        try:
+            self.driver.execute_script("return 1;")
+            return True
+        except Exception:
+            return False
+
+    def memory_mb(self) -> Optional[float]:
+        """the size of the JavaScript heap of the current page in MB, None if Chrome does not tell it"""
+        try:
+            size = self.driver.execute_script("return performance.memory ? performance.memory.usedJSHeapSize : null;")
+        except Exception:
+            return None
+        return None if size is None else size / 1024 / 1024
+
+    def mark_stale(self):
+        """Mark the current document, the readiness of the next page is only polled on a new document"""
+        try:
+            self.driver.execute_script(STALE_SCRIPT)
+        except Exception:
+            self.logger.warning(f"Can not mark the document in {inspect.currentframe().f_code.co_name} of {self.__class__}")
+
+    def wait_until_ready(self, data_type: DataType, time_out: Optional[int] = None, wait_time_after: Optional[int] = None):
+        """Return as soon as the page of the type is usable, by the readiness conditions of the type"""
+        if wait_time_after is None:
+            wait_time_after = int(0)
+        try:
+            elapsed = self.readiness.wait(self.driver, READINESS[data_type], time_out=time_out)
+            self.timings.record(f"ready {data_type.value}", elapsed)
+            Waiter.wait(wait_time_after)
+        except Exception as e:
+            self.logger.exception(f"An exception in {inspect.currentframe().f_code.co_name} of {self.__class__}!")
+            self.logger.exception(f"Information: data_type={data_type}")
+            raise e
+
     def switch_to_window(self, window_index: int, wait_time_before: Optional[int] = None, wait_time_after: Optional[int] = None):
         if wait_time_before is None:
             wait_time_before = int(0)
         if wait_time_after is None:
             wait_time_after = Waiter.get_wait_time_short()
         try:
+            start = time.monotonic()
             Waiter.wait(wait_time_before)
             self.driver.switch_to.window(self.driver.window_handles[window_index])
             Waiter.wait(wait_time_after)
+            self.timings.record("switch_to_window", time.monotonic() - start)
         except Exception as e:
             self.logger.exception(f"An exception in {inspect.currentframe().f_code.co_name} of {self.__class__}!")
             self.logger.exception(f"Information: window_index={window_index}")
@@ -70,11 +149,15 @@ class Browser:
         if wait_time_before is None:
             wait_time_before = int(0)
         if wait_time_after is None:
-            wait_time_after = Waiter.get_wait_time_medium()
+            wait_time_after = int(0)
         try:
+            start = time.monotonic()
             Waiter.wait(wait_time_before)
-            self.driver.back()
+            self.mark_stale()
+            with self.scheduler.request():
+                self.driver.back()
             Waiter.wait(wait_time_after)
+            self.timings.record("back", time.monotonic() - start)
         except Exception as e:
             self.logger.exception(f"An exception in {inspect.currentframe().f_code.co_name} of {self.__class__}!")
             raise e
@@ -83,8 +166,9 @@ class Browser:
         if wait_time_before is None:
             wait_time_before = int(0)
         if wait_time_after is None:
-            wait_time_after = Waiter.get_wait_time_long()
+            wait_time_after = int(0)
         Waiter.wait(wait_time_before)
+        self.logger.info(f"Timings of actions: {self.timings.summary()}")
         self.driver.quit()
         Waiter.wait(wait_time_after)
 
@@ -97,12 +181,16 @@ class Browser:
         if wait_time_before is None:
             wait_time_before = int(0)
         if wait_time_after is None:
-            wait_time_after = Waiter.get_wait_time_medium()
+            wait_time_after = int(0)
         try:
+            start = time.monotonic()
             element = WebDriverWait(self.driver, timeout=time_out).until(EC.presence_of_element_located((by, detail)))
             Waiter.wait(wait_time_before)
-            element.click()
+            self.mark_stale()
+            with self.scheduler.request():
+                element.click()
             Waiter.wait(wait_time_after)
+            self.timings.record("click", time.monotonic() - start)
         except Exception as e:
             self.logger.exception(f"An exception in {inspect.currentframe().f_code.co_name} of {self.__class__}!")
             self.logger.exception(f"Information: by={by}, detail={detail}")
@@ -117,9 +205,11 @@ class Browser:
         if wait_time_after is None:
             wait_time_after = Waiter.get_wait_time_short()
         try:
+            start = time.monotonic()
             Waiter.wait(wait_time_before)
             element = WebDriverWait(self.driver, time_out).until(EC.presence_of_element_located((by, detail)))
             Waiter.wait(wait_time_after)
+            self.timings.record("find_one_element", time.monotonic() - start)
         except Exception as e:
             self.logger.exception(f"An exception in {inspect.currentframe().f_code.co_name} of {self.__class__}!")
             self.logger.exception(f"Information: by={by}, detail={detail}")
@@ -139,6 +229,7 @@ class Browser:
         start_time = time.time()
         until_time_out = True
         try:
+            start = time.monotonic()
             while time.time() - start_time < time_out:
                 current_count = len(self.driver.find_elements(by, detail))
                 if current_count == last_count:
@@ -151,6 +242,7 @@ class Browser:
             Waiter.wait(wait_time_before)
             elements = self.driver.find_elements(by, detail)
             Waiter.wait(wait_time_after)
+            self.timings.record("find_all_elements", time.monotonic() - start)
         except Exception as e:
             self.logger.exception(f"An exception in {inspect.currentframe().f_code.co_name} of {self.__class__}!")
             self.logger.exception(f"Information: by={by}, detail={detail}")
@@ -165,10 +257,12 @@ class Browser:
         if wait_time_after is None:
             wait_time_after = Waiter.get_wait_time_short()
         try:
+            start = time.monotonic()
             Waiter.wait(wait_time_before)
             element = Select(self.driver.find_element(by, detail))
             element.select_by_value(value)
             Waiter.wait(wait_time_after)
+            self.timings.record("select_value", time.monotonic() - start)
         except Exception as e:
             self.logger.exception(f"An exception in {inspect.currentframe().f_code.co_name} of {self.__class__}!")
             self.logger.exception(f"Information: by={by}, detail={detail}, value={value}")
@@ -178,25 +272,76 @@ class Browser:
         if wait_time_before is None:
             wait_time_before = int(0)
         if wait_time_after is None:
-            wait_time_after = Waiter.get_wait_time_medium()
+            wait_time_after = int(0)
         try:
+            start = time.monotonic()
             Waiter.wait(wait_time_before)
-            self.driver.execute_script(action)
+            self.mark_stale()
+            with self.scheduler.request():
+                self.driver.execute_script(action)
             Waiter.wait(wait_time_after)
+            self.timings.record("open_window_by_action", time.monotonic() - start)
         except Exception as e:
             self.logger.exception(f"An exception in {inspect.currentframe().f_code.co_name} of {self.__class__}!")
             self.logger.exception(f"Information: script={action}")
             raise e
         
+    def open_tab(self, url: str, time_out: Optional[int] = None):
+        """Open a url in a new tab and switch to it, the current tab is kept as it is"""
+        if time_out is None:
+            time_out = Waiter.TIME_OUT
+        try:
+            start = time.monotonic()
+            self.driver.switch_to.new_window("tab")
+            with self.scheduler.request():
+                self.driver.get(url)
+            self.timings.record("open_tab", time.monotonic() - start)
+        except Exception as e:
+            self.logger.exception(f"An exception in {inspect.currentframe().f_code.co_name} of {self.__class__}!")
+            self.logger.exception(f"Information: url={url}")
+            raise e
+
+    def open_tab_by_action(self, action, time_out: Optional[int] = None):
+        """Run a doAction script with its form submitted into a new tab and switch to it, the current tab is kept as it is"""
+        if time_out is None:
+            time_out = Waiter.TIME_OUT
+        try:
+            start = time.monotonic()
+            handles = set(self.driver.window_handles)
+            with self.scheduler.request():
+                self.driver.execute_script(TAB_ACTION_SCRIPT % action)
+                WebDriverWait(self.driver, timeout=time_out).until(lambda d: len(d.window_handles) > len(handles))
+            new_handle = next(handle for handle in self.driver.window_handles if handle not in handles)
+            self.driver.switch_to.window(new_handle)
+            self.timings.record("open_tab_by_action", time.monotonic() - start)
+        except Exception as e:
+            self.logger.exception(f"An exception in {inspect.currentframe().f_code.co_name} of {self.__class__}!")
+            self.logger.exception(f"Information: script={action}")
+            raise e
+
+    def close_tab(self, window_index: int = 0):
+        """Close the current tab and switch back to the tab of the index, the first tab by default"""
+        try:
+            start = time.monotonic()
+            self.driver.close()
+            self.driver.switch_to.window(self.driver.window_handles[window_index])
+            self.timings.record("close_tab", time.monotonic() - start)
+        except Exception as e:
+            self.logger.exception(f"An exception in {inspect.currentframe().f_code.co_name} of {self.__class__}!")
+            raise e
+
     def execute_script(self, script, *args, wait_time_before: Optional[int] = None, wait_time_after: Optional[int] = None):
         if wait_time_before is None:
             wait_time_before = int(0)
         if wait_time_after is None:
-            wait_time_after = Waiter.get_wait_time_medium()
+            wait_time_after = int(0)
         try:
+            start = time.monotonic()
             Waiter.wait(wait_time_before)
-            self.driver.execute_script(script, args)
+            with self.scheduler.request():
+                self.driver.execute_script(script, args)
             Waiter.wait(wait_time_after)
+            self.timings.record("execute_script", time.monotonic() - start)
         except Exception as e:
             self.logger.exception(f"An exception in {inspect.currentframe().f_code.co_name} of {self.__class__}!")
             self.logger.exception(f"Information: script={script}, args={args}")
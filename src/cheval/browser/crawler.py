@@ -0,0 +1,254 @@
+# crawler.py
+
+import inspect
+from typing import Any, Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from .navigator import Navigator
+from ..parsers.parsers import Parsers
+from ..parsers.base import ParseResult
+from ..models.models import DataType, CodeNameLinkAction, FrontierTask, TaskState, Month
+from ..config import BASE_URL, MAX_ATTEMPTS, DIR_FOR_SAVE_HTML
+from ..storage.database import ChevalDB
+from ..storage.frontier import CrawlFrontier
+from ..storage.code_index import CodeIndex
+from ..utils.misc import year_month_to_code, code_to_year_month
+from ..utils.logging import get_logger
+
+# pages opened by running a doAction script, which needs a page of JRA loaded in the browser
+ACTION_TYPES = (DataType.MATCH, DataType.JOCKEY, DataType.JOCKEY_SUMMARY, DataType.TRAINER, DataType.TRAINER_SUMMARY, DataType.ODDS_TAN)
+
+# the back() calls of the nested crawl after it loaded a page of each type, each reloads the page before it:
+# one after every page, a jockey or trainer went back from its summary and then from its own page
+NESTED_BACKS = {DataType.MONTH: 1, DataType.MATCH: 1, DataType.RACE: 1, DataType.ODDS_TAN: 1, DataType.HORSE: 1,
+                DataType.JOCKEY: 1, DataType.JOCKEY_SUMMARY: 1, DataType.TRAINER: 1, DataType.TRAINER_SUMMARY: 1}
+
+def seed_month(db: ChevalDB, frontier: CrawlFrontier, year: int, month: int) -> FrontierTask:
+    """Add the page of a month to the frontier, the month is skipped if it is already in the database"""
+    month_code = year_month_to_code(year, month)
+    task = frontier.get_task(DataType.MONTH, month_code, month_code)
+    if task is not None:
+        return task
+    skipped = db.check_code(code=month_code, datetype=DataType.MONTH) is not None
+    cnla = CodeNameLinkAction(thetype=DataType.MONTH, code=month_code, name=month_code)
+    return frontier.push(cnla, root_code=month_code, skipped=skipped)
+
+class FrontierCrawler:
+    """
+    Drain the crawl frontier. Every task is one page: fetch it, parse it, store the entity and push the links found on it.
+    The pages are reached directly by their links or doAction scripts, so no page is loaded twice.
+    """
+
+    def __init__(self, navigator: Navigator, db: ChevalDB, frontier: CrawlFrontier, parsers: Optional[Parsers] = None,
+                 max_attempts: int = MAX_ATTEMPTS, code_index: Optional[CodeIndex] = None, root_dir_for_save: str = DIR_FOR_SAVE_HTML):
+        self.navigator = navigator
+        self.db = db
+        self.frontier = frontier
+        self.parsers = parsers if parsers is not None else Parsers()
+        self.max_attempts = max_attempts
+        self._code_index = code_index
+        self.root_dir_for_save = root_dir_for_save
+        self.logger = get_logger("cheval.browser.crawler")
+        self._on_site = False
+
+    @property
+    def code_index(self) -> CodeIndex:
+        """the index of recorded codes, loaded from the database when it is first used"""
+        if self._code_index is None:
+            self._code_index = CodeIndex(self.db)
+        return self._code_index
+
+    def flush(self):
+        """Write the counted hits of the codes to the database, and the queued pages to the archive"""
+        if self._code_index is not None:
+            self._code_index.flush()
+        self.parsers.flush()
+
+    def run(self, root_code: Optional[str] = None) -> int:
+        """Process the ready tasks until the frontier is drained, returns the number of pages done"""
+        self.frontier.reset(max_attempts=self.max_attempts, root_code=root_code)
+        number_done = 0
+        while True:
+            task = self.frontier.claim(root_code)
+            if task is None:
+                break
+            if self.process(task):
+                number_done += 1
+        self.complete_months(root_code)
+        self.flush()
+        self.logger.info(f"Frontier drained: {number_done} page(s) done, {self.frontier.count_by_state(root_code)}")
+        return number_done
+
+    def process(self, task: FrontierTask) -> bool:
+        """Fetch, parse and store the page of a task, returns whether the task is done"""
+        try:
+            html = self.fetch(task)
+            result = self.parse(task, html)
+        except Exception as e:
+            self.logger.exception(f"An exception in {inspect.currentframe().f_code.co_name} of {self.__class__}!")
+            self.fail(task, error=repr(e))
+            return False
+        return self.save(task, result)
+
+    def save(self, task: FrontierTask, result: ParseResult[Any]) -> bool:
+        """Store the parse result of a task and mark the task as done, returns whether the task is done"""
+        try:
+            self.store(task, result)
+        except Exception as e:
+            self.logger.exception(f"An exception in {inspect.currentframe().f_code.co_name} of {self.__class__}!")
+            self.fail(task, error=repr(e))
+            return False
+        self.frontier.finish(task)
+        return True
+
+    def fail(self, task: FrontierTask, error: str):
+        """Mark a task as failed"""
+        self.logger.error(f"Failed: task={task}, error={error}")
+        self.frontier.fail(task, error=error)
+
+    def fetch(self, task: FrontierTask) -> str:
+        """Open the page of a task and get its html"""
+        if (task.thetype in ACTION_TYPES) and (not self._on_site):
+            self.navigator.go_to_search_page()
+            self._on_site = True
+        match task.thetype:
+            case DataType.MONTH:
+                year, month = code_to_year_month(task.code)
+                self.navigator.go_to_search_page()
+                self.navigator.search_by_year_month(year, month)
+                self._on_site = True
+                return self.navigator.get_html()
+            case DataType.MATCH:
+                return self.navigator.get_match_html(task.action)
+            case DataType.RACE:
+                return self.navigator.get_race_html(BASE_URL + task.link)
+            case DataType.HORSE:
+                return self.navigator.get_horse_html(BASE_URL + task.link)
+            case DataType.JOCKEY | DataType.JOCKEY_SUMMARY | DataType.TRAINER | DataType.TRAINER_SUMMARY:
+                return self.navigator.get_jockey_trainer_html(task.action)
+            case DataType.ODDS_TAN:
+                return self.navigator.get_odds_tan_html(task.action)
+            case _:
+                raise ValueError(f"Unknown type of page in the frontier: {task.thetype}")
+
+    def parse(self, task: FrontierTask, html: str) -> ParseResult[Any]:
+        """Parse the html of a task by the parser of its type, the html is archived unless it was replayed from the archive"""
+        parser = self.parsers.by_type(task.thetype)
+        replayed = getattr(self.navigator, "replayed", False)
+        return parser.parse(html=html, entity_code=task.code, entity_name=task.name, father_entity_code=task.parent_code,
+                            save_html=not replayed, root_dir_for_save=self.root_dir_for_save)
+
+    def store(self, task: FrontierTask, result: ParseResult[Any]):
+        """Save the entity of a task into the database and push the links found on its page"""
+        stored = (task.attempts > 1) and self._is_stored(task)
+        if stored:
+            # an interrupted crawl may have stored the entity but not marked the task as done
+            self.logger.info(f"Already stored: {task.thetype.value} {task.code}")
+        else:
+            try:
+                self._insert(task, result)
+            except IntegrityError:
+                # another crawl process has stored the entity since the index was loaded
+                self.logger.info(f"Stored by another crawl: {task.thetype.value} {task.code}")
+                stored = True
+            if task.thetype not in (DataType.MONTH, DataType.JOCKEY_SUMMARY, DataType.TRAINER_SUMMARY):
+                self.code_index.add(task.code, task.thetype)
+        match task.thetype:
+            case DataType.MONTH:
+                for cnla_match in result.links[DataType.MATCH]:
+                    self.push(cnla_match, task)
+            case DataType.MATCH:
+                for cnla_race, cnla_odds_tan in zip(result.links[DataType.RACE], result.links[DataType.ODDS_TAN]):
+                    race_task = self.push(cnla_race, task)
+                    # the odds are written into the results of the race, so they wait until the race is done
+                    self.push(cnla_odds_tan, race_task, check=False)
+            case DataType.RACE:
+                for data_type in (DataType.HORSE, DataType.JOCKEY, DataType.TRAINER):
+                    self.code_index.confirm((cnla.code for cnla in result.links[data_type]), data_type)
+                    for cnla in result.links[data_type]:
+                        self.push(cnla, task)
+            # the summary of an entity stored before was stored with it
+            case DataType.JOCKEY:
+                self.push(result.links[DataType.JOCKEY_SUMMARY][0], task, check=False, skipped=stored)
+            case DataType.TRAINER:
+                self.push(result.links[DataType.TRAINER_SUMMARY][0], task, check=False, skipped=stored)
+
+    def _insert(self, task: FrontierTask, result: ParseResult[Any]):
+        match task.thetype:
+            case DataType.MATCH:
+                self.db.insert_match(result.entity)
+            case DataType.RACE:
+                self.db.insert_race(result.entity)
+                self.db.insert_race_result_list(result.entity._result_list)
+            case DataType.ODDS_TAN:
+                self.db.update_odds_tan(race_code=task.parent_code, theoddstan=result.entity)
+                self.db.insert_odds_tan(result.entity)
+            case DataType.HORSE:
+                self.db.insert_horse(result.entity)
+                self.db.insert_horse_result_list(result.entity._result_list)
+            case DataType.JOCKEY:
+                self.db.insert_jockey(result.entity)
+                self.db.insert_jockey_trainer_summary_list(result.entity._summary_this_year)
+                self.db.insert_jockey_trainer_summary_list(result.entity._summary_total)
+            case DataType.TRAINER:
+                self.db.insert_trainer(result.entity)
+                self.db.insert_jockey_trainer_summary_list(result.entity._summary_this_year)
+                self.db.insert_jockey_trainer_summary_list(result.entity._summary_total)
+            case DataType.JOCKEY_SUMMARY | DataType.TRAINER_SUMMARY:
+                self.db.insert_jockey_trainer_summary_list(result.history)
+
+    def _is_stored(self, task: FrontierTask) -> bool:
+        if task.thetype == DataType.MONTH:
+            # months are stored when the whole month is finished
+            return False
+        if task.thetype in (DataType.JOCKEY_SUMMARY, DataType.TRAINER_SUMMARY):
+            # summaries have no code recorded, their history is looked for
+            return self.db.exists_summary(task.code)
+        return self.code_index.contains(task.code, task.thetype)
+
+    def push(self, cnla: CodeNameLinkAction, parent: FrontierTask, check: bool = True, skipped: bool = False) -> FrontierTask:
+        """
+        Push a link found on the page of the parent into the frontier of its month,
+        the link is skipped if its entity is already in the database, or if skipped is True
+        """
+        task = self.frontier.get_task(cnla.thetype, cnla.code, parent.root_code)
+        if task is not None:
+            return task
+        skipped = skipped or (check and self.code_index.check(cnla.code, cnla.thetype))
+        if skipped:
+            self.logger.info(f"Skip: {cnla}")
+        return self.frontier.push(cnla, root_code=parent.root_code, parent=parent, skipped=skipped)
+
+    def complete_months(self, root_code: Optional[str] = None):
+        """Insert the months of a drained frontier into the database, checked once at the end of a run"""
+        if root_code is not None:
+            self.complete_month(root_code)
+            return
+        for month_task in self.frontier.get_tasks([TaskState.DONE], thetype=DataType.MONTH):
+            self.complete_month(month_task.code)
+
+    def complete_month(self, month_code: Optional[str]):
+        """Insert the month into the database once all of its pages are done"""
+        if (month_code is None) or (self.frontier.count_unfinished(month_code) > 0):
+            return
+        month_task = self.frontier.get_task(DataType.MONTH, month_code, month_code)
+        if (month_task is None) or (month_task.state != TaskState.DONE):
+            return
+        if self.db.get_month_by_code(month_code) is not None:
+            return
+        number_matches = len(self.frontier.get_children(month_task, DataType.MATCH))
+        self.db.insert_month(Month(code=month_code, number_races=number_matches))
+        self.code_index.add(month_code, DataType.MONTH)
+        self.logger.info(f"Finish: {month_code}, navigation: {self.navigation_report(month_code)}")
+
+    def navigation_report(self, month_code: str) -> Dict[str, int]:
+        """
+        Count the pages done of a month and the page loads spent on them, one load per attempt of a task,
+        against the loads of the nested crawl for the same pages: the load of every page and its back() calls, see NESTED_BACKS.
+        """
+        done = self.frontier.count_by_type(month_code)
+        pages = sum(done.values())
+        loads = self.frontier.count_attempts(month_code)
+        nested_loads = sum(count * (1 + NESTED_BACKS[thetype]) for thetype, count in done.items())
+        return {"pages": pages, "page_loads": loads, "nested_page_loads": nested_loads, "page_loads_saved": nested_loads - loads}
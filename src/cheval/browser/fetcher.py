@@ -0,0 +1,120 @@
+# fetcher.py
+
+import inspect
+import re
+import time
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ..config import BASE_URL, WAIT_TIMEOUT, HTTP_POOL_SIZE, HTTP_RETRIES, HTTP_HEADERS, ACTION_FORM_FIELD
+from ..utils.misc import parse_doaction
+from ..utils.scheduler import PolitenessScheduler
+from ..utils.logging import get_logger
+
+# JRA serves its pages in Shift_JIS, cp932 is the superset used by Windows and also decodes ①, ㈱ and so on
+SHIFT_JIS_NAMES = ("shift_jis", "shift-jis", "sjis", "x-sjis", "ms_kanji", "windows-31j", "cp932")
+DEFAULT_ENCODING = "cp932"
+# the statuses of a busy or failing server, the request is tried again
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+def find_charset(content_type: Optional[str], content: bytes) -> Optional[str]:
+    """find the charset declared in the Content-Type header, or else in the meta tag of the html"""
+    if content_type:
+        match = re.search(r"charset=[\"']?([\w.:-]+)", content_type, re.IGNORECASE)
+        if match:
+            return match.group(1)
+    match = re.search(rb"<meta[^>]+charset=[\"']?([\w.:-]+)", content[:4096], re.IGNORECASE)
+    if match:
+        return match.group(1).decode("ascii")
+    return None
+
+def decode_html(content: bytes, content_type: Optional[str] = None) -> str:
+    """decode the bytes of a page of JRA to a string"""
+    charset = find_charset(content_type, content)
+    if (charset is None) or (charset.lower() in SHIFT_JIS_NAMES):
+        charset = DEFAULT_ENCODING
+    try:
+        return content.decode(charset, errors="replace")
+    except LookupError:
+        return content.decode(DEFAULT_ENCODING, errors="replace")
+
+class HTTPFetcher:
+    """
+    Fetch the pages of JRA over a pooled requests.Session.
+    The connections are kept alive and reused, so a page costs one HTTP round trip instead of a browser render,
+    and the requests are paced by the politeness scheduler.
+    Plain GET pages (races and horses) are fetched by their links, and the pages opened by doAction scripts
+    (matches, jockeys, trainers, their summaries and odds) by the form POST which the script would submit.
+    The get_*_html methods can be used in place of those of Navigator.
+    Only the failed connections are retried inside the session, the responses of a busy server are retried by request,
+    so every attempt waits for its own turn of the scheduler and is recorded by it.
+    """
+
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE, retries: int = HTTP_RETRIES, time_out: int = WAIT_TIMEOUT,
+                 scheduler: Optional[PolitenessScheduler] = None, headers: Optional[Dict[str, str]] = None, base_url: str = BASE_URL):
+        self.base_url = base_url
+        self.retries = retries
+        self.session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=1, status_forcelist=())
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(HTTP_HEADERS if headers is None else headers)
+        self.time_out = time_out
+        self.scheduler = scheduler if scheduler is not None else PolitenessScheduler()
+        self.logger = get_logger("cheval.browser.fetcher")
+
+    def request(self, method: str, url: str, data: Optional[Dict[str, str]] = None) -> str:
+        """Send a request and return the decoded html of the response, retried with backoff on errors of the server"""
+        for attempt in range(self.retries + 1):
+            try:
+                with self.scheduler.request():
+                    response = self.session.request(method, url, data=data, timeout=self.time_out)
+                    response.raise_for_status()
+                return decode_html(response.content, response.headers.get("Content-Type"))
+            except Exception as e:
+                retryable = isinstance(e, requests.HTTPError) and (e.response.status_code in RETRY_STATUS)
+                if retryable and (attempt < self.retries):
+                    time.sleep(2 ** attempt)
+                    continue
+                self.logger.exception(f"An exception in {inspect.currentframe().f_code.co_name} of {self.__class__}!")
+                self.logger.exception(f"Information: method={method}, url={url}, data={data}")
+                raise e
+
+    def get(self, url: str) -> str:
+        """Get the html of a url"""
+        return self.request("GET", url)
+
+    def post_action(self, action: str) -> str:
+        """Send the form POST of a doAction script, example: doAction('/JRADB/accessK.html', 'pw04kmk001122/66')"""
+        path, cname = parse_doaction(action)
+        if path is None:
+            raise ValueError(f"Not a doAction script: {action}")
+        return self.request("POST", self.base_url + path, data={ACTION_FORM_FIELD: cname})
+
+    def get_match_html(self, action: str) -> str:
+        """Get the html of a match"""
+        return self.post_action(action)
+
+    def get_jockey_trainer_html(self, action: str) -> str:
+        """Get the html of a jockey or trainer or his/her summary"""
+        return self.post_action(action)
+
+    def get_odds_tan_html(self, action: str) -> str:
+        """Get the html of a odds tan (単勝オッズ)"""
+        return self.post_action(action)
+
+    def get_race_html(self, link: str) -> str:
+        """Get the html of a race"""
+        return self.get(link)
+
+    def get_horse_html(self, link: str) -> str:
+        """Get the html of a horse"""
+        return self.get(link)
+
+    def close(self):
+        """Close the session and its connections"""
+        self.session.close()
@@ -0,0 +1,130 @@
+# http_navigator.py
+
+import re
+from typing import Callable, Dict, Optional
+
+from .browser import Browser
+from .navigator import Navigator
+from .fetcher import HTTPFetcher
+from ..models.models import DataType
+from ..utils.logging import get_logger
+
+# a text which every real page of the type contains, an error page or an expired session page does not
+PAGE_MARKERS: Dict[DataType, re.Pattern] = {
+    DataType.MONTH: re.compile(r"past_result_line_unit"),
+    DataType.MATCH: re.compile(r"race_num"),
+    DataType.RACE: re.compile(r"race_header"),
+    DataType.HORSE: re.compile(r"競走馬情報"),
+    DataType.JOCKEY: re.compile(r"騎手情報"),
+    DataType.JOCKEY_SUMMARY: re.compile(r"騎手情報"),
+    DataType.TRAINER: re.compile(r"調教師情報"),
+    DataType.TRAINER_SUMMARY: re.compile(r"調教師情報"),
+    DataType.ODDS_TAN: re.compile(r"tanpuku"),
+}
+
+def check_page(html: Optional[str], data_type: DataType) -> bool:
+    """whether the html looks like a real page of the type"""
+    return (html is not None) and (PAGE_MARKERS[data_type].search(html) is not None)
+
+def open_browser_navigator(use_tabs: bool = False) -> Navigator:
+    """Start a browser and return its navigator"""
+    return Navigator(Browser(), use_tabs=use_tabs)
+
+class HTTPNavigator:
+    """
+    Navigator without a browser: the pages of races and horses are fetched by their links, and the doAction scripts
+    of matches, jockeys, trainers and odds are replayed as the form POSTs they submit.
+    The search of a month needs the scripts of the search page, so it is left to a browser navigator, and so is any page
+    which can not be fetched or does not look like a real page. The browser is only started when it is needed.
+    """
+
+    def __init__(self, fetcher: Optional[HTTPFetcher] = None,
+                 fallback_factory: Optional[Callable[[], Navigator]] = open_browser_navigator):
+        self.fetcher = fetcher if fetcher is not None else HTTPFetcher()
+        self.fallback_factory = fallback_factory
+        self.fallback: Optional[Navigator] = None
+        self._fallback_on_site = False
+        self._html: Optional[str] = None
+        self.logger = get_logger("cheval.browser.http_navigator")
+
+    def _get_fallback(self) -> Navigator:
+        if self.fallback is None:
+            if self.fallback_factory is None:
+                raise RuntimeError("The page can not be fetched by HTTP and there is no browser to fall back to")
+            self.logger.info("Start the browser for fallback")
+            self.fallback = self.fallback_factory()
+        return self.fallback
+
+    def _on_fallback(self, get_html: Callable[[Navigator], str]) -> str:
+        """Get a page by the browser, which enters the site first for the doAction scripts"""
+        fallback = self._get_fallback()
+        if not self._fallback_on_site:
+            fallback.go_to_search_page()
+            self._fallback_on_site = True
+        return get_html(fallback)
+
+    def _fetch(self, data_type: DataType, fetch: Callable[[], str], get_html: Callable[[Navigator], str]) -> str:
+        """Get a page by HTTP, or by the browser if the response is an error or not a real page"""
+        try:
+            html = fetch()
+            if check_page(html, data_type):
+                self._html = html
+                return html
+            self.logger.warning(f"Not a page of {data_type.value} by HTTP, fall back to the browser")
+        except Exception as e:
+            if self.fallback_factory is None:
+                raise e
+            self.logger.warning(f"Failed to fetch a page of {data_type.value} by HTTP ({e!r}), fall back to the browser")
+        self._html = self._on_fallback(get_html)
+        return self._html
+
+    def get_html(self):
+        return self._html
+
+    def go_to_search_page(self):
+        """Nothing to enter for HTTP, the browser enters the search page when it is started"""
+        pass
+
+    def search_by_year_month(self, year: int, month: int):
+        """Search the month by the browser"""
+        fallback = self._get_fallback()
+        fallback.go_to_search_page()
+        fallback.search_by_year_month(year, month)
+        self._fallback_on_site = True
+        self._html = fallback.get_html()
+
+    def back(self):
+        """Nothing to go back to"""
+        pass
+
+    def close(self):
+        """Close"""
+        self.fetcher.close()
+        if self.fallback is not None:
+            self.fallback.close()
+
+    def get_match_html(self, action: str):
+        """Get the html of a match"""
+        return self._fetch(DataType.MATCH, lambda: self.fetcher.get_match_html(action),
+                           lambda fallback: fallback.get_match_html(action))
+
+    def get_race_html(self, link: str):
+        """Get the html of a race"""
+        return self._fetch(DataType.RACE, lambda: self.fetcher.get_race_html(link),
+                           lambda fallback: fallback.get_race_html(link))
+
+    def get_horse_html(self, link: str):
+        """Get the html of a horse"""
+        return self._fetch(DataType.HORSE, lambda: self.fetcher.get_horse_html(link),
+                           lambda fallback: fallback.get_horse_html(link))
+
+    def get_jockey_trainer_html(self, action: str):
+        """Get the html of a jockey or trainer or his/her summary"""
+        data_type = DataType.JOCKEY if "accessK" in action else DataType.TRAINER
+        return self._fetch(data_type, lambda: self.fetcher.get_jockey_trainer_html(action),
+                           lambda fallback: fallback.get_jockey_trainer_html(action))
+
+    def get_odds_tan_html(self, action: str):
+        """Get the html of a odds tan (単勝オッズ)"""
+        return self._fetch(DataType.ODDS_TAN, lambda: self.fetcher.get_odds_tan_html(action),
+                           lambda fallback: fallback.get_odds_tan_html(action))
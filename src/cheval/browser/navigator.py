@@ -1,15 +1,25 @@
 # navigator.py
 
 import inspect
+from typing import Optional
 
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import Select
 
 from src.cheval.browser.browser import Browser
+from src.cheval.browser.fetcher import HTTPFetcher
+from src.cheval.models.models import DataType
 
 class Navigator:
-    def __init__(self, browser: Browser):
+    def __init__(self, browser: Browser, fetcher: Optional[HTTPFetcher] = None, use_tabs: bool = False):
+        """
+        If a fetcher is given, the pages of races and horses are fetched by HTTP instead of the browser.
+        If use_tabs is True, every page is opened in a new tab which is closed after its html is got,
+        so the first tab stays on the page of the site and is never reloaded, otherwise the pages are entered directly.
+        """
         self.browser = browser
+        self.fetcher = fetcher
+        self.use_tabs = use_tabs
 
     def get_html(self):
         return self.browser.get_html()
@@ -36,7 +46,8 @@ class Navigator:
             self.browser.select_value(By.ID, "kaisaiY_list", str(year).zfill(4))
             self.browser.select_value(By.ID, "kaisaiM_list", str(month).zfill(2))
             self.browser.click(By.XPATH, "//a[contains(text(), '検索')]")
-            match_day_blocks = self.browser.find_all_elements(By.CSS_SELECTOR, ".past_result_line_unit")
+            self.browser.wait_until_ready(DataType.MONTH)
+            match_day_blocks = self.browser.find_all_elements(By.CSS_SELECTOR, ".past_result_line_unit", interval_time=0)
             print(f"Search by year = {year} and month = {month}: there are {len(match_day_blocks)} match day(s).")
         except Exception as e:
             print(f"An exception in {inspect.currentframe().f_code.co_name} of {self.__class__}!")
@@ -50,38 +61,54 @@ class Navigator:
     def close(self):
         """Close"""
         self.browser.close()
+        if self.fetcher is not None:
+            self.fetcher.close()
 
-    def get_match_html(self, action: str):
-        """Enter the page of a match and get its html"""
+    def _get_html_by_action(self, action: str, data_type: DataType):
+        """Run a doAction script and get the html of the page it opens"""
+        if self.use_tabs:
+            self.browser.open_tab_by_action(action=action)
+            return self._get_html_in_tab(data_type)
         self.browser.open_window_by_action(action=action, wait_time_before=0, wait_time_after=0)
-        self.browser.wait_for_load(wait_time_before=0, wait_time_after=0)
-        self.browser.find_all_elements(by=By.CSS_SELECTOR, detail="th.race_num[scope='row']")
+        self.browser.wait_until_ready(data_type)
         return self.browser.get_html()
 
-    def get_race_html(self, link: str):
-        """Enter the page of a race and get its html"""
+    def _get_html_by_link(self, link: str, data_type: DataType):
+        """Open a link and get the html of its page"""
+        if self.use_tabs:
+            self.browser.open_tab(url=link)
+            return self._get_html_in_tab(data_type)
         self.browser.get(url=link, wait_time_before=0, wait_time_after=0)
-        self.browser.wait_for_load(wait_time_before=0, wait_time_after=0)
-        self.browser.find_one_element(by=By.CSS_SELECTOR, detail="div.block_header")
+        self.browser.wait_until_ready(data_type)
         return self.browser.get_html()
 
+    def _get_html_in_tab(self, data_type: DataType):
+        try:
+            self.browser.wait_until_ready(data_type)
+            return self.browser.get_html()
+        finally:
+            self.browser.close_tab()
+
+    def get_match_html(self, action: str):
+        """Enter the page of a match and get its html"""
+        return self._get_html_by_action(action, DataType.MATCH)
+
+    def get_race_html(self, link: str):
+        """Enter the page of a race and get its html"""
+        if self.fetcher is not None:
+            return self.fetcher.get_race_html(link)
+        return self._get_html_by_link(link, DataType.RACE)
+
     def get_horse_html(self, link: str):
         """Enter the page of a race and get its html"""
-        self.browser.get(url=link, wait_time_before=0, wait_time_after=0)
-        self.browser.wait_for_load(wait_time_before=0, wait_time_after=0)
-        self.browser.find_all_elements(by=By.CSS_SELECTOR, detail="td.date")
-        return self.browser.get_html()
+        if self.fetcher is not None:
+            return self.fetcher.get_horse_html(link)
+        return self._get_html_by_link(link, DataType.HORSE)
 
     def get_jockey_trainer_html(self, action: str):
         """Enter the page of a jockey or trainer or his/her summary and get its html"""
-        self.browser.open_window_by_action(action=action, wait_time_before=0, wait_time_after=0)
-        self.browser.wait_for_load(wait_time_before=0, wait_time_after=0)
-        self.browser.find_all_elements(by=By.CSS_SELECTOR, detail="th.row")
-        return self.browser.get_html()
+        return self._get_html_by_action(action, DataType.JOCKEY)
 
     def get_odds_tan_html(self, action: str):
         """Enter the page of a odds tan (単勝オッズ) and get its html"""
-        self.browser.open_window_by_action(action=action, wait_time_before=0, wait_time_after=0)
-        self.browser.wait_for_load(wait_time_before=0, wait_time_after=0)
-        self.browser.find_all_elements(by=By.CSS_SELECTOR, detail="tr th.horse")
-        return self.browser.get_html()
\ No newline at end of file
+        return self._get_html_by_action(action, DataType.ODDS_TAN)
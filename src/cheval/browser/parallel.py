@@ -0,0 +1,149 @@
+# parallel.py
+
+import inspect
+import multiprocessing
+import queue
+from functools import partial
+from typing import Callable, Dict, List, Optional, Set
+
+from .navigator import Navigator
+from .http_navigator import HTTPNavigator, open_browser_navigator
+from .crawler import FrontierCrawler
+from .replay import ReplayNavigator
+from ..models.models import FrontierTask
+from ..config import MAX_ATTEMPTS, MAX_BROWSERS, WORKER_POLL_INTERVAL, DIR_FOR_SAVE_HTML
+from ..storage.database import ChevalDB
+from ..storage.frontier import CrawlFrontier
+from ..storage.archive_writer import close_archive_writers
+from ..utils.logging import get_logger
+
+def open_navigator(use_http: bool = False, use_tabs: bool = False, replay: bool = False) -> Navigator:
+    """
+    Return the navigator used by every worker if no other factory is given, with use_http the browser is only a fallback.
+    With replay the pages are served from the archive, and the navigator is only started for the pages missing there.
+    """
+    if replay:
+        return ReplayNavigator(live_factory=partial(open_navigator, use_http=use_http, use_tabs=use_tabs))
+    if use_http:
+        return HTTPNavigator(fallback_factory=partial(open_browser_navigator, use_tabs=use_tabs))
+    return open_browser_navigator(use_tabs=use_tabs)
+
+def _work(worker_index: int, navigator_factory: Callable[[], Navigator], task_queue, result_queue, root_dir_for_save: str = DIR_FOR_SAVE_HTML):
+    """Loop of a worker process: fetch and parse the pages sent by the main process, and send back the parse results"""
+    logger = get_logger(f"cheval.browser.worker{worker_index}")
+    navigator = navigator_factory()
+    crawler = FrontierCrawler(navigator=navigator, db=None, frontier=None, root_dir_for_save=root_dir_for_save)
+    try:
+        while True:
+            task: Optional[FrontierTask] = task_queue.get()
+            if task is None:
+                break
+            try:
+                html = crawler.fetch(task)
+                result = crawler.parse(task, html)
+                result_queue.put((worker_index, result, None))
+            except Exception as e:
+                logger.exception(f"An exception in {inspect.currentframe().f_code.co_name} of worker {worker_index}!")
+                logger.exception(f"Information: task={task}")
+                result_queue.put((worker_index, None, repr(e)))
+    finally:
+        navigator.close()
+        # a worker process ends without running atexit, its queued pages are written here
+        close_archive_writers()
+
+class ParallelCrawler:
+    """
+    Drain the crawl frontier with several browsers, each in its own worker process.
+    The workers only fetch and parse pages. The frontier and the database are only used by the main process,
+    which stores every parse result and hands out the next task.
+    A worker which takes a match keeps all pages of that match, and an idle worker takes a new match.
+    """
+
+    def __init__(self, db: ChevalDB, frontier: CrawlFrontier, number_workers: int = MAX_BROWSERS,
+                 navigator_factory: Callable[[], Navigator] = open_navigator, max_attempts: int = MAX_ATTEMPTS,
+                 poll_interval: float = WORKER_POLL_INTERVAL, root_dir_for_save: str = DIR_FOR_SAVE_HTML):
+        self.db = db
+        self.frontier = frontier
+        self.number_workers = max(1, min(number_workers, MAX_BROWSERS))
+        self.navigator_factory = navigator_factory
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.root_dir_for_save = root_dir_for_save
+        self.crawler = FrontierCrawler(navigator=None, db=db, frontier=frontier, max_attempts=max_attempts, root_dir_for_save=root_dir_for_save)
+        self.logger = get_logger("cheval.browser.parallel")
+
+    def run(self, root_code: Optional[str] = None) -> int:
+        """Process the ready tasks with all workers until the frontier is drained, returns the number of pages done"""
+        self.frontier.reset(max_attempts=self.max_attempts, root_code=root_code)
+        context = multiprocessing.get_context()
+        result_queue = context.Queue()
+        task_queues = [context.Queue() for _ in range(self.number_workers)]
+        workers = [context.Process(target=_work, args=(i, self.navigator_factory, task_queues[i], result_queue, self.root_dir_for_save),
+                                   daemon=True)
+                   for i in range(self.number_workers)]
+        for worker in workers:
+            worker.start()
+        self.logger.info(f"Start {self.number_workers} worker(s)")
+        in_flight: Dict[int, FrontierTask] = {}
+        owners: Dict[str, int] = {}
+        dead: Set[int] = set()
+        number_done = 0
+        try:
+            while True:
+                for i in range(self.number_workers):
+                    if (i in in_flight) or (i in dead):
+                        continue
+                    task = self._claim(i, root_code, owners)
+                    if task is None:
+                        continue
+                    in_flight[i] = task
+                    task_queues[i].put(task)
+                if not in_flight:
+                    break
+                try:
+                    worker_index, result, error = result_queue.get(timeout=self.poll_interval)
+                except queue.Empty:
+                    self._check_workers(workers, in_flight, owners, dead)
+                    continue
+                task = in_flight.pop(worker_index, None)
+                if task is None:
+                    # the worker was found dead after it sent the result, its task has been released already
+                    continue
+                if error is not None:
+                    self.crawler.fail(task, error=error)
+                elif self.crawler.save(task, result):
+                    number_done += 1
+            self.crawler.complete_months(root_code)
+        finally:
+            for task_queue in task_queues:
+                task_queue.put(None)
+            for worker in workers:
+                worker.join()
+            self.crawler.flush()
+        self.logger.info(f"Frontier drained by {self.number_workers} worker(s): {number_done} page(s) done, {self.frontier.count_by_state(root_code)}")
+        return number_done
+
+    def _claim(self, worker_index: int, root_code: Optional[str], owners: Dict[str, int]) -> Optional[FrontierTask]:
+        """Take a task of the matches owned by the worker, or else a task of a match not owned by others"""
+        own: List[str] = [code for code, index in owners.items() if index == worker_index]
+        task = self.frontier.claim(root_code, branch_codes=own) if own else None
+        if task is None:
+            others: List[str] = [code for code, index in owners.items() if index != worker_index]
+            task = self.frontier.claim(root_code, exclude_branch_codes=others)
+        if (task is not None) and (task.branch_code is not None):
+            owners.setdefault(task.branch_code, worker_index)
+        return task
+
+    def _check_workers(self, workers: List, in_flight: Dict[int, FrontierTask], owners: Dict[str, int], dead: Set[int]):
+        """Stop sending tasks to the workers which have died, and give their task and their matches to the other workers"""
+        for i, worker in enumerate(workers):
+            if (i in dead) or worker.is_alive():
+                continue
+            dead.add(i)
+            self.logger.error(f"Worker {i} has died with exit code {worker.exitcode}")
+            if i in in_flight:
+                self.frontier.release(in_flight.pop(i))
+            for code in [code for code, index in owners.items() if index == i]:
+                del owners[code]
+        if len(dead) == len(workers):
+            raise RuntimeError("All workers have died")
@@ -0,0 +1,107 @@
+# pool.py
+
+import inspect
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+from .navigator import Navigator
+from .http_navigator import open_browser_navigator
+from ..config import POOL_SIZE, POOL_MAX_PAGES, POOL_MAX_MEMORY_MB
+from ..utils.logging import get_logger
+
+class BrowserPool:
+    """
+    Keep warm browsers and lend them to the crawls of months or matches, so Chrome is only started when there is none idle.
+    A browser is checked before it is lent, and recycled when its session is dead, after max_pages pages,
+    or when the memory of its page grows beyond max_memory_mb.
+    """
+
+    def __init__(self, size: int = POOL_SIZE, max_pages: int = POOL_MAX_PAGES, max_memory_mb: float = POOL_MAX_MEMORY_MB,
+                 navigator_factory: Callable[[], Navigator] = open_browser_navigator):
+        self.size = size
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.navigator_factory = navigator_factory
+        self.idle: List[Navigator] = []
+        self.number_lent = 0
+        self.number_started = 0
+        self.number_recycled = 0
+        self._lock = threading.Lock()
+        self.logger = get_logger("cheval.browser.pool")
+
+    def acquire(self) -> Navigator:
+        """Lend a healthy idle browser, or start one if there is none"""
+        with self._lock:
+            while self.idle:
+                navigator = self.idle.pop()
+                if self._is_healthy(navigator):
+                    self.number_lent += 1
+                    return navigator
+                self._discard(navigator, reason="dead session")
+            if self.number_lent >= self.size:
+                raise RuntimeError(f"All {self.size} browser(s) of the pool are lent")
+            self.number_lent += 1
+        try:
+            navigator = self.navigator_factory()
+        except Exception as e:
+            with self._lock:
+                self.number_lent -= 1
+            self.logger.exception(f"An exception in {inspect.currentframe().f_code.co_name} of {self.__class__}!")
+            raise e
+        with self._lock:
+            self.number_started += 1
+        self.logger.info(f"Start a browser: {self.stats()}")
+        return navigator
+
+    def release(self, navigator: Navigator):
+        """Take back a browser, it is recycled if it is worn out"""
+        with self._lock:
+            self.number_lent -= 1
+            reason = self._wear(navigator)
+            if reason is None:
+                self.idle.append(navigator)
+                return
+            self._discard(navigator, reason=reason)
+
+    @contextmanager
+    def lease(self):
+        """Lend a browser for the block"""
+        navigator = self.acquire()
+        try:
+            yield navigator
+        finally:
+            self.release(navigator)
+
+    def _is_healthy(self, navigator: Navigator) -> bool:
+        return navigator.browser.is_alive()
+
+    def _wear(self, navigator: Navigator):
+        """the reason to recycle a browser, None if it can be lent again"""
+        browser = navigator.browser
+        if not browser.is_alive():
+            return "dead session"
+        if browser.number_pages >= self.max_pages:
+            return f"{browser.number_pages} pages"
+        memory_mb = browser.memory_mb()
+        if (memory_mb is not None) and (memory_mb >= self.max_memory_mb):
+            return f"{memory_mb:.0f} MB"
+        return None
+
+    def _discard(self, navigator: Navigator, reason: str):
+        self.number_recycled += 1
+        self.logger.info(f"Recycle a browser ({reason})")
+        try:
+            navigator.close()
+        except Exception:
+            self.logger.exception(f"An exception in {inspect.currentframe().f_code.co_name} of {self.__class__}!")
+
+    def stats(self) -> Dict[str, int]:
+        return {"idle": len(self.idle), "lent": self.number_lent, "started": self.number_started, "recycled": self.number_recycled}
+
+    def close(self):
+        """Close all idle browsers"""
+        with self._lock:
+            while self.idle:
+                self.idle.pop().close()
+        self.logger.info(f"Close the pool: {self.stats()}")
@@ -0,0 +1,96 @@
+# readiness.py
+
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from selenium.common.exceptions import TimeoutException
+
+from ..models.models import DataType
+from ..config import WAIT_TIMEOUT, READY_POLL_INTERVAL
+from ..utils.logging import get_logger
+
+STALE_ATTRIBUTE = "data-cheval-stale"
+# mark the document before an action which navigates away, so its rows are not taken for those of the next page
+STALE_SCRIPT = f"document.documentElement && document.documentElement.setAttribute('{STALE_ATTRIBUTE}', '1');"
+# run a doAction script with its form submitted into a new tab, so the page it runs on is kept
+TAB_ACTION_SCRIPT = """
+var submit = HTMLFormElement.prototype.submit;
+HTMLFormElement.prototype.submit = function () { this.target = "_blank"; return submit.call(this); };
+try { (function () { %s })(); } finally { HTMLFormElement.prototype.submit = submit; }
+"""
+# one round trip to the browser gets everything the conditions need
+READY_SCRIPT = f"""
+return {{
+    "complete": document.readyState === "complete" && !document.documentElement.hasAttribute("{STALE_ATTRIBUTE}"),
+    "count": arguments[0] ? document.querySelectorAll(arguments[0]).length : 0,
+    "resources": performance.getEntriesByType("resource").length,
+    "size": document.getElementsByTagName("*").length
+}};
+"""
+
+@dataclass(frozen=True)
+class PageReadiness:
+    """When a page is usable: a new document is loaded, the selector has min_count elements, and optionally
+    no new resource has been loaded (network idle) and the number of elements has not changed (stable DOM) since the last poll"""
+    selector: Optional[str] = None
+    min_count: int = 1
+    network_idle: bool = False
+    stable_dom: bool = True
+
+# the rows which Navigator waits on for every type of page
+READINESS: Dict[DataType, PageReadiness] = {
+    DataType.MONTH: PageReadiness(selector=".past_result_line_unit"),
+    DataType.MATCH: PageReadiness(selector="th.race_num[scope='row']"),
+    DataType.RACE: PageReadiness(selector="div.block_header"),
+    DataType.HORSE: PageReadiness(selector="td.date"),
+    DataType.JOCKEY: PageReadiness(selector="th.row"),
+    DataType.JOCKEY_SUMMARY: PageReadiness(selector="th.row"),
+    DataType.TRAINER: PageReadiness(selector="th.row"),
+    DataType.TRAINER_SUMMARY: PageReadiness(selector="th.row"),
+    DataType.ODDS_TAN: PageReadiness(selector="tr th.horse", network_idle=True),
+}
+
+class ActionTimings:
+    """Log how long every action of the browser takes, and keep the totals per action"""
+
+    def __init__(self, name: str = "cheval.browser.timings"):
+        self.count: Dict[str, int] = defaultdict(int)
+        self.total: Dict[str, float] = defaultdict(float)
+        self.logger = get_logger(name)
+
+    def record(self, action: str, elapsed: float):
+        self.count[action] += 1
+        self.total[action] += elapsed
+        self.logger.info(f"{action}: {elapsed:.2f}s")
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {action: {"count": self.count[action], "total": self.total[action], "mean": self.total[action] / self.count[action]}
+                for action in self.count}
+
+class ReadinessEngine:
+    """Poll the page until its readiness conditions hold, and return as soon as they do"""
+
+    def __init__(self, time_out: int = WAIT_TIMEOUT, poll_interval: float = READY_POLL_INTERVAL):
+        self.time_out = time_out
+        self.poll_interval = poll_interval
+
+    def wait(self, driver, readiness: PageReadiness, time_out: Optional[int] = None) -> float:
+        """Wait until the page is ready, returns the seconds waited"""
+        if time_out is None:
+            time_out = self.time_out
+        start = time.monotonic()
+        last = None
+        while True:
+            state = driver.execute_script(READY_SCRIPT, readiness.selector)
+            snapshot = (state["resources"] if readiness.network_idle else None, state["size"] if readiness.stable_dom else None)
+            loaded = state["complete"] and ((readiness.selector is None) or (state["count"] >= readiness.min_count))
+            stable = (not (readiness.network_idle or readiness.stable_dom)) or (snapshot == last)
+            elapsed = time.monotonic() - start
+            if loaded and stable:
+                return elapsed
+            if elapsed > time_out:
+                raise TimeoutException(f"Page not ready in {time_out}s: {readiness}, last state {state}")
+            last = snapshot if loaded else None
+            time.sleep(self.poll_interval)
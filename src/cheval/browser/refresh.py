@@ -0,0 +1,78 @@
+# refresh.py
+
+import inspect
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .crawler import FrontierCrawler
+from .navigator import Navigator
+from ..parsers.parsers import Parsers
+from ..models.models import DataType, FrontierTask
+from ..config import DIR_FOR_SAVE_HTML
+from ..storage.database import ChevalDB, MUTABLE_TABLES
+from ..storage.frontier import CrawlFrontier
+from ..storage.freshness import Freshness, FRESHNESS, mutable_types
+from ..utils.logging import get_logger
+
+# the pages of the stored entities by their codes, see task_of_code
+ENTITY_PAGES = {DataType.HORSE: "/JRADB/accessU.html", DataType.JOCKEY: "/JRADB/accessK.html", DataType.TRAINER: "/JRADB/accessC.html"}
+
+def task_of_code(data_type: DataType, code: str) -> FrontierTask:
+    """A task to fetch the page of a stored entity by its code, a horse by its link and a jockey or trainer by its doAction script"""
+    path = ENTITY_PAGES[data_type]
+    if data_type == DataType.HORSE:
+        return FrontierTask(thetype=data_type, code=code, link=f"{path}?CNAME={code}")
+    return FrontierTask(thetype=data_type, code=code, action=f"return doAction('{path}', '{code}');")
+
+class RefreshCrawler:
+    """
+    Keep the database current without a full re-crawl: re-fetch only the stored entities of the mutable types
+    which are stale by the freshness policy, and replace them in the database.
+    The pages are reached by the links and doAction scripts kept in the crawl frontier,
+    or made from the stored codes for the entities which have no task in it.
+    """
+
+    def __init__(self, navigator: Navigator, db: ChevalDB, frontier: CrawlFrontier,
+                 policy: Dict[DataType, Freshness] = FRESHNESS, parsers: Optional[Parsers] = None,
+                 root_dir_for_save: str = DIR_FOR_SAVE_HTML):
+        self.db = db
+        self.frontier = frontier
+        self.policy = policy
+        self.crawler = FrontierCrawler(navigator=navigator, db=db, frontier=frontier, parsers=parsers, root_dir_for_save=root_dir_for_save)
+        self.logger = get_logger("cheval.browser.refresh")
+
+    def stale_tasks(self, now: Optional[datetime] = None) -> Dict[DataType, List[FrontierTask]]:
+        """The tasks of the stale entities, per type"""
+        tasks: Dict[DataType, List[FrontierTask]] = {}
+        for data_type in mutable_types(self.policy):
+            if data_type not in MUTABLE_TABLES:
+                # the summaries are stored with the history of their jockey or trainer, they are not replaced
+                continue
+            tasks[data_type] = []
+            for code in self.db.get_stale_codes(data_type, before=self.policy[data_type].stale_before(now)):
+                task = self.frontier.get_task(data_type, code)
+                if task is None:
+                    self.logger.info(f"No task in the frontier, the page is reached by its code: {data_type.value} {code}")
+                    task = task_of_code(data_type, code)
+                tasks[data_type].append(task)
+        return tasks
+
+    def run(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Re-fetch the stale entities, returns the numbers of stored, stale, refreshed and failed entities"""
+        report = {"stored": 0, "stale": 0, "refreshed": 0, "failed": 0}
+        for data_type, tasks in self.stale_tasks(now).items():
+            report["stored"] += len(self.db.get_code_keys(data_type))
+            report["stale"] += len(tasks)
+            for task in tasks:
+                try:
+                    html = self.crawler.fetch(task)
+                    result = self.crawler.parse(task, html)
+                    self.db.replace_entity(data_type, result.entity)
+                    report["refreshed"] += 1
+                    self.logger.info(f"Refresh: {data_type.value} {task.code}")
+                except Exception:
+                    report["failed"] += 1
+                    self.logger.exception(f"An exception in {inspect.currentframe().f_code.co_name} of {self.__class__}!")
+                    self.logger.exception(f"Information: task={task}")
+        self.logger.info(f"Refresh report: {report}")
+        return report
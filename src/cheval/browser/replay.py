@@ -0,0 +1,140 @@
+# replay.py
+
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from .navigator import Navigator
+from .http_navigator import check_page
+from ..models.models import DataType
+from ..config import DIR_FOR_SAVE_HTML
+from ..storage.html_storage import HTMLStorage
+from ..storage.freshness import Freshness, FRESHNESS, IMMUTABLE
+from ..utils.misc import extract_cname_code, extract_doaction_code, year_month_to_code
+from ..utils.logging import get_logger
+
+class ReplayNavigator:
+    """
+    Navigator which serves the pages from the archive of HTMLStorage, and only goes to the site on a miss.
+    A page is a hit if its last saved fetch is current by the freshness policy, see storage.freshness, and looks like
+    a real page: with the default policy the months, matches, races and odds are never fetched again, and the horses,
+    jockeys and trainers are fetched again once they are older than their ttl. A type not in the policy never goes stale.
+    The live navigator is only started on the first miss, so a re-run of an archived month makes no request at all.
+    After every page, replayed tells whether it came from the archive, so the crawler does not save it again.
+    """
+
+    def __init__(self, live_factory: Optional[Callable[[], Navigator]] = None, storage: Optional[HTMLStorage] = None,
+                 root_dir: str = DIR_FOR_SAVE_HTML, policy: Dict[DataType, Freshness] = FRESHNESS):
+        self.live_factory = live_factory
+        self._own_storage = storage is None
+        self.storage = storage if storage is not None else HTMLStorage(root_dir=root_dir)
+        self.policy = policy
+        self.live: Optional[Navigator] = None
+        self._live_on_site = False
+        self._html: Optional[str] = None
+        self.replayed = False
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        self.logger = get_logger("cheval.browser.replay")
+
+    def _get_live(self) -> Navigator:
+        if self.live is None:
+            if self.live_factory is None:
+                raise RuntimeError("The page is not in the archive and there is no navigator to fetch it")
+            self.logger.info("Start the live navigator for a miss")
+            self.live = self.live_factory()
+        return self.live
+
+    def _on_live(self, get_html: Callable[[Navigator], str]) -> str:
+        """Get a page from the site, the live navigator enters the site first for the doAction scripts"""
+        live = self._get_live()
+        if not self._live_on_site:
+            live.go_to_search_page()
+            self._live_on_site = True
+        return get_html(live)
+
+    def _lookup(self, page_types: Sequence[DataType], code: Optional[str], now: Optional[datetime] = None) -> Optional[Tuple[DataType, str]]:
+        """the type and html of the last current fetch of the page in the archive, None on a miss"""
+        if code is None:
+            return None
+        for page_type in page_types:
+            page = self.storage.latest_page(code, page_type)
+            if page is None:
+                continue
+            if self.policy.get(page_type, IMMUTABLE).is_stale(page.fetched_at, now):
+                continue
+            try:
+                html = self.storage.read_page(page)
+            except FileNotFoundError:
+                self.logger.warning(f"The archived page is missing: {page.path}")
+                continue
+            if check_page(html, page_type):
+                return page_type, html
+        return None
+
+    def _replay(self, page_types: Sequence[DataType], code: Optional[str], get_html: Callable[[Navigator], str]) -> str:
+        """Get a page from the archive, or from the site on a miss"""
+        found = self._lookup(page_types, code)
+        self.replayed = found is not None
+        if self.replayed:
+            page_type, html = found
+            self.hits[page_type.value] += 1
+        else:
+            self.misses[page_types[0].value] += 1
+            html = self._on_live(get_html)
+        self._html = html
+        return html
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """the number of hits and misses of the archive by type of page"""
+        return {"hits": dict(self.hits), "misses": dict(self.misses)}
+
+    def get_html(self):
+        return self._html
+
+    def go_to_search_page(self):
+        """Nothing to enter for the archive, the live navigator enters the search page when it is started"""
+        pass
+
+    def search_by_year_month(self, year: int, month: int):
+        """Get the page of the month"""
+        def search(live: Navigator) -> str:
+            live.search_by_year_month(year, month)
+            return live.get_html()
+        self._replay([DataType.MONTH], year_month_to_code(year, month), search)
+
+    def back(self):
+        """Nothing to go back to"""
+        pass
+
+    def close(self):
+        """Close"""
+        self.logger.info(f"Replay: {self.stats()}")
+        if self.live is not None:
+            self.live.close()
+        if self._own_storage:
+            self.storage.close()
+
+    def get_match_html(self, action: str):
+        """Get the html of a match"""
+        return self._replay([DataType.MATCH], extract_doaction_code(action), lambda live: live.get_match_html(action))
+
+    def get_race_html(self, link: str):
+        """Get the html of a race"""
+        return self._replay([DataType.RACE], extract_cname_code(link), lambda live: live.get_race_html(link))
+
+    def get_horse_html(self, link: str):
+        """Get the html of a horse"""
+        return self._replay([DataType.HORSE], extract_cname_code(link), lambda live: live.get_horse_html(link))
+
+    def get_jockey_trainer_html(self, action: str):
+        """Get the html of a jockey or trainer or his/her summary, the action does not tell a page from its summary"""
+        if "accessK" in action:
+            page_types = [DataType.JOCKEY, DataType.JOCKEY_SUMMARY]
+        else:
+            page_types = [DataType.TRAINER, DataType.TRAINER_SUMMARY]
+        return self._replay(page_types, extract_doaction_code(action), lambda live: live.get_jockey_trainer_html(action))
+
+    def get_odds_tan_html(self, action: str):
+        """Get the html of a odds tan (単勝オッズ)"""
+        return self._replay([DataType.ODDS_TAN], extract_doaction_code(action), lambda live: live.get_odds_tan_html(action))
@@ -8,3 +8,94 @@ WAIT_TIMEOUT = 30
 DIR_FOR_DATA = "data"
 DIR_FOR_LOG = os.path.join(DIR_FOR_DATA, "log")
 DIR_FOR_SAVE_HTML = os.path.join(DIR_FOR_DATA, "html")
+
+# politeness: the requests to the site are paced by AIMD between MIN_REQUEST_RATE and TARGET_REQUEST_RATE (requests per second)
+TARGET_REQUEST_RATE = 1.0
+MIN_REQUEST_RATE = 0.1
+RATE_INCREASE = 0.05
+RATE_DECREASE_FACTOR = 0.5
+SLOW_LATENCY = 10
+LATENCY_SMOOTHING = 0.2
+
+MAX_ATTEMPTS = 3
+# the politeness ceiling, the number of browsers never goes beyond it
+MAX_BROWSERS = 4
+WORKER_POLL_INTERVAL = 10
+
+HTTP_POOL_SIZE = 10
+HTTP_RETRIES = 3
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "ja,en;q=0.8",
+}
+ACTION_FORM_FIELD = "cname"
+
+ASYNC_CONCURRENCY = 8
+ASYNC_PER_HOST = 4
+
+READY_POLL_INTERVAL = 0.25
+
+# lean profile of Chrome: headless, and nothing is downloaded except the html and the scripts
+BROWSER_LEAN = False
+LEAN_ARGUMENTS = (
+    "--headless=new",
+    "--window-size=1920,1080",
+    "--disable-gpu",
+    "--disable-extensions",
+    "--blink-settings=imagesEnabled=false",
+    "--mute-audio",
+    "--no-first-run",
+)
+LEAN_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.managed_default_content_settings.fonts": 2,
+}
+LEAN_BLOCKED_URLS = (
+    # the files of the site have a query of version, example: /JRADB/common_d/css/frame.css?version=202412
+    "*.css*", "*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.svg*", "*.ico*", "*.webp*",
+    "*.woff*", "*.ttf*", "*.otf*",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*/onetag2020/*",
+)
+
+# the browsers of the pool are recycled after so many pages or so much memory of the page
+POOL_SIZE = 1
+POOL_MAX_PAGES = 2000
+POOL_MAX_MEMORY_MB = 1024
+
+SQLITE_TIMEOUT = 60
+
+# the hits of recorded codes are written to the database in one UPDATE after so many hits or seconds
+CODE_HITS_FLUSH_SIZE = 500
+CODE_HITS_FLUSH_INTERVAL = 60
+# the number of codes in one query of exists_codes, below the limit of SQLite on bound parameters
+EXISTS_CHUNK_SIZE = 500
+# the index of recorded codes
+CODE_INDEX_BLOOM = False
+CODE_INDEX_BLOOM_ERROR_RATE = 0.001
+
+# the stored horses, jockeys and trainers are re-fetched by a refresh after so many days
+HORSE_TTL_DAYS = 30
+JOCKEY_TTL_DAYS = 7
+TRAINER_TTL_DAYS = 7
+
+# the offline re-parse of the archive: the parsed pages are inserted in batches of this size
+REPARSE_BATCH_SIZE = 1000
+REPARSE_CHUNK_SIZE = 16
+REPARSE_WINDOW_SIZE = 10000
+
+# the archive of pages: rolling segments of zstd frames, with a dictionary per type trained on the first pages
+SEGMENT_MAX_BYTES = 256 * 1024 * 1024
+ZSTD_LEVEL = 10
+ZSTD_DICT_SIZE = 110 * 1024
+ZSTD_DICT_SAMPLES = 100
+
+# the pages are saved by a background writer, the parser waits once this many pages are queued
+ARCHIVE_QUEUE_SIZE = 256
+
+# the tree builder of BeautifulSoup the parsers run on: "lxml" (fast) or "html.parser" (no library needed)
+PARSER_BACKEND = "lxml"
+# the parsers only build the regions of a page they read, see Regions
+PARSE_REGIONS_ONLY = True
+# the parsers of races, odds and lists of matches read the html strings without building a tree, see fast_path.py
+PARSE_FAST_PATH = True
@@ -1,4 +1,36 @@
 # main.py
 
+import argparse
+
+from src.cheval.browser.JRA import parse_JRA_range, refresh_JRA
+from src.cheval.storage.reparse import reparse_archive
+
+def parse_year_month(text: str):
+    """'2005-01' -> (2005, 1)"""
+    year, month = text.split("-")
+    return int(year), int(month)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crawl the data of JRA from the start month to the end month (not included)")
+    parser.add_argument("start", type=parse_year_month, nargs="?", help="first month, example: 2005-01")
+    parser.add_argument("end", type=parse_year_month, nargs="?", help="month to stop before, example: 2025-01")
+    parser.add_argument("--workers", type=int, default=None, help="number of month workers, all cores by default")
+    parser.add_argument("--http", action="store_true", help="fetch the pages by HTTP, the browser is only a fallback")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="fetch the pages by HTTP in an asyncio event loop")
+    parser.add_argument("--tabs", action="store_true", help="open every page in a new tab")
+    parser.add_argument("--replay", action="store_true", help="serve the pages from the saved pages, only the missing or stale pages are fetched")
+    parser.add_argument("--refresh", action="store_true", help="only re-fetch the stale horses, jockeys and trainers")
+    parser.add_argument("--reparse", action="store_true", help="rebuild the database from the saved pages into a new file, nothing is fetched")
+    args = parser.parse_args(argv)
+    if args.reparse:
+        return reparse_archive(number_workers=args.workers)
+    if args.refresh:
+        return refresh_JRA(use_http=args.http, use_tabs=args.tabs)
+    if (args.start is None) or (args.end is None):
+        parser.error("the start and end months are required unless --refresh or --reparse is given")
+    (start_year, start_month), (end_year, end_month) = args.start, args.end
+    return parse_JRA_range(start_year, start_month, end_year, end_month, number_workers=args.workers,
+                           use_http=args.http, use_async=args.use_async, use_tabs=args.tabs, replay=args.replay)
+
 if __name__ == "__main__":
-    print("Hello Cheval")
\ No newline at end of file
+    main()
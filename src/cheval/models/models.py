@@ -657,4 +657,91 @@ class CodeRecorder(SQLModel, table=True):
     count: int = Field(default=int(1))
     __table_args__ = (
         sqlalchemy.UniqueConstraint("code", "datetype", name="uq_code_datetype"),
-    )
\ No newline at end of file
+    )
+
+@unique
+class TaskState(Enum):
+    """state of a page in the crawl frontier"""
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+
+class FrontierTask(SQLModel, table=True):
+    """one page to fetch in the crawl frontier"""
+    __tablename__ = "frontier"
+    id: Optional[int] = Field(default=None, primary_key=True)
+    thetype: DataType = Field(sa_column=sqlalchemy.Column(EnumType(DataType)))
+    "type of the page"
+    code: Optional[str] = Field(default=None)
+    "code of the entity on the page"
+    name: Optional[str] = Field(default=None)
+    "name of the entity on the page"
+    link: Optional[str] = Field(default=None)
+    "link (href) of the page, used for plain GET pages such as races and horses"
+    action: Optional[str] = Field(default=None)
+    "doAction script of the page, used for pages opened by javascript"
+    parent_id: Optional[int] = Field(default=None)
+    "id of the task which found this page, the task becomes ready when its parent is done"
+    parent_code: Optional[str] = Field(default=None)
+    "code of the parent entity, passed to the parser as father_entity_code"
+    root_code: Optional[str] = Field(default=None)
+    "code of the month which the page belongs to"
+    branch_code: Optional[str] = Field(default=None)
+    "code of the match which the page belongs to, used to keep the pages of a match in one browser"
+    state: TaskState = Field(default=TaskState.PENDING, sa_column=sqlalchemy.Column(EnumType(TaskState)))
+    "state of the task"
+    attempts: int = Field(default=int(0))
+    "how many times the page has been tried"
+    error: Optional[str] = Field(default=None)
+    "message of the last error"
+    update_time: Optional[datetime] = Field(default_factory=datetime.now)
+    "date and time of update"
+    __table_args__ = (
+        # a page is unique in the frontier of a month, every month crawls the pages it needs
+        sqlalchemy.UniqueConstraint("code", "thetype", "root_code", name="uq_frontier_code_thetype_root"),
+        # the claim and the counts of a month filter on its state, the claim joins every task to its parent
+        sqlalchemy.Index("ix_frontier_root_state", "root_code", "state"),
+        sqlalchemy.Index("ix_frontier_parent_id", "parent_id"),
+    )
+
+class PageSnapshot(SQLModel, table=True):
+    """one fetch of a page saved in the archive of HTMLStorage, the html is stored once per digest"""
+    __tablename__ = "page_snapshot"
+    id: Optional[int] = Field(default=None, primary_key=True)
+    page_type: DataType = Field(sa_column=sqlalchemy.Column(EnumType(DataType)))
+    "type of the page"
+    code: Optional[str] = Field(default=None)
+    "code of the entity on the page"
+    digest: Optional[str] = Field(default=None)
+    "sha256 of the html, the name of its blob"
+    fetched_at: Optional[datetime] = Field(default_factory=datetime.now)
+    "date and time of the fetch"
+    url: Optional[str] = Field(default=None)
+    "url of the page"
+    meta: Optional[str] = Field(default=None)
+    "other metadata of the fetch, as json"
+    path: Optional[str] = Field(default=None)
+    "path relative to the archive of a page saved one gzip file per fetch by earlier versions, None if the page is in the segments"
+    failed: bool = Field(default=False)
+    "whether the parser failed on the page"
+    __table_args__ = (
+        sqlalchemy.Index("ix_page_snapshot_type_code", "page_type", "code"),
+        sqlalchemy.Index("ix_page_snapshot_code", "code"),
+        sqlalchemy.Index("ix_page_snapshot_type_time", "page_type", "fetched_at"),
+    )
+
+class PageBlob(SQLModel, table=True):
+    """where the html of a digest is stored in the segments of the archive"""
+    __tablename__ = "page_blob"
+    digest: str = Field(primary_key=True)
+    "sha256 of the html"
+    page_type: DataType = Field(sa_column=sqlalchemy.Column(EnumType(DataType)))
+    "type of the page, the segments and the dictionary are per type"
+    segment: str = Field()
+    "path of the segment relative to the archive"
+    offset: int = Field()
+    "offset of the zstd frame in the segment"
+    length: int = Field()
+    "length of the zstd frame"
@@ -8,9 +8,13 @@ import datetime
 from dataclasses import dataclass, field
 from typing import Any, Dict, Generic, List, Optional, Type, TypeVar
 
+from bs4 import BeautifulSoup
+from bs4.element import Tag
+
+from .selectors import SELECTORS, Regions
 from ..models.models import DataType, CodeNameLinkAction
-from ..storage.html_storage import HTMLStorage
-from ..config import DIR_FOR_SAVE_HTML
+from ..storage.archive_writer import archive_writer, flush_archive_writers
+from ..config import DIR_FOR_SAVE_HTML, PARSER_BACKEND, PARSE_REGIONS_ONLY, PARSE_FAST_PATH
 from ..utils.logging import get_logger
 
 T = TypeVar("T")
@@ -32,42 +36,110 @@ class ParseResult(Generic[T]):
 class ParseError(Exception):
     pass
 
+# the tree builders of BeautifulSoup which give the same parse results on the pages of JRA
+PARSER_BACKENDS = ("lxml", "html.parser")
+
 # ----- BaseParser -----
 
 class BaseParser:
     data_type = DataType.BASE
     parser_name = data_type.value
     parser_version = "0.1"
+    # the regions of the page which the parser reads, the whole page if None
+    regions: Optional[Regions] = None
 
-    def __init__(self):
+    def __init__(self, backend: Optional[str] = None, regions_only: Optional[bool] = None, fast_path: Optional[bool] = None):
+        """
+        backend: the tree builder of BeautifulSoup, one of PARSER_BACKENDS, PARSER_BACKEND of the config by default
+        regions_only: whether only the regions of the page are built, PARSE_REGIONS_ONLY of the config by default
+        fast_path: whether the pages are read by _parse_fast first, PARSE_FAST_PATH of the config by default
+        """
         self.logger = get_logger(f"cheval.parsers.{self.parser_name}")
+        self.backend = backend if backend is not None else PARSER_BACKEND
+        if self.backend not in PARSER_BACKENDS:
+            raise ValueError(f"Unknown parser backend: {self.backend}, expected one of {PARSER_BACKENDS}")
+        self.regions_only = regions_only if regions_only is not None else PARSE_REGIONS_ONLY
+        self.fast_path = fast_path if fast_path is not None else PARSE_FAST_PATH
+        # the pages which failed the checks of the fast path and were read by the tree
+        self.fallbacks = 0
+
+    def make_soup(self, html: str) -> BeautifulSoup:
+        """Build the tree of a page by the backend of the parser, only its regions if regions_only"""
+        return BeautifulSoup(html, self.backend, parse_only=self.regions if self.regions_only else None)
+
+    def select_one(self, name: str, tag: Tag) -> Optional[Tag]:
+        """The first tag inside the tag matched by the selector of the name for the type of the parser, see selectors.py"""
+        return SELECTORS.select_one(self.data_type, name, tag)
+
+    def select(self, name: str, tag: Tag) -> List[Tag]:
+        """All tags inside the tag matched by the selector of the name for the type of the parser, see selectors.py"""
+        return SELECTORS.select(self.data_type, name, tag)
+
+    def flush(self):
+        """Wait until the pages queued for the archive are written"""
+        flush_archive_writers()
 
     def parse(self, html: str, entity_code: str = None, entity_name: str = None, father_entity_code: str = None,
               save_html: Optional[bool] = True, keep_history: Optional[bool] = None, 
               root_dir_for_save: str = DIR_FOR_SAVE_HTML,
-              context: Optional[Dict[str, Any]] = None) -> ParseResult[Any]:
+              context: Optional[Dict[str, Any]] = None, save_failed: bool = True) -> ParseResult[Any]:
         """
         Public entry point: Each subclass implements _parse_impl and returns a ParseResult[T] (no exception handling).
         This method is responsible for catching exceptions, saving the HTML, and recording information in the returned ParseResult._meta .
+        The HTML is handed to the background writer of the archive, see ArchiveWriter, call flush to wait until it is written.
         context: Any dictionary used to record contextual information such as year/month/race number/horse index (for easy backtracking).
+        save_failed: If False, a page which fails to parse is not written to the archive as FAILED when save_html is False.
         """
         self.logger.info(f"context: {context}\n\tentity_code={entity_code}, entity_name={entity_name},\n\tsave_html={save_html}, keep_history={keep_history}, root_dir_for_save={root_dir_for_save}")
         if save_html:
-            HTMLStorage(root_dir=root_dir_for_save).save_html(page_type=self.data_type, code=entity_code, html=html, keep_history=keep_history)
+            archive_writer(root_dir_for_save).save_html(page_type=self.data_type, code=entity_code, html=html,
+                                                        metadata=context, keep_history=keep_history)
         try:
-            result: ParseResult[Any] = self._parse_impl(html, entity_code, entity_name, father_entity_code)
+            result: ParseResult[Any] = self._parse_by_fast_path(html, entity_code, entity_name, father_entity_code)
+            if result is None:
+                result = self._parse_impl(html, entity_code, entity_name, father_entity_code)
+                result._meta.setdefault("path", "tree")
             result._meta.setdefault("parser", self.parser_name)
             result._meta.setdefault("version", self.parser_version)
+            result._meta.setdefault("backend", self.backend)
             if context:
                 result._meta.setdefault("context", context)
             return result
         except Exception as e:
-            filepath = HTMLStorage(root_dir=root_dir_for_save).save_html(page_type=DataType.FAILED, code=entity_code, html=html, keep_history=keep_history)
+            if save_html:
+                # the page is in the archive already, it is marked so it can be found by HTMLStorage.failed_pages
+                archive_writer(root_dir_for_save).mark_failed(page_type=self.data_type, code=entity_code)
+            elif save_failed:
+                archive_writer(root_dir_for_save).save_html(page_type=DataType.FAILED, code=entity_code, html=html, keep_history=keep_history)
             self.logger.exception(f"A fatal parser error in {inspect.currentframe().f_code.co_name} of {self.__class__}!")
-            self.logger.exception(f"Information: code={entity_code}, name={entity_name}, HTML file path={filepath}\n\tcontext: {context}")
+            self.logger.exception(f"Information: code={entity_code}, name={entity_name}, archive={root_dir_for_save}\n\tcontext: {context}")
             self.logger.exception(f"{str(e)}")
             raise e
 
+    def _parse_by_fast_path(self, html: str, entity_code: str = None, entity_name: str = None, father_entity_code: str = None) -> Optional[ParseResult[Any]]:
+        """The result of the fast path, None if it is off or the page fails its checks, then the page is read by the tree"""
+        if not self.fast_path:
+            return None
+        try:
+            result = self._parse_fast(html, entity_code, entity_name, father_entity_code)
+        except Exception as e:
+            self.fallbacks += 1
+            self.logger.warning(f"The fast path can not read the page {entity_code}, it is read by the tree: {e!r}")
+            return None
+        if result is not None:
+            result._meta.setdefault("path", "fast")
+        return result
+
+    def _parse_fast(self, html: str, entity_code: str = None, entity_name: str = None, father_entity_code: str = None) -> Optional[ParseResult[Any]]:
+        """
+        This method is overridden by the parsers of the pages read in bulk. It reads the html string without building a tree
+        (see fast_path.py), and its result must be the same as the one of _parse_impl. A page which is not as expected
+        raises FastPathError and is read by _parse_impl instead.
+        Return:
+            ParseResult[...], None if the parser has no fast path
+        """
+        return None
+
     def _parse_impl(self, html: str, entity_code: str = None, entity_name: str = None, father_entity_code: str = None) -> ParseResult[Any]:
         """
         This method is overridden by subclasses. It only performs parsing and does not handle exceptions.
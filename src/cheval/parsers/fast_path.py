@@ -0,0 +1,157 @@
+# fast_path.py
+
+import html as htmllib
+import re
+from typing import Dict, List, Optional, Pattern, Tuple
+
+from .selectors import simple_selector
+
+class FastPathError(Exception):
+    """A page which the fast path can not read as expected, it is read by the tree of BeautifulSoup instead"""
+    pass
+
+# the tags which have no end tag
+VOID_TAGS = frozenset(("area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "wbr"))
+
+_ANY_TAG = re.compile(r"<[^>]*>")
+# the comments and the scripts, which are not in the text of a tag
+_NOT_TEXT = re.compile(r"<!--.*?-->|<(script|style)(?=[\s>])[^>]*>.*?</\1\s*>", re.S)
+_ATTRIBUTE = re.compile(r"""([\w:-]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+)))?""")
+_CELL = re.compile(r"<(td|th)(?=[\s/>])([^>]*)>")
+_TAG_NAME = r"[a-zA-Z][\w-]*"
+_OPEN_TAGS: Dict[str, Pattern] = {}
+_OPEN_CLOSE_TAGS: Dict[str, Pattern] = {}
+
+def text(fragment: str) -> str:
+    """the text of a fragment of html, the same as get_text(strip=True) of the tag around it"""
+    pieces = _ANY_TAG.split(_NOT_TEXT.sub("<>", fragment))
+    return "".join(htmllib.unescape(piece).strip() for piece in pieces)
+
+def has_class(fragment: str, name: str) -> bool:
+    """whether a tag of a fragment of html has the class, to tell a missing tag from a tag the fast path can not find"""
+    return re.search(rf"""class\s*=\s*["'][^"']*\b{re.escape(name)}\b""", fragment) is not None
+
+def expect(condition: bool, message: str):
+    """check the shape of a page, raise FastPathError if it is not as expected"""
+    if not condition:
+        raise FastPathError(message)
+
+def _attribute(attrs: str, attribute: str) -> Optional[str]:
+    for match in _ATTRIBUTE.finditer(attrs):
+        if match.group(1) == attribute:
+            return htmllib.unescape(next((group for group in match.group(2, 3, 4) if group is not None), ""))
+    return None
+
+def _matches(attrs: str, tag_id: Optional[str], tag_classes) -> bool:
+    return (((tag_id is None) or (_attribute(attrs, "id") == tag_id))
+            and ((not tag_classes) or tag_classes.issubset((_attribute(attrs, "class") or "").split())))
+
+def _open_tags(name: Optional[str]) -> Pattern:
+    key = name or ""
+    if key not in _OPEN_TAGS:
+        _OPEN_TAGS[key] = re.compile(rf"<({re.escape(name) if name else _TAG_NAME})(?=[\s/>])([^>]*)>")
+    return _OPEN_TAGS[key]
+
+def _open_close_tags(name: str) -> Pattern:
+    if name not in _OPEN_CLOSE_TAGS:
+        _OPEN_CLOSE_TAGS[name] = re.compile(rf"<(/?){re.escape(name)}(?=[\s/>])([^>]*)>")
+    return _OPEN_CLOSE_TAGS[name]
+
+class Element:
+    """
+    A tag found in the html string of a page by its position, without building a tree.
+    The page must close its tags, a tag without its end tag raises FastPathError.
+    """
+
+    __slots__ = ("html", "name", "attrs", "start", "inner_start", "inner_end", "end")
+
+    def __init__(self, html: str, name: Optional[str], attrs: str, start: int, inner_start: int, inner_end: int, end: int):
+        self.html = html
+        self.name = name
+        self.attrs = attrs
+        self.start = start
+        self.inner_start = inner_start
+        self.inner_end = inner_end
+        self.end = end
+
+    @classmethod
+    def page(cls, html: str) -> "Element":
+        """the whole html string of a page"""
+        return cls(html, None, "", 0, 0, len(html), len(html))
+
+    @classmethod
+    def _opened(cls, html: str, name: str, attrs: str, start: int, inner_start: int, limit: int) -> "Element":
+        """the element of a start tag, up to its end tag"""
+        if (name in VOID_TAGS) or attrs.endswith("/"):
+            return cls(html, name, attrs, start, inner_start, inner_start, inner_start)
+        depth = 1
+        for tag in _open_close_tags(name).finditer(html, inner_start, limit):
+            if tag.group(1):
+                depth -= 1
+                if depth == 0:
+                    return cls(html, name, attrs, start, inner_start, tag.start(), tag.end())
+            elif not tag.group(2).endswith("/"):
+                depth += 1
+        raise FastPathError(f"No end tag of <{name}{attrs}> at {start}")
+
+    @property
+    def inner(self) -> str:
+        return self.html[self.inner_start:self.inner_end]
+
+    def text(self) -> str:
+        """the same as get_text(strip=True)"""
+        return text(self.inner)
+
+    def own_text(self) -> str:
+        """the strings directly inside the tag and not inside its children, joined without stripping them"""
+        strings: List[str] = []
+        position = self.inner_start
+        while True:
+            child = _open_tags(None).search(self.html, position, self.inner_end)
+            end = child.start() if child else self.inner_end
+            strings.append(htmllib.unescape(_NOT_TEXT.sub("", self.html[position:end])))
+            if child is None:
+                return "".join(strings)
+            position = self._opened(self.html, child.group(1), child.group(2), child.start(), child.end(), self.inner_end).end
+
+    def get(self, attribute: str) -> Optional[str]:
+        """the value of an attribute of the tag, None if the tag has no such attribute"""
+        return _attribute(self.attrs, attribute)
+
+    def classes(self) -> List[str]:
+        return (self.get("class") or "").split()
+
+    def _find(self, rules: List[Tuple], first: bool) -> List["Element"]:
+        (name, tag_id, tag_classes), rest = rules[0], rules[1:]
+        found: List[Element] = []
+        for tag in _open_tags(name).finditer(self.html, self.inner_start, self.inner_end):
+            if not _matches(tag.group(2), tag_id, tag_classes):
+                continue
+            element = self._opened(self.html, tag.group(1), tag.group(2), tag.start(), tag.end(), self.inner_end)
+            found.extend(element._find(rest, first) if rest else [element])
+            if first and found:
+                break
+        return found
+
+    def find_all(self, selector: str) -> List["Element"]:
+        """the tags inside the tag matched by a selector of simple selectors and descendant combinators, in the order of the page"""
+        found = self._find([simple_selector(part) for part in selector.split()], False)
+        return sorted({element.start: element for element in found}.values(), key=lambda element: element.start)
+
+    def find(self, selector: str) -> Optional["Element"]:
+        """the first tag inside the tag matched by a selector, see find_all, None if there is none"""
+        found = self._find([simple_selector(part) for part in selector.split()], True)
+        return found[0] if found else None
+
+    def cells(self) -> Dict[str, "Element"]:
+        """the cells of a table row by their classes, the first cell of a class is kept, see row_cells of table.py"""
+        cells: Dict[str, Element] = {}
+        position = self.inner_start
+        while True:
+            tag = _CELL.search(self.html, position, self.inner_end)
+            if tag is None:
+                return cells
+            cell = self._opened(self.html, tag.group(1), tag.group(2), tag.start(), tag.end(), self.inner_end)
+            for name in cell.classes():
+                cells.setdefault(name, cell)
+            position = cell.end
@@ -3,38 +3,39 @@
 from datetime import datetime
 from typing import List
 
-from bs4 import BeautifulSoup
 from bs4.element import Tag
 
 from ..utils.misc import parse_float, parse_int, parse_minsec, extract_cname_code, extract_doaction_code, extract_dd_horse, extract_class_jockey, extract_dd_trainer
 from ..models.models import Horse, ResultOfHorse, DataType
 from .base import BaseParser, ParseResult
+from .selectors import Regions
 
 class HorseParser(BaseParser):
     data_type = DataType.HORSE
     parser_name = data_type.value
+    regions = Regions("div.header_line", "div.profile", "div.prize", "table.striped")
 
     def _parse_impl(self, html: str, entity_code: str = None, entity_name: str = None, father_entity_code: str = None):
         """read the html string of a horse page"""
 
         parse_result = ParseResult[Horse]()
 
-        soup = BeautifulSoup(html, "html.parser")
+        soup = self.make_soup(html)
 
         # read the name of horse
-        temp = soup.select_one("div.header_line.no-mb span.txt")
-        name_en = temp.select_one("span.name_en").get_text(strip=True)
+        temp = self.select_one("name", soup)
+        name_en = self.select_one("name_en", temp).get_text(strip=True)
         name = temp.get_text(strip=True).replace("競走馬情報", "").replace(name_en, "")
         name = name
         name_en = name_en
-        if temp.select_one("span.rest"):
-            rest = temp.select_one("span.rest").get_text(strip=True)
+        if self.select_one("rest", temp):
+            rest = self.select_one("rest", temp).get_text(strip=True)
             name = name.replace(rest, "")
         else:
             rest = None
         
         # 抹消, whether deleted and the deleted date
-        temp = soup.select_one("div.header_line.no-mb span.inner span.opt span")
+        temp = self.select_one("deleted", soup)
         deleted = True if temp else False
         if deleted:
             deleted_date = datetime.strptime(temp.get_text(strip=True).replace("抹消年月日", "").strip(), "%Y年%m月%d日") if temp else None
@@ -42,19 +43,19 @@ class HorseParser(BaseParser):
             deleted_date = None
 
         # read the table of baisc informations
-        temps: List[Tag] = list(soup.select("div.profile.mt20 li"))
+        temps: List[Tag] = list(self.select("profile", soup))
         for item in temps:
-            value = item.select_one("dd").get_text(strip=True)
+            value = self.select_one("dd", item).get_text(strip=True)
             key = item.get_text(strip=True).replace(value, "")
             match key:
                 case "父":
-                    father_code, father_name = extract_dd_horse(str(item.select_one("dd")))
+                    father_code, father_name = extract_dd_horse(str(self.select_one("dd", item)))
                 case "母":
-                    mother_code, mother_name = extract_dd_horse(str(item.select_one("dd")))
+                    mother_code, mother_name = extract_dd_horse(str(self.select_one("dd", item)))
                 case "母の父":
-                    father_of_mother_code, father_of_mother_name = extract_dd_horse(str(item.select_one("dd")))
+                    father_of_mother_code, father_of_mother_name = extract_dd_horse(str(self.select_one("dd", item)))
                 case "母の母":
-                    mother_of_mother_code, mother_of_mother_name = extract_dd_horse(str(item.select_one("dd")))
+                    mother_of_mother_code, mother_of_mother_name = extract_dd_horse(str(self.select_one("dd", item)))
                 case "性別":
                     sex = value
                 case "生年月日":
@@ -64,19 +65,19 @@ class HorseParser(BaseParser):
                 case "馬主名":
                     owner = value
                 case "調教師名":
-                    trainer_code, trainer_name, trainer_affiliation = extract_dd_trainer(str(item.select_one("dd")))
+                    trainer_code, trainer_name, trainer_affiliation = extract_dd_trainer(str(self.select_one("dd", item)))
                 case "生産牧場":
                     birth_place = value
                 case "生産者":
                     birth_place = value
 
         # read the table of prize
-        temps: List[Tag] = list(soup.select("div.prize.mt10 li.div2"))
+        temps: List[Tag] = list(self.select("prizes", soup))
         for item in temps:
-            key = item.select_one("dt").get_text(strip=True)
-            unit = item.select_one("dd span").get_text(strip=True)
+            key = self.select_one("dt", item).get_text(strip=True)
+            unit = self.select_one("prize_unit", item).get_text(strip=True)
             assert (unit == "円"), f"the unit of prize for {key} is not 円"
-            value = item.select_one("dd").get_text(strip=True).replace(unit, "").replace(",", "")
+            value = self.select_one("dd", item).get_text(strip=True).replace(unit, "").replace(",", "")
             match key:
                 case "総賞金":
                     prize_total = parse_int(value)
@@ -92,19 +93,19 @@ class HorseParser(BaseParser):
                     prize_zhanghai = parse_int(value)
 
         # find the table "出走レース"
-        result_table = soup.select_one("table.basic.narrow-xy.striped")
+        result_table = self.select_one("results", soup)
 
         # read the race code and arrival order of the horse in the race
-        result_table_rows: List[Tag] = list(result_table.select("tbody tr"))
+        result_table_rows: List[Tag] = list(self.select("result_rows", result_table))
         result_list: List[ResultOfHorse] = []
         for row in result_table_rows:
-            if row.select_one("td.race") is None:
+            if self.select_one("result_race", row) is None:
                 continue
-            columns: List[Tag] = list(row.select("td"))
+            columns: List[Tag] = list(self.select("result_columns", row))
             date = datetime.strptime(columns[0].get_text(strip=True), "%Y年%m月%d日")
             place = columns[1].get_text(strip=True)
             race_name = columns[2].get_text(strip=True)
-            temp = columns[2].select_one("a[href]")
+            temp = self.select_one("race_link", columns[2])
             race_code = extract_cname_code(temp["href"]) if temp else None
             surface_distance = columns[3].get_text(strip=True)
             condition = columns[4].get_text(strip=True)
@@ -113,7 +114,7 @@ class HorseParser(BaseParser):
             pop = parse_int(pop_str)
             arrival_order_str = columns[7].get_text(strip=True)
             jockey_name = columns[8].get_text(strip=True)
-            temp = columns[8].select_one("a[onclick]")
+            temp = self.select_one("jockey_link", columns[8])
             jockey_code = extract_doaction_code(temp["onclick"]) if temp else None
             weight = parse_float(columns[9].get_text(strip=True))
             horse_weight = parse_float(columns[10].get_text(strip=True))
@@ -4,46 +4,47 @@ import re
 from datetime import datetime
 from typing import Dict, List, Optional
 
-from bs4 import BeautifulSoup
 from bs4.element import Tag
 
 from ..models.models import Jockey, SummaryOfJockeyTrainer, DataType, CodeNameLinkAction
 from ..utils.misc import extract_cname_code, extract_doaction_code, parse_float, parse_int, parse_minsec
 from .base import BaseParser, ParseResult
+from .selectors import SELECTORS, Regions
 
 class JockeyParser(BaseParser):
     data_type = DataType.JOCKEY
     parser_name = data_type.value
+    regions = Regions("div.header_line", "div.main.mt15")
 
     def _parse_impl(self, html: str, entity_code: str = None, entity_name: str = None, father_entity_code: str = None):
         """read the html string of a jockey page"""
 
         parse_result = ParseResult[Jockey]()
 
-        soup = BeautifulSoup(html, "html.parser")
+        soup = self.make_soup(html)
 
         # read the name of jockey
-        temp = soup.select_one("div.header_line.no-mb span.txt")
-        name_kana = temp.select_one("span.kana").get_text(strip=True)
+        temp = self.select_one("name", soup)
+        name_kana = self.select_one("kana", temp).get_text(strip=True)
         name = temp.get_text(strip=True).replace("騎手情報", "").replace(name_kana, "")
         name_kana = name_kana.replace("（", "").replace("）", "")
-        retired = True if temp.select_one("span.retired") else False
+        retired = True if self.select_one("retired", temp) else False
         if retired:
             name = name.replace("引退", "", 1)
 
         # read the table of baisc informations
-        temps: List[Tag] = list(soup.select("div.main.mt15 div.profile div.data dl"))
+        temps: List[Tag] = list(self.select("profile", soup))
         for term in temps:
-            key = term.select_one("dt").get_text(strip=True)
-            value = term.select_one("dd")
+            key = self.select_one("dt", term).get_text(strip=True)
+            value = self.select_one("dd", term)
             match key:
                 case "生年月日":
                     birth_date = datetime.strptime(value.get_text(strip=True), "%Y年%m月%d日")
                 case "身長":
-                    height_unit = value.select_one("span.unit").get_text(strip=True)
+                    height_unit = self.select_one("unit", value).get_text(strip=True)
                     height = parse_float(value.get_text(strip=True).replace(height_unit, ""))
                 case "体重":
-                    weight_unit = value.select_one("span.unit").get_text(strip=True)
+                    weight_unit = self.select_one("unit", value).get_text(strip=True)
                     weight = parse_float(value.get_text(strip=True).replace(weight_unit, ""))
                 case "血液型":
                     blood_type = value.get_text(strip=True)
@@ -63,15 +64,15 @@ class JockeyParser(BaseParser):
                     first_victory = value.get_text(strip=True)
 
         # read the table of year_record 本年成績
-        temp = soup.select_one("#year_record")
+        temp = self.select_one("year_record", soup)
         summary_this_year = self._read_summary_table(tag=temp, jockey_trainer_code=entity_code) if temp else []
 
         # read the table of year_record 累計成績
-        temp = soup.select_one("#total_record")
+        temp = self.select_one("total_record", soup)
         summary_total = self._read_summary_table(temp, jockey_trainer_code=entity_code) if temp else []
 
         # link to 過去成績
-        temp = soup.select_one("div.jockey_menu.mt30 li:has(a:-soup-contains('過去成績')) a")
+        temp = self.select_one("summary_link", soup)
         summary_action = temp["onclick"]
         summary_code = extract_doaction_code(summary_action)
         parse_result.links[DataType.JOCKEY_SUMMARY] = [CodeNameLinkAction(thetype=DataType.JOCKEY_SUMMARY, name=entity_name, code=summary_code, action=summary_action)]
@@ -85,14 +86,14 @@ class JockeyParser(BaseParser):
     @staticmethod
     def _read_summary_table(tag: Tag, append_list: List[SummaryOfJockeyTrainer] = None, append: bool = False, summary_code: str = None, jockey_trainer_code: str = None):
         results: List[SummaryOfJockeyTrainer] = []
-        title = tag.select_one("div.main").get_text(strip=True)
-        temps: List[Tag] = list(tag.select("tr"))
+        title = SELECTORS.select_one(DataType.JOCKEY_SUMMARY, "title", tag).get_text(strip=True)
+        temps: List[Tag] = list(SELECTORS.select(DataType.JOCKEY_SUMMARY, "rows", tag))
         for row in temps:
-            type = row.select_one("th[scope='row']")
+            type = SELECTORS.select_one(DataType.JOCKEY_SUMMARY, "row_type", row)
             if not type:
                 continue
             type = type.get_text(strip=True)
-            columns = [parse_int(column.get_text(strip=True)) if i < 7 else parse_float(column.get_text(strip=True)) for i, column in enumerate(row.select("td"))]
+            columns = [parse_int(column.get_text(strip=True)) if i < 7 else parse_float(column.get_text(strip=True)) for i, column in enumerate(SELECTORS.select(DataType.JOCKEY_SUMMARY, "columns", row))]
             summary = SummaryOfJockeyTrainer(summary_code=summary_code, jockey_trainer_code=jockey_trainer_code, title=title, type=type, num_no1=columns[0], num_no2=columns[1], num_no3=columns[2], num_no4=columns[3], num_no5=columns[4], num_out5=columns[5], num_rides=columns[6], winning_rate=columns[7], quinella_rate=columns[8], top3_rate=columns[9])
             results.append(summary)
             if append and (append_list is not None):
@@ -102,16 +103,17 @@ class JockeyParser(BaseParser):
 class JockeySummaryParser(BaseParser):
     data_type = DataType.JOCKEY_SUMMARY
     parser_name = data_type.value
+    regions = Regions("table.narrow")
 
     def _parse_impl(self, html: str, entity_code: str = None, entity_name: str = None, father_entity_code: str = None):
         """read the html string of a jockey summary page"""
 
-        soup = BeautifulSoup(html, "html.parser")
+        soup = self.make_soup(html)
         parse_result = ParseResult[SummaryOfJockeyTrainer]()
 
         results: List[SummaryOfJockeyTrainer] = []
 
-        tables = soup.select("table.basic.narrow.mt15, table.basic.narrow.mt40")
+        tables = self.select("tables", soup)
         for table in tables:
             JockeyParser._read_summary_table(tag=table, append_list=results, append=True, summary_code=entity_code, jockey_trainer_code=father_entity_code)
 
@@ -3,16 +3,18 @@
 from datetime import datetime
 from typing import List
 
-from bs4 import BeautifulSoup
 from bs4.element import Tag
 
 from ..utils.misc import extract_cname_code, extract_doaction_code
 from ..models.models import Match, CodeNameLinkAction, DataType
 from .base import BaseParser, ParseResult
+from .selectors import Regions
+from .fast_path import Element, expect
 
 class MatchParser(BaseParser):
     data_type = DataType.MATCH
     parser_name = data_type.value
+    regions = Regions("table.basic.mt20")
 
     def _parse_impl(self, html: str, entity_code: str = None, entity_name: str = None, father_entity_code: str = None):
         """read the html string of a match, and save the informations"""
@@ -21,10 +23,10 @@ class MatchParser(BaseParser):
         links_of_odds: List[CodeNameLinkAction] = []
         parse_result = ParseResult[Match]()
 
-        soup = BeautifulSoup(html, "html.parser")
+        soup = self.make_soup(html)
 
         # read the name and date
-        temp = soup.select_one("table.basic.mt20 div.main")
+        temp = self.select_one("title", soup)
         name = temp.get_text(strip=True).split("）")[-1].strip()
         date = datetime.strptime(temp.get_text(strip=True).split("（")[0].strip(), "%Y年%m月%d日")
         
@@ -32,18 +34,52 @@ class MatchParser(BaseParser):
         thematch: Match = Match(code=entity_code, date=date, name=name)
 
         # read the table of races
-        temps: List[Tag] = list(soup.select("tbody tr"))
+        temps: List[Tag] = list(self.select("rows", soup))
         thematch.number_races_in_match = len(temps)
         for race_tag in temps:
-            race_name = race_tag.select_one("td.race_name").get_text(strip=True)
-            race_link = str(race_tag.select_one("th.race_num a")["href"])
+            race_name = self.select_one("race_name", race_tag).get_text(strip=True)
+            race_link = str(self.select_one("race_link", race_tag)["href"])
             race_code = extract_cname_code(race_link)
             links_of_races.append(CodeNameLinkAction(thetype=DataType.RACE, code=race_code, name=race_name, link=race_link))
             thematch._races[race_code] = race_name
-            odds_action = race_tag.select_one("td.odds a")["onclick"]
+            odds_action = self.select_one("odds_link", race_tag)["onclick"]
             odds_code = extract_doaction_code(odds_action)
             links_of_odds.append(CodeNameLinkAction(thetype=DataType.ODDS_TAN, code=odds_code, name=race_name, action=odds_action))
 
+        parse_result.entity = thematch
+        parse_result.links[DataType.RACE] = links_of_races
+        parse_result.links[DataType.ODDS_TAN] = links_of_odds
+        return parse_result
+
+    def _parse_fast(self, html: str, entity_code: str = None, entity_name: str = None, father_entity_code: str = None) -> ParseResult[Match]:
+        """read the races of a match from the html string without building a tree"""
+
+        links_of_races: List[CodeNameLinkAction] = []
+        links_of_odds: List[CodeNameLinkAction] = []
+        parse_result = ParseResult[Match]()
+
+        table = Element.page(html).find("table.basic.mt20")
+        expect(table is not None, "no table of races")
+        temp = table.find("div.main")
+        expect(temp is not None, "no title of the match")
+        title = temp.text()
+        thematch: Match = Match(code=entity_code, date=datetime.strptime(title.split("（")[0].strip(), "%Y年%m月%d日"), name=title.split("）")[-1].strip())
+
+        rows = table.find_all("tbody tr")
+        thematch.number_races_in_match = len(rows)
+        for race_tag in rows:
+            cells = race_tag.cells()
+            race_link = cells["race_num"].find("a").get("href") if ("race_num" in cells) and cells["race_num"].find("a") else None
+            odds_link = cells["odds"].find("a") if "odds" in cells else None
+            expect(("race_name" in cells) and (race_link is not None) and (odds_link is not None) and (odds_link.get("onclick") is not None),
+                   f"a row of a race is not as expected: {race_tag.inner}")
+            race_name = cells["race_name"].text()
+            race_code = extract_cname_code(race_link)
+            links_of_races.append(CodeNameLinkAction(thetype=DataType.RACE, code=race_code, name=race_name, link=race_link))
+            thematch._races[race_code] = race_name
+            odds_action = odds_link.get("onclick")
+            links_of_odds.append(CodeNameLinkAction(thetype=DataType.ODDS_TAN, code=extract_doaction_code(odds_action), name=race_name, action=odds_action))
+
         parse_result.entity = thematch
         parse_result.links[DataType.RACE] = links_of_races
         parse_result.links[DataType.ODDS_TAN] = links_of_odds
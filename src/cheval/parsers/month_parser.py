@@ -2,16 +2,18 @@
 
 from typing import List
 
-from bs4 import BeautifulSoup
 from bs4.element import Tag
 
 from ..utils.misc import extract_doaction_code
 from ..models.models import CodeNameLinkAction, DataType, Month
 from .base import BaseParser, ParseResult
+from .selectors import Regions
+from .fast_path import Element, expect
 
 class MonthParser(BaseParser):
     data_type = DataType.MONTH
     parser_name = data_type.value
+    regions = Regions("div.past_result_line_unit")
 
     def _parse_impl(self, html: str, entity_code: str = None, entity_name: str = None, father_entity_code: str = None) -> ParseResult[None]:
         """read the html string of a match list, and save the informations"""
@@ -19,10 +21,10 @@ class MonthParser(BaseParser):
         links_of_matches: List[CodeNameLinkAction] = []
         parse_result = ParseResult[Month]()
 
-        soup = BeautifulSoup(html, "html.parser")
+        soup = self.make_soup(html)
 
         # read the table of matches
-        temps: List[Tag] = list(soup.select("div.past_result_line_unit div.link_list.multi.div3.mid.center.narrow a"))
+        temps: List[Tag] = list(self.select("matches", soup))
         for thematch in temps:
             name = thematch.get_text(strip=True)
             action = str(thematch["onclick"])
@@ -34,4 +36,23 @@ class MonthParser(BaseParser):
         parse_result.entity = month
         parse_result.links[DataType.MATCH] = links_of_matches
 
+        return parse_result
+
+    def _parse_fast(self, html: str, entity_code: str = None, entity_name: str = None, father_entity_code: str = None) -> ParseResult[Month]:
+        """read the links of the matches from the html string without building a tree"""
+
+        links_of_matches: List[CodeNameLinkAction] = []
+        parse_result = ParseResult[Month]()
+
+        units = Element.page(html).find_all("div.past_result_line_unit")
+        expect(len(units) > 0, "no day of matches")
+        for unit in units:
+            for thematch in unit.find_all("div.link_list.multi.div3.mid.center.narrow a"):
+                action = thematch.get("onclick")
+                code = extract_doaction_code(action) if action is not None else None
+                expect(code is not None, f"no code of the match in {thematch.inner}")
+                links_of_matches.append(CodeNameLinkAction(thetype=DataType.MATCH, code=code, name=thematch.text(), action=action))
+
+        parse_result.entity = Month(code=entity_code, number_races=len(links_of_matches))
+        parse_result.links[DataType.MATCH] = links_of_matches
         return parse_result
\ No newline at end of file
@@ -4,16 +4,18 @@ import re
 from datetime import datetime
 from typing import Dict, List
 
-from bs4 import BeautifulSoup
 from bs4.element import Tag
 
 from ..utils.misc import parse_float, parse_int
 from ..models.models import Horse, ResultOfHorse, DataType, CodeNameLinkAction, OddsTan
 from .base import BaseParser, ParseResult
+from .selectors import Regions
+from .fast_path import Element, expect
 
 class OddsTanParser(BaseParser):
     data_type = DataType.ODDS_TAN
     parser_name = data_type.value
+    regions = Regions("table.tanpuku")
 
     """
     def __init__(self):
@@ -23,20 +25,38 @@ class OddsTanParser(BaseParser):
     def _parse_impl(self, html: str, entity_code: str = None, entity_name: str = None, father_entity_code: str = None):
         """read the html string of a horse page"""
 
-        soup = BeautifulSoup(html, "html.parser")
+        soup = self.make_soup(html)
         parse_result = ParseResult[OddsTan]()
 
         odds_tan = OddsTan(code=entity_code)
 
         # read the odds of horses
-        temp = soup.select_one("table.basic.narrow-xy.tanpuku tbody")
+        temp = self.select_one("table", soup)
         #print(temp.prettify())
-        temps: List[Tag] = list(temp.select("tr"))
+        temps: List[Tag] = list(self.select("rows", temp))
         for temp in temps:
-            num = parse_int(temp.select_one("td.num").get_text(strip=True))
-            odds = parse_float(temp.select_one("td.odds_tan").get_text(strip=True))
+            num = parse_int(self.select_one("num", temp).get_text(strip=True))
+            odds = parse_float(self.select_one("odds", temp).get_text(strip=True))
             odds_tan.odds[num] = odds
 
         parse_result.entity = odds_tan
         return parse_result
 
+    def _parse_fast(self, html: str, entity_code: str = None, entity_name: str = None, father_entity_code: str = None) -> ParseResult[OddsTan]:
+        """read the odds of the horses from the html string without building a tree"""
+
+        parse_result = ParseResult[OddsTan]()
+        odds_tan = OddsTan(code=entity_code)
+
+        table = Element.page(html).find("table.basic.narrow-xy.tanpuku tbody")
+        expect(table is not None, "no table of odds")
+        for row in table.find_all("tr"):
+            cells = row.cells()
+            expect(("num" in cells) and ("odds_tan" in cells), f"a row of odds is not as expected: {row.inner}")
+            num = parse_int(cells["num"].text())
+            expect(num is not None, f"no number of the horse in {row.inner}")
+            odds_tan.odds[num] = parse_float(cells["odds_tan"].text())
+
+        parse_result.entity = odds_tan
+        return parse_result
+
@@ -1,5 +1,7 @@
 # parsers.py
 
+from typing import Optional
+
 from .month_parser import MonthParser
 from .match_parser import MatchParser
 from .race_parser import RaceParser
@@ -7,16 +9,41 @@ from .horse_parser import HorseParser
 from .jockey_parser import JockeyParser, JockeySummaryParser
 from .trainer_parser import TrainerParser, TrainerSummaryParser
 from .odds_tan_parser import OddsTanParser
+from .base import BaseParser
+from ..storage.archive_writer import flush_archive_writers
+from ..models.models import DataType
 
 class Parsers:
 
-    def __init__(self):
-        self.month = MonthParser()
-        self.match = MatchParser()
-        self.race = RaceParser()
-        self.odds_tan = OddsTanParser()
-        self.horse = HorseParser()
-        self.jockey = JockeyParser()
-        self.joceky_summary = JockeySummaryParser()
-        self.trainer = TrainerParser()
-        self.trainer_summary = TrainerSummaryParser()
\ No newline at end of file
+    def __init__(self, backend: Optional[str] = None, regions_only: Optional[bool] = None, fast_path: Optional[bool] = None):
+        """backend, regions_only and fast_path: for all the parsers, see BaseParser"""
+        self.month = MonthParser(backend, regions_only, fast_path)
+        self.match = MatchParser(backend, regions_only, fast_path)
+        self.race = RaceParser(backend, regions_only, fast_path)
+        self.odds_tan = OddsTanParser(backend, regions_only, fast_path)
+        self.horse = HorseParser(backend, regions_only, fast_path)
+        self.jockey = JockeyParser(backend, regions_only, fast_path)
+        self.joceky_summary = JockeySummaryParser(backend, regions_only, fast_path)
+        self.trainer = TrainerParser(backend, regions_only, fast_path)
+        self.trainer_summary = TrainerSummaryParser(backend, regions_only, fast_path)
+
+    def by_type(self, data_type: DataType) -> BaseParser:
+        """Get the parser of a type of page"""
+        mapping = {
+            DataType.MONTH: self.month,
+            DataType.MATCH: self.match,
+            DataType.RACE: self.race,
+            DataType.ODDS_TAN: self.odds_tan,
+            DataType.HORSE: self.horse,
+            DataType.JOCKEY: self.jockey,
+            DataType.JOCKEY_SUMMARY: self.joceky_summary,
+            DataType.TRAINER: self.trainer,
+            DataType.TRAINER_SUMMARY: self.trainer_summary,
+        }
+        if data_type not in mapping:
+            raise ValueError(f"No parser for the type of page: {data_type}")
+        return mapping[data_type]
+
+    def flush(self):
+        """Wait until the pages queued for the archive by the parsers are written"""
+        flush_archive_writers()
@@ -2,18 +2,22 @@
 
 import re
 from datetime import datetime
-from typing import List
+from html import unescape as html_unescape
+from typing import List, Optional
 
-from bs4 import BeautifulSoup
 from bs4.element import Tag
 
 from ..utils.misc import extract_cname_code, extract_doaction_code, parse_float, parse_int, parse_minsec
 from ..models.models import Race, Prize, ResultOfRace, CodeNameLinkAction, DataType
 from .base import BaseParser, ParseResult
+from .selectors import Regions
+from .table import row_cells, first_tag, find_tags, cell_text, cell_tag
+from .fast_path import Element, expect, has_class
 
 class RaceParser(BaseParser):
     data_type = DataType.RACE
     parser_name = data_type.value
+    regions = Regions("div.race_header", "table.striped")
 
     def _parse_impl(self, html: str, entity_code: str = None, entity_name: str = None, father_entity_code: str = None):
         """read the html string of a race, and save the informations"""
@@ -23,14 +27,14 @@ class RaceParser(BaseParser):
         links_of_trainers: List[CodeNameLinkAction] = []
         parse_result = ParseResult[Race]()
 
-        soup = BeautifulSoup(html, "html.parser")
+        soup = self.make_soup(html)
 
         # read the date
-        temp = soup.select_one("div.race_header div.date_line div.cell.date")
+        temp = self.select_one("date", soup)
         date = datetime.strptime(temp.get_text(strip=True).split("（")[0], "%Y年%m月%d日") if temp else None
 
         # read the start time
-        temp = soup.select_one("div.race_header div.date_line div.cell.time strong")
+        temp = self.select_one("time", soup)
         if temp is None:
             time = None
         else:
@@ -39,170 +43,74 @@ class RaceParser(BaseParser):
             time = date.replace(hour=int(hour), minute=int(minute))
 
         # read the weather
-        temp = soup.select_one("div.race_header li.weather span.txt")
+        temp = self.select_one("weather", soup)
         weather = temp.get_text(strip=True) if temp else None
 
         # read the condition of the surface
         # some race has two surfaces and two conditions
-        temp = soup.select_one("div.race_header li.turf span.txt")
+        temp = self.select_one("turf", soup)
         turf_condition = temp.get_text(strip=True) if temp else None
-        temp = soup.select_one("div.race_header li.durt span.txt")
+        temp = self.select_one("dirt", soup)
         dirt_condition = temp.get_text(strip=True) if temp else None
         
         # read the index of the race
-        temp = soup.select_one("div.race_header div.race_title div.race_number img[alt]")
+        temp = self.select_one("index", soup)
         index = parse_int(str(temp.get("alt")).replace("レース", "")) if temp else None
         
         # read the title of the race
-        temp = soup.select_one("div.race_header div.race_title span.race_name")
+        temp = self.select_one("title", soup)
         title = temp.get_text(strip=True) if temp else None
         if title == entity_name:
             title = ""
         
         # read the category of the race
-        temp = soup.select_one("div.race_header div.race_title div.cell.category")
+        temp = self.select_one("category", soup)
         category = temp.get_text(strip=True) if temp else None
 
         # read the class of the race
-        temp = soup.select_one("div.race_header div.race_title div.cell.class")
+        temp = self.select_one("class", soup)
         theclass = temp.get_text(strip=True) if temp else None
 
         # read the rule of the race
-        temp = soup.select_one("div.race_header div.race_title div.cell.rule")
+        temp = self.select_one("rule", soup)
         rule = temp.get_text(strip=True) if temp else None
 
         # read the weight of the race
-        temp = soup.select_one("div.race_header div.race_title div.cell.weight")
+        temp = self.select_one("weight", soup)
         weight = temp.get_text(strip=True) if temp else None
 
         # read the detail of the course
-        temp = soup.select_one("div.race_header div.race_title div.cell.course span.detail")
+        temp = self.select_one("course_detail", soup)
         course_detail = re.sub("（|）", "", temp.get_text(strip=True)) if temp else None
         surface = course_detail.split("・")[0] if course_detail else None
 
         # read the distance and its unit of the race
-        temp = soup.select_one("div.race_header div.race_title div.cell.course")
+        temp = self.select_one("course", soup)
         distance = int(''.join(temp.find_all(text=True, recursive=False)).strip().replace(",", "")) if temp else None
-        temp = temp.select_one("span.unit")
+        temp = self.select_one("unit", temp)
         distance_unit = temp.get_text(strip=True) if temp else None
         
         # read the prizes of the race
         # some races have more than one lists of prizes
-        temps: List[Tag] = list(soup.select("div.race_header ul.prize div.prize_unit"))
+        temps: List[Tag] = list(self.select("prizes", soup))
         prize_list: List[Prize] = []
         for prize_tag in temps:
-            temp = prize_tag.select_one("div.cell.cap")
+            temp = self.select_one("prize_name", prize_tag)
             prize_name = temp.get_text(strip=True) if temp else None
-            temp = prize_tag.select_one("span.unit")
+            temp = self.select_one("unit", prize_tag)
             prize_unit = temp.get_text(strip=True) if temp else None
             prize_name = prize_name.replace(prize_unit, "") if prize_unit else None
             prize_unit = re.sub("（|）", "", prize_unit) if prize_unit else None
-            prize_data = [parse_float(num.get_text(strip=True).replace(",", "")) for num in prize_tag.select("span.num")]
+            prize_data = [parse_float(num.get_text(strip=True).replace(",", "")) for num in self.select("prize_nums", prize_tag)]
             race_prize = Prize(name=prize_name, unit=prize_unit, data=prize_data)
             prize_list.append(race_prize)
 
         # read the result of every horse in the race
-        temps: List[Tag] = list(soup.select('table.basic.narrow-xy.striped tbody tr'))
+        temps: List[Tag] = list(self.select("results", soup))
         number_horses_in_race = len(temps)
         result_list: List[ResultOfRace] = []
         for result_tag in temps:
-            # 着順, or "place" called by the html
-            # special values: '失格', '中止', '除外', '取消'
-            temp = result_tag.select_one("td.place")
-            arrival_order_str = temp.get_text(strip=True) if temp else None
-            # 枠
-            temp = result_tag.select_one("td.waku img[alt]")
-            if temp is None:
-                waku = None
-                waku_color = None
-            else:
-                temp_str = str(temp.get("alt"))
-                waku_str = str(re.findall("\d+", temp_str)[0])
-                waku = parse_int(waku_str)
-                waku_color = temp_str.replace("枠", "").replace(waku_str, "")
-            # 馬番
-            temp = result_tag.select_one("td.num")
-            num = parse_int(temp.get_text(strip=True))
-            # 馬名, its code and link
-            temp = result_tag.select_one("td.horse a")
-            horse_name = temp.get_text(strip=True) if temp else None
-            if temp and ("href" in temp.attrs):
-                horse_link = str(temp["href"])
-                horse_code = extract_cname_code(horse_link)
-                links_of_horses.append(CodeNameLinkAction(thetype=DataType.HORSE, code=horse_code, name=horse_name, link=horse_link))
-            else:
-                horse_link = None
-                horse_code = None
-            # 性齢
-            temp = result_tag.select_one("td.age")
-            sex_and_age = temp.get_text(strip=True) if temp else None
-            # 負担重量
-            temp = result_tag.select_one("td.weight")
-            weight = parse_float(temp.get_text(strip=True)) if temp else None
-            # 騎手名 and his/her code, the code may not exist
-            temp = result_tag.select_one("td.jockey a")
-            jockey_name = temp.get_text(strip=True) if temp else None
-            if temp and ("onclick" in temp.attrs):
-                jockey_code = extract_doaction_code(temp["onclick"])
-                jockey_action = temp["onclick"]
-                #jockey_action = temp["onclick"].replace("return ", "")
-                links_of_jockeys.append(CodeNameLinkAction(thetype=DataType.JOCKEY, code=jockey_code, name=jockey_name, action=jockey_action))
-            else:
-                jockey_code = None
-                jockey_action = None
-            # タイム, the value in html may be an empty string
-            temp = result_tag.select_one("td.time")
-            time_for_race_result = parse_minsec(temp.get_text(strip=True)) if temp else None
-            # 着差
-            margin = result_tag.select_one("td.margin").get_text(strip=True)
-            # コーナー通過順位, the values in html may be empty strings
-            corner_list_tags: List[Tag] = list(result_tag.select("div.corner_list li"))
-            corner_list = [parse_int(li.get_text(strip=True)) for li in corner_list_tags]
-            #temp = result_tag.select("div.corner_list li")
-            #corner_list = [int(li.get_text(strip=True)) if li.get_text(strip=True) else None for li in temp]
-            # 平均1F or 推定上り, the value in html may be an empty string
-            temp = result_tag.select_one("td.f_time")
-            f_time = parse_float(temp.get_text(strip=True)) if temp else None
-            # 馬体重（増減）, the value of 増減 in html may be empty
-            temp = result_tag.select_one("td.h_weight")
-            if temp is None:
-                horse_weight = None
-                horse_weight_delta = None
-            else:
-                horse_weight = parse_float(temp.contents[0]) if len(temp.contents) > 0 else None
-                horse_weight_delta = parse_float(re.sub("\(|\)", "", temp.contents[1].text)) if len(temp.contents) > 1 else None
-            '''
-            horse_weight = temp.contents[0]
-            try:
-                horse_weight = float(horse_weight)
-            except:
-                horse_weight = None #BasicInfo.Result.HORSE_WEIGHT_EMPTY
-            try:
-                horse_weight_delta = float(re.sub("\(|\)", "", temp.contents[1].text))
-            except:
-                horse_weight_delta = None #BasicInfo.Result.HORSE_WEIGHT_DELTA_EMPTY
-            '''
-            # 調教師名 and his/her code, the code may not exist
-            temp = result_tag.select_one("td.trainer a")
-            trainer_name = temp.get_text(strip=True) if temp else None
-            if temp and ("onclick" in temp.attrs):
-                trainer_code = extract_doaction_code(temp["onclick"])
-                trainer_action = temp["onclick"]
-                links_of_trainers.append(CodeNameLinkAction(thetype=DataType.TRAINER, code=trainer_code, name=trainer_name, action=trainer_action))
-            else:
-                trainer_code = None
-                trainer_action = None
-            # 単勝人気, the value in html may be an empty string
-            temp = result_tag.select_one("td.pop")
-            pop = parse_int(temp.get_text(strip=True)) if temp else None
-            # ブリンカー
-            blinker = True if result_tag.select_one("td.horse div.icon.blinker") else False
-            # icon, 馬に付く記号
-            temp = result_tag.select_one("td.horse span.horse_icon img[alt]")
-            horse_icon = temp["alt"] if temp else None
-
-            race_result: ResultOfRace = ResultOfRace(race_code=entity_code, arrival_order_str=arrival_order_str, waku=waku, waku_color=waku_color, num=num, horse_code=horse_code, horse_name=horse_name, horse_icon=horse_icon, blinker=blinker, sex_and_age=sex_and_age, weight=weight, jockey_code=jockey_code, jockey_name=jockey_name, time=time_for_race_result, margin=margin, f_time=f_time, horse_weight=horse_weight, horse_weight_delta=horse_weight_delta, trainer_code=trainer_code, trainer_name=trainer_name, pop=pop, _corner_list=corner_list)
-            result_list.append(race_result)
+            result_list.append(self._read_result(result_tag, entity_code, links_of_horses, links_of_jockeys, links_of_trainers))
 
         race: Race = Race(code=entity_code, match_code=father_entity_code, name=entity_name, title=title, index=index, distance=distance, distance_unit=distance_unit, surface=surface, number_horses_in_race=number_horses_in_race, time=time, weather=weather, turf_condition=turf_condition, dirt_condition=dirt_condition, category=category, theclass=theclass, rule=rule, weight=weight, course_detail=course_detail, _prize_list=prize_list, _result_list=result_list)
 
@@ -210,4 +118,232 @@ class RaceParser(BaseParser):
         parse_result.links[DataType.HORSE] = links_of_horses
         parse_result.links[DataType.JOCKEY] = links_of_jockeys
         parse_result.links[DataType.TRAINER] = links_of_trainers
-        return parse_result
\ No newline at end of file
+        return parse_result
+
+    def _parse_fast(self, html: str, entity_code: str = None, entity_name: str = None, father_entity_code: str = None) -> ParseResult[Race]:
+        """read the html string of a race without building a tree, the same as _parse_impl"""
+
+        links_of_horses: List[CodeNameLinkAction] = []
+        links_of_jockeys: List[CodeNameLinkAction] = []
+        links_of_trainers: List[CodeNameLinkAction] = []
+        parse_result = ParseResult[Race]()
+
+        page = Element.page(html)
+        header = page.find("div.race_header")
+        expect(header is not None, "no header of the race")
+
+        def read(selector: str, class_name: str) -> Optional[Element]:
+            # a tag missing from the header must not be a tag the selector fails to find
+            temp = header.find(selector)
+            expect((temp is not None) or (not has_class(header.inner, class_name)), f"{selector} is not as expected")
+            return temp
+
+        def read_text(selector: str, class_name: str) -> Optional[str]:
+            temp = read(selector, class_name)
+            return temp.text() if temp else None
+
+        temp = read("div.date_line div.cell.date", "date")
+        date = datetime.strptime(temp.text().split("（")[0], "%Y年%m月%d日") if temp else None
+        temp = read("div.date_line div.cell.time strong", "time")
+        if temp is None:
+            time = None
+        else:
+            [hour, minute] = temp.text().replace("分", "").split("時")
+            time = date.replace(hour=int(hour), minute=int(minute))
+        weather = read_text("li.weather span.txt", "weather")
+        turf_condition = read_text("li.turf span.txt", "turf")
+        dirt_condition = read_text("li.durt span.txt", "durt")
+        temp = read("div.race_title div.race_number img", "race_number")
+        index = parse_int(str(temp.get("alt")).replace("レース", "")) if temp and (temp.get("alt") is not None) else None
+        title = read_text("div.race_title span.race_name", "race_name")
+        if title == entity_name:
+            title = ""
+        category = read_text("div.race_title div.cell.category", "category")
+        theclass = read_text("div.race_title div.cell.class", "class")
+        rule = read_text("div.race_title div.cell.rule", "rule")
+        weight = read_text("div.race_title div.cell.weight", "weight")
+        temp = read("div.race_title div.cell.course span.detail", "detail")
+        course_detail = re.sub("（|）", "", temp.text()) if temp else None
+        surface = course_detail.split("・")[0] if course_detail else None
+        temp = read("div.race_title div.cell.course", "course")
+        distance = int(temp.own_text().strip().replace(",", "")) if temp else None
+        temp = temp.find("span.unit") if temp else None
+        distance_unit = temp.text() if temp else None
+
+        prize_list: List[Prize] = []
+        for prize_tag in header.find_all("ul.prize div.prize_unit"):
+            temp = prize_tag.find("div.cell.cap")
+            prize_name = temp.text() if temp else None
+            temp = prize_tag.find("span.unit")
+            prize_unit = temp.text() if temp else None
+            prize_name = prize_name.replace(prize_unit, "") if prize_unit else None
+            prize_unit = re.sub("（|）", "", prize_unit) if prize_unit else None
+            prize_data = [parse_float(num.text().replace(",", "")) for num in prize_tag.find_all("span.num")]
+            prize_list.append(Prize(name=prize_name, unit=prize_unit, data=prize_data))
+
+        rows = page.find_all("table.basic.narrow-xy.striped tbody tr")
+        expect(len(rows) > 0, "no results of the race")
+        result_list: List[ResultOfRace] = [self._read_result_fast(row, entity_code, links_of_horses, links_of_jockeys, links_of_trainers) for row in rows]
+
+        race: Race = Race(code=entity_code, match_code=father_entity_code, name=entity_name, title=title, index=index, distance=distance, distance_unit=distance_unit, surface=surface, number_horses_in_race=len(rows), time=time, weather=weather, turf_condition=turf_condition, dirt_condition=dirt_condition, category=category, theclass=theclass, rule=rule, weight=weight, course_detail=course_detail, _prize_list=prize_list, _result_list=result_list)
+
+        parse_result.entity = race
+        parse_result.links[DataType.HORSE] = links_of_horses
+        parse_result.links[DataType.JOCKEY] = links_of_jockeys
+        parse_result.links[DataType.TRAINER] = links_of_trainers
+        return parse_result
+
+    @staticmethod
+    def _read_result_fast(row: Element, race_code: str, links_of_horses: List[CodeNameLinkAction],
+                          links_of_jockeys: List[CodeNameLinkAction], links_of_trainers: List[CodeNameLinkAction]) -> ResultOfRace:
+        """read the result of a horse from its row of the table without building a tree, the same as _read_result"""
+        cells = row.cells()
+        expect(("place" in cells) and ("num" in cells) and ("horse" in cells), f"a row of results is not as expected: {row.inner}")
+
+        def first(name: str, selector: str, attribute: Optional[str] = None) -> Optional[Element]:
+            found = cells[name].find_all(selector) if name in cells else []
+            return next((tag for tag in found if (attribute is None) or (tag.get(attribute) is not None)), None)
+
+        def read_text(name: str) -> Optional[str]:
+            return cells[name].text() if name in cells else None
+
+        arrival_order_str = read_text("place")
+        temp = first("waku", "img", "alt")
+        if temp is None:
+            waku = None
+            waku_color = None
+        else:
+            temp_str = temp.get("alt")
+            waku_str = str(re.findall(r"\d+", temp_str)[0])
+            waku = parse_int(waku_str)
+            waku_color = temp_str.replace("枠", "").replace(waku_str, "")
+        num = parse_int(read_text("num"))
+        temp = first("horse", "a")
+        horse_name = temp.text() if temp else None
+        if temp and (temp.get("href") is not None):
+            horse_link = temp.get("href")
+            horse_code = extract_cname_code(horse_link)
+            links_of_horses.append(CodeNameLinkAction(thetype=DataType.HORSE, code=horse_code, name=horse_name, link=horse_link))
+        else:
+            horse_code = None
+        sex_and_age = read_text("age")
+        temp = read_text("weight")
+        weight = parse_float(temp) if temp is not None else None
+        temp = first("jockey", "a")
+        jockey_name = temp.text() if temp else None
+        if temp and (temp.get("onclick") is not None):
+            jockey_code = extract_doaction_code(temp.get("onclick"))
+            links_of_jockeys.append(CodeNameLinkAction(thetype=DataType.JOCKEY, code=jockey_code, name=jockey_name, action=temp.get("onclick")))
+        else:
+            jockey_code = None
+        temp = read_text("time")
+        time_for_race_result = parse_minsec(temp) if temp is not None else None
+        margin = read_text("margin")
+        corner_list = [parse_int(li.text()) for li in row.find_all("div.corner_list li")]
+        temp = read_text("f_time")
+        f_time = parse_float(temp) if temp is not None else None
+        # 馬体重（増減）: the weight as the first string of the cell and the delta in a span after it
+        if "h_weight" not in cells:
+            horse_weight = None
+            horse_weight_delta = None
+        else:
+            temp = re.fullmatch(r"([^<]*)(?:<span>([^<]*)</span>)?", cells["h_weight"].inner)
+            expect((temp is not None) and (temp.group(1) or (temp.group(2) is None)), f"the weight of the horse is not as expected: {row.inner}")
+            horse_weight = parse_float(html_unescape(temp.group(1))) if temp.group(1) else None
+            horse_weight_delta = parse_float(re.sub(r"\(|\)", "", html_unescape(temp.group(2)))) if temp.group(2) is not None else None
+        temp = first("trainer", "a")
+        trainer_name = temp.text() if temp else None
+        if temp and (temp.get("onclick") is not None):
+            trainer_code = extract_doaction_code(temp.get("onclick"))
+            links_of_trainers.append(CodeNameLinkAction(thetype=DataType.TRAINER, code=trainer_code, name=trainer_name, action=temp.get("onclick")))
+        else:
+            trainer_code = None
+        temp = read_text("pop")
+        pop = parse_int(temp) if temp is not None else None
+        blinker = first("horse", "div.icon.blinker") is not None
+        temp = first("horse", "span.horse_icon")
+        temp = next((img for img in temp.find_all("img") if img.get("alt") is not None), None) if temp else None
+        horse_icon = temp.get("alt") if temp else None
+
+        return ResultOfRace(race_code=race_code, arrival_order_str=arrival_order_str, waku=waku, waku_color=waku_color, num=num, horse_code=horse_code, horse_name=horse_name, horse_icon=horse_icon, blinker=blinker, sex_and_age=sex_and_age, weight=weight, jockey_code=jockey_code, jockey_name=jockey_name, time=time_for_race_result, margin=margin, f_time=f_time, horse_weight=horse_weight, horse_weight_delta=horse_weight_delta, trainer_code=trainer_code, trainer_name=trainer_name, pop=pop, _corner_list=corner_list)
+
+    @staticmethod
+    def _read_result(result_tag: Tag, race_code: str, links_of_horses: List[CodeNameLinkAction],
+                     links_of_jockeys: List[CodeNameLinkAction], links_of_trainers: List[CodeNameLinkAction]) -> ResultOfRace:
+        """read the result of a horse from its row of the table, the cells are mapped by class in one pass over the row"""
+        cells = row_cells(result_tag)
+        # 着順, or "place" called by the html
+        # special values: '失格', '中止', '除外', '取消'
+        arrival_order_str = cell_text(cells, "place")
+        # 枠
+        temp = cell_tag(cells, "waku", "img", attr="alt")
+        if temp is None:
+            waku = None
+            waku_color = None
+        else:
+            temp_str = str(temp.get("alt"))
+            waku_str = str(re.findall("\d+", temp_str)[0])
+            waku = parse_int(waku_str)
+            waku_color = temp_str.replace("枠", "").replace(waku_str, "")
+        # 馬番
+        num = parse_int(cell_text(cells, "num"))
+        # 馬名, its code and link
+        temp = cell_tag(cells, "horse", "a")
+        horse_name = temp.get_text(strip=True) if temp else None
+        if temp and ("href" in temp.attrs):
+            horse_link = str(temp["href"])
+            horse_code = extract_cname_code(horse_link)
+            links_of_horses.append(CodeNameLinkAction(thetype=DataType.HORSE, code=horse_code, name=horse_name, link=horse_link))
+        else:
+            horse_code = None
+        # 性齢
+        sex_and_age = cell_text(cells, "age")
+        # 負担重量
+        temp = cell_text(cells, "weight")
+        weight = parse_float(temp) if temp is not None else None
+        # 騎手名 and his/her code, the code may not exist
+        temp = cell_tag(cells, "jockey", "a")
+        jockey_name = temp.get_text(strip=True) if temp else None
+        if temp and ("onclick" in temp.attrs):
+            jockey_code = extract_doaction_code(temp["onclick"])
+            links_of_jockeys.append(CodeNameLinkAction(thetype=DataType.JOCKEY, code=jockey_code, name=jockey_name, action=temp["onclick"]))
+        else:
+            jockey_code = None
+        # タイム, the value in html may be an empty string
+        temp = cell_text(cells, "time")
+        time_for_race_result = parse_minsec(temp) if temp is not None else None
+        # 着差
+        margin = cell_text(cells, "margin")
+        # コーナー通過順位, the values in html may be empty strings
+        corner_list = [parse_int(li.get_text(strip=True)) for corner_tag in find_tags(result_tag, "div", class_="corner_list")
+                       for li in find_tags(corner_tag, "li")]
+        # 平均1F or 推定上り, the value in html may be an empty string
+        temp = cell_text(cells, "f_time")
+        f_time = parse_float(temp) if temp is not None else None
+        # 馬体重（増減）, the value of 増減 in html may be empty
+        temp = cells.get("h_weight")
+        if temp is None:
+            horse_weight = None
+            horse_weight_delta = None
+        else:
+            horse_weight = parse_float(temp.contents[0]) if len(temp.contents) > 0 else None
+            horse_weight_delta = parse_float(re.sub("\(|\)", "", temp.contents[1].text)) if len(temp.contents) > 1 else None
+        # 調教師名 and his/her code, the code may not exist
+        temp = cell_tag(cells, "trainer", "a")
+        trainer_name = temp.get_text(strip=True) if temp else None
+        if temp and ("onclick" in temp.attrs):
+            trainer_code = extract_doaction_code(temp["onclick"])
+            links_of_trainers.append(CodeNameLinkAction(thetype=DataType.TRAINER, code=trainer_code, name=trainer_name, action=temp["onclick"]))
+        else:
+            trainer_code = None
+        # 単勝人気, the value in html may be an empty string
+        temp = cell_text(cells, "pop")
+        pop = parse_int(temp) if temp is not None else None
+        # ブリンカー
+        blinker = cell_tag(cells, "horse", "div", class_="icon blinker") is not None
+        # icon, 馬に付く記号
+        temp = cell_tag(cells, "horse", "span", class_="horse_icon")
+        temp = first_tag(temp, "img", attr="alt") if temp else None
+        horse_icon = temp["alt"] if temp else None
+
+        return ResultOfRace(race_code=race_code, arrival_order_str=arrival_order_str, waku=waku, waku_color=waku_color, num=num, horse_code=horse_code, horse_name=horse_name, horse_icon=horse_icon, blinker=blinker, sex_and_age=sex_and_age, weight=weight, jockey_code=jockey_code, jockey_name=jockey_name, time=time_for_race_result, margin=margin, f_time=f_time, horse_weight=horse_weight, horse_weight_delta=horse_weight_delta, trainer_code=trainer_code, trainer_name=trainer_name, pop=pop, _corner_list=corner_list)
\ No newline at end of file
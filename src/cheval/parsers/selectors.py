@@ -0,0 +1,220 @@
+# selectors.py
+
+import re
+import time
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+import soupsieve
+from bs4.element import Tag
+from bs4.filter import ElementFilter
+
+from ..models.models import DataType
+
+# the CSS selectors of the parsers by type of page and name, the only place to change when the pages of JRA change
+SELECTOR_DEFINITIONS: Dict[DataType, Dict[str, str]] = {
+    DataType.MONTH: {
+        "matches": "div.past_result_line_unit div.link_list.multi.div3.mid.center.narrow a",
+    },
+    DataType.MATCH: {
+        "title": "table.basic.mt20 div.main",
+        "rows": "tbody tr",
+        "race_name": "td.race_name",
+        "race_link": "th.race_num a",
+        "odds_link": "td.odds a",
+    },
+    DataType.RACE: {
+        "date": "div.race_header div.date_line div.cell.date",
+        "time": "div.race_header div.date_line div.cell.time strong",
+        "weather": "div.race_header li.weather span.txt",
+        "turf": "div.race_header li.turf span.txt",
+        "dirt": "div.race_header li.durt span.txt",
+        "index": "div.race_header div.race_title div.race_number img[alt]",
+        "title": "div.race_header div.race_title span.race_name",
+        "category": "div.race_header div.race_title div.cell.category",
+        "class": "div.race_header div.race_title div.cell.class",
+        "rule": "div.race_header div.race_title div.cell.rule",
+        "weight": "div.race_header div.race_title div.cell.weight",
+        "course_detail": "div.race_header div.race_title div.cell.course span.detail",
+        "course": "div.race_header div.race_title div.cell.course",
+        "unit": "span.unit",
+        "prizes": "div.race_header ul.prize div.prize_unit",
+        "prize_name": "div.cell.cap",
+        "prize_nums": "span.num",
+        "results": "table.basic.narrow-xy.striped tbody tr",
+    },
+    DataType.ODDS_TAN: {
+        "table": "table.basic.narrow-xy.tanpuku tbody",
+        "rows": "tr",
+        "num": "td.num",
+        "odds": "td.odds_tan",
+    },
+    DataType.HORSE: {
+        "name": "div.header_line.no-mb span.txt",
+        "name_en": "span.name_en",
+        "rest": "span.rest",
+        "deleted": "div.header_line.no-mb span.inner span.opt span",
+        "profile": "div.profile.mt20 li",
+        "prizes": "div.prize.mt10 li.div2",
+        "dt": "dt",
+        "dd": "dd",
+        "prize_unit": "dd span",
+        "results": "table.basic.narrow-xy.striped",
+        "result_rows": "tbody tr",
+        "result_race": "td.race",
+        "result_columns": "td",
+        "race_link": "a[href]",
+        "jockey_link": "a[onclick]",
+    },
+    DataType.JOCKEY: {
+        "name": "div.header_line.no-mb span.txt",
+        "kana": "span.kana",
+        "retired": "span.retired",
+        "profile": "div.main.mt15 div.profile div.data dl",
+        "dt": "dt",
+        "dd": "dd",
+        "unit": "span.unit",
+        "year_record": "#year_record",
+        "total_record": "#total_record",
+        "summary_link": "div.jockey_menu.mt30 li:has(a:-soup-contains('過去成績')) a",
+    },
+    DataType.TRAINER: {
+        "name": "div.header_line.no-mb span.txt",
+        "kana": "span.kana",
+        "retired": "span.retired",
+        "profile": "div.main.mt15 div.profile div.data dl",
+        "dt": "dt",
+        "dd": "dd",
+        "year_record": "#year_record",
+        "total_record": "#total_record",
+        "summary_link": "div.jockey_menu.mt30 li:has(a:-soup-contains('過去成績')) a",
+    },
+    # the tables of summaries, read on the pages of jockeys and trainers and of their summaries
+    DataType.JOCKEY_SUMMARY: {
+        "tables": "table.basic.narrow.mt15, table.basic.narrow.mt40",
+        "title": "div.main",
+        "rows": "tr",
+        "row_type": "th[scope='row']",
+        "columns": "td",
+    },
+    DataType.TRAINER_SUMMARY: {
+        "tables": "table.basic.narrow.mt15, table.basic.narrow.mt40",
+    },
+}
+
+class CompiledSelector:
+    """A CSS selector compiled once by soupsieve, with the number of times it found something or nothing and the time it took"""
+
+    __slots__ = ("name", "css", "pattern", "hits", "misses", "seconds")
+
+    def __init__(self, name: str, css: str):
+        self.name = name
+        self.css = css
+        self.pattern = soupsieve.compile(css)
+        self.hits = 0
+        self.misses = 0
+        self.seconds = 0.0
+
+    def select_one(self, tag: Tag) -> Optional[Tag]:
+        start = time.perf_counter()
+        found = self.pattern.select_one(tag)
+        self.seconds += time.perf_counter() - start
+        if found is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return found
+
+    def select(self, tag: Tag) -> List[Tag]:
+        start = time.perf_counter()
+        found = self.pattern.select(tag)
+        self.seconds += time.perf_counter() - start
+        if found:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return found
+
+class SelectorRegistry:
+    """
+    The selectors of all parsers, compiled once when the registry is made and shared by every parse,
+    instead of parsing the selector strings again on every page. The counts show the dead and the slow selectors,
+    they are kept per process.
+    """
+
+    def __init__(self, definitions: Dict[DataType, Dict[str, str]] = SELECTOR_DEFINITIONS):
+        self.selectors: Dict[DataType, Dict[str, CompiledSelector]] = {
+            data_type: {name: CompiledSelector(f"{data_type.value}.{name}", css) for name, css in selectors.items()}
+            for data_type, selectors in definitions.items()
+        }
+
+    def get(self, data_type: DataType, name: str) -> CompiledSelector:
+        try:
+            return self.selectors[data_type][name]
+        except KeyError:
+            raise KeyError(f"No selector {name} for the type of page: {data_type}") from None
+
+    def select_one(self, data_type: DataType, name: str, tag: Tag) -> Optional[Tag]:
+        """The first tag inside the tag matched by the selector of the name, None if there is none"""
+        return self.get(data_type, name).select_one(tag)
+
+    def select(self, data_type: DataType, name: str, tag: Tag) -> List[Tag]:
+        """All tags inside the tag matched by the selector of the name"""
+        return self.get(data_type, name).select(tag)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """the hits, misses and seconds of every selector by its full name, the slowest first"""
+        selectors = [selector for by_name in self.selectors.values() for selector in by_name.values()]
+        return {selector.name: {"hits": selector.hits, "misses": selector.misses, "seconds": selector.seconds}
+                for selector in sorted(selectors, key=lambda selector: selector.seconds, reverse=True)}
+
+    def dead(self) -> List[str]:
+        """the selectors which have been used and have never found anything"""
+        return [name for name, counts in self.stats().items() if counts["misses"] and not counts["hits"]]
+
+    def reset(self):
+        for by_name in self.selectors.values():
+            for selector in by_name.values():
+                selector.hits = selector.misses = 0
+                selector.seconds = 0.0
+
+SELECTORS = SelectorRegistry()
+
+def simple_selector(selector: str) -> Tuple[Optional[str], Optional[str], FrozenSet[str]]:
+    """the tag name, the id and the classes of a simple selector like "div.cell.date" or "#year_record", None if not given"""
+    match = re.fullmatch(r"([\w-]*)((?:[#.][\w-]+)*)", selector)
+    if (match is None) or (not selector):
+        raise ValueError(f"Not a simple selector: {selector}")
+    parts = re.findall(r"([#.])([\w-]+)", match.group(2))
+    ids = [value for kind, value in parts if kind == "#"]
+    return match.group(1) or None, ids[0] if ids else None, frozenset(value for kind, value in parts if kind == ".")
+
+class Regions(ElementFilter):
+    """
+    The regions of a page which a parser needs, as simple selectors of a tag name, an #id and .classes, like "div.profile".
+    Given to BeautifulSoup as parse_only, a tag which matches a region is built with its whole subtree, and the rest
+    of the page (head, navigation, footer...) is skipped without building any tag, so the selectors of the parser
+    must find everything inside the regions.
+    """
+
+    def __init__(self, *regions: str):
+        super().__init__()
+        self.regions = regions
+        self._rules: List[Tuple[Optional[str], Optional[str], FrozenSet[str]]] = [simple_selector(region) for region in regions]
+
+    def allow_tag_creation(self, nsprefix: Optional[str], name: str, attrs) -> bool:
+        attrs = attrs or {}
+        classes = attrs.get("class") or ()
+        if isinstance(classes, str):
+            classes = classes.split()
+        for tag_name, tag_id, tag_classes in self._rules:
+            if (((tag_name is None) or (name == tag_name)) and ((tag_id is None) or (attrs.get("id") == tag_id))
+                    and tag_classes.issubset(classes)):
+                return True
+        return False
+
+    def allow_string_creation(self, string: str) -> bool:
+        # the strings outside the regions
+        return False
+
+    def __repr__(self) -> str:
+        return f"Regions{self.regions}"
@@ -0,0 +1,43 @@
+# table.py
+
+from typing import Dict, List, Optional
+
+from bs4.element import Tag
+
+def row_cells(row: Tag) -> Dict[str, Tag]:
+    """Map the cells of a table row by their classes in one pass over the row, the first cell of a class is kept"""
+    cells: Dict[str, Tag] = {}
+    for cell in row.contents:
+        if isinstance(cell, Tag) and (cell.name in ("td", "th")):
+            for name in cell.get("class") or ():
+                cells.setdefault(name, cell)
+    return cells
+
+def _is_tag(node, name: str, class_: Optional[str], attr: Optional[str]) -> bool:
+    return (isinstance(node, Tag) and (node.name == name)
+            and ((class_ is None) or set(class_.split()).issubset(node.get("class") or ()))
+            and ((attr is None) or (attr in node.attrs)))
+
+def first_tag(tag: Tag, name: str, class_: Optional[str] = None, attr: Optional[str] = None) -> Optional[Tag]:
+    """
+    The first tag inside a tag by its name, and the classes it has (separated by spaces) and the attribute it has if they are given.
+    A plain walk of the small subtree of a cell, without the matching machinery of find or select.
+    """
+    for node in tag.descendants:
+        if _is_tag(node, name, class_, attr):
+            return node
+    return None
+
+def find_tags(tag: Tag, name: str, class_: Optional[str] = None, attr: Optional[str] = None) -> List[Tag]:
+    """all the tags inside a tag by its name, the classes and the attribute, see first_tag"""
+    return [node for node in tag.descendants if _is_tag(node, name, class_, attr)]
+
+def cell_text(cells: Dict[str, Tag], name: str) -> Optional[str]:
+    """the stripped text of the cell of a class, None if the row has no such cell"""
+    cell = cells.get(name)
+    return cell.get_text(strip=True) if cell is not None else None
+
+def cell_tag(cells: Dict[str, Tag], name: str, tag_name: str, class_: Optional[str] = None, attr: Optional[str] = None) -> Optional[Tag]:
+    """the first tag inside the cell of a class, see first_tag, None if there is none"""
+    cell = cells.get(name)
+    return first_tag(cell, tag_name, class_=class_, attr=attr) if cell is not None else None
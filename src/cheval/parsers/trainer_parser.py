@@ -4,17 +4,18 @@ import re
 from datetime import datetime
 from typing import Dict, List, Optional
 
-from bs4 import BeautifulSoup
 from bs4.element import Tag
 
 from ..models.models import Trainer, SummaryOfJockeyTrainer, DataType, CodeNameLinkAction
 from ..utils.misc import extract_doaction_code
 from .base import BaseParser, ParseResult
+from .selectors import Regions
 from .jockey_parser import JockeyParser
 
 class TrainerParser(BaseParser):
     data_type = DataType.TRAINER
     parser_name = data_type.value
+    regions = Regions("div.header_line", "div.main.mt15")
 
     """
     def __init__(self):
@@ -24,23 +25,23 @@ class TrainerParser(BaseParser):
     def _parse_impl(self, html: str, entity_code: str = None, entity_name: str = None, father_entity_code: str = None):
         """read the html string of a trainer page"""
 
-        soup = BeautifulSoup(html, "html.parser")
+        soup = self.make_soup(html)
         parse_result = ParseResult[Trainer]()
 
         # read the name of trainer
-        temp = soup.select_one("div.header_line.no-mb span.txt")
-        name_kana = temp.select_one("span.kana").get_text(strip=True)
+        temp = self.select_one("name", soup)
+        name_kana = self.select_one("kana", temp).get_text(strip=True)
         name = temp.get_text(strip=True).replace("調教師情報", "").replace(name_kana, "")
         name_kana = name_kana.replace("（", "").replace("）", "")
-        retired = True if temp.select_one("span.retired") else False
+        retired = True if self.select_one("retired", temp) else False
         if retired:
             name = name.replace("引退", "", 1)
 
         # read the table of baisc informations
-        temp = soup.select("div.main.mt15 div.profile div.data dl")
+        temp = self.select("profile", soup)
         for term in temp:
-            key = term.select_one("dt").get_text(strip=True)
-            value = term.select_one("dd")
+            key = self.select_one("dt", term).get_text(strip=True)
+            value = self.select_one("dd", term)
             match key:
                 case "生年月日":
                     birth_date = datetime.strptime(value.get_text(strip=True), "%Y年%m月%d日")
@@ -56,21 +57,21 @@ class TrainerParser(BaseParser):
                     first_victory = value.get_text(strip=True)
 
         # read the table of year_record 本年成績
-        temp = soup.select_one("#year_record")
+        temp = self.select_one("year_record", soup)
         if temp is not None:
             summary_this_year = self._read_summary_table(tag=temp, jockey_trainer_code=entity_code) if temp else []
         else:
             summary_this_year = []
 
         # read the table of year_record 累計成績
-        temp = soup.select_one("#total_record")
+        temp = self.select_one("total_record", soup)
         if temp is not None:
             summary_total = self._read_summary_table(temp, jockey_trainer_code=entity_code) if temp else []
         else:
             summary_total = []
 
         # link to 過去成績
-        temp = soup.select_one("div.jockey_menu.mt30 li:has(a:-soup-contains('過去成績')) a")
+        temp = self.select_one("summary_link", soup)
         summary_action = temp["onclick"]
         summary_code = extract_doaction_code(summary_action)
         parse_result.links[DataType.TRAINER_SUMMARY] = [CodeNameLinkAction(thetype=DataType.TRAINER_SUMMARY, name=entity_name, code=summary_code, action=summary_action)]
@@ -89,6 +90,7 @@ class TrainerParser(BaseParser):
 class TrainerSummaryParser(BaseParser):
     data_type = DataType.TRAINER_SUMMARY
     parser_name = data_type.value
+    regions = Regions("table.narrow")
 
     """
     def __init__(self):
@@ -97,12 +99,12 @@ class TrainerSummaryParser(BaseParser):
 
     def _parse_impl(self, html: str, entity_code: str = None, entity_name: str = None, father_entity_code: str = None):
         """read the html string of a trainer summary page"""
-        soup = BeautifulSoup(html, "html.parser")
+        soup = self.make_soup(html)
 
         results: List[SummaryOfJockeyTrainer] = []
         parse_result = ParseResult[SummaryOfJockeyTrainer]()
 
-        tables = soup.select("table.basic.narrow.mt15, table.basic.narrow.mt40")
+        tables = self.select("tables", soup)
         for table in tables:
             TrainerParser._read_summary_table(tag=table, append_list=results, append=True, summary_code=entity_code, jockey_trainer_code=father_entity_code)
 
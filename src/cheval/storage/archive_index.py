@@ -0,0 +1,140 @@
+# archive_index.py
+
+import json
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import and_, delete, exists, or_
+from sqlalchemy.orm import aliased
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import SQLModel, Session, select
+
+from .sqlite import sqlite_engine
+from ..models.models import DataType, PageSnapshot, PageBlob
+from ..config import EXISTS_CHUNK_SIZE
+
+class ArchiveIndex:
+    """
+    SQLite table of the fetches saved in the archive, one row per fetch: (type, code, fetched_at) -> digest of the html,
+    with the url, the metadata and whether the parser failed on the page, and a table of where the html of every digest
+    is stored in the segments. Every question about the archive is a query here, nothing needs a scan of the files.
+    It lives in the folder of the archive, so the archive can be copied or moved as a whole.
+    """
+
+    def __init__(self, folder: str, filename: str = "archive.db"):
+        """Initialize database connection and engine"""
+        self.engine = sqlite_engine(folder, filename)
+        self.session_factory = Session(bind=self.engine, expire_on_commit=False)
+        self._create_tables()
+
+    def _create_tables(self):
+        """Create the tables of the archive only, and add the columns which an older archive lacks"""
+        SQLModel.metadata.create_all(self.engine, tables=[PageSnapshot.__table__, PageBlob.__table__])
+        with self.engine.begin() as connection:
+            columns = {row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({PageSnapshot.__tablename__})")}
+            for column in PageSnapshot.__table__.columns:
+                if column.name not in columns:
+                    default = " NOT NULL DEFAULT 0" if column.name == "failed" else ""
+                    connection.exec_driver_sql(f"ALTER TABLE {PageSnapshot.__tablename__} ADD COLUMN {column.name} "
+                                               f"{column.type.compile(dialect=self.engine.dialect)}{default}")
+
+    def get_session(self) -> Session:
+        """Obtain database session"""
+        return self.session_factory
+
+    def add(self, page_type: DataType, code: str, digest: Optional[str], fetched_at: Optional[datetime] = None,
+            replace: bool = False, url: Optional[str] = None, meta: Optional[dict] = None, path: Optional[str] = None) -> PageSnapshot:
+        """Record a fetch of a page, with replace the earlier fetches of the page are forgotten"""
+        snapshot = PageSnapshot(page_type=page_type, code=code, digest=digest, fetched_at=fetched_at or datetime.now(),
+                                url=url, meta=json.dumps(meta, ensure_ascii=False, default=str) if meta else None, path=path)
+        with self.get_session() as session:
+            if replace:
+                session.exec(delete(PageSnapshot).where(PageSnapshot.page_type == page_type, PageSnapshot.code == code))
+            session.add(snapshot)
+            session.commit()
+        return snapshot
+
+    def add_many(self, snapshots: List[PageSnapshot]):
+        """Record many fetches in one transaction"""
+        with self.get_session() as session:
+            session.add_all(snapshots)
+            session.commit()
+
+    def mark_failed(self, page_type: DataType, code: str, failed: bool = True) -> bool:
+        """Mark the last fetch of a page as failed by its parser or not, returns False if the page has never been saved"""
+        with self.get_session() as session:
+            stmt = (select(PageSnapshot).where(PageSnapshot.page_type == page_type, PageSnapshot.code == code)
+                    .order_by(PageSnapshot.fetched_at.desc(), PageSnapshot.id.desc()))
+            snapshot = session.exec(stmt).first()
+            if snapshot is None:
+                return False
+            snapshot.failed = failed
+            session.add(snapshot)
+            session.commit()
+            return True
+
+    def latest(self, page_type: Optional[DataType], code: str) -> Optional[PageSnapshot]:
+        """The last fetch of a page, of any type if page_type is None, None if it has never been saved"""
+        found = self.find(page_types=None if page_type is None else [page_type], code=code, latest_only=True)
+        return max(found, key=lambda snapshot: (snapshot.fetched_at, snapshot.id)) if found else None
+
+    def find(self, page_types: Optional[Iterable[DataType]] = None, code: Optional[str] = None,
+             start: Optional[datetime] = None, end: Optional[datetime] = None, failed: Optional[bool] = None,
+             latest_only: bool = False) -> List[PageSnapshot]:
+        """
+        The fetches of the pages which match all the conditions given, in the order they were saved:
+        of the types, of the code, fetched from start until end (not included), failed by their parser or not.
+        If latest_only is True, only the last fetch of every page is taken.
+        """
+        with self.get_session() as session:
+            stmt = select(PageSnapshot)
+            if page_types is not None:
+                stmt = stmt.where(PageSnapshot.page_type.in_(list(page_types)))
+            if code is not None:
+                stmt = stmt.where(PageSnapshot.code == code)
+            if start is not None:
+                stmt = stmt.where(PageSnapshot.fetched_at >= start)
+            if end is not None:
+                stmt = stmt.where(PageSnapshot.fetched_at < end)
+            if failed is not None:
+                stmt = stmt.where(PageSnapshot.failed == failed)
+            if latest_only:
+                newer = aliased(PageSnapshot)
+                stmt = stmt.where(~exists().where(newer.page_type == PageSnapshot.page_type, newer.code == PageSnapshot.code,
+                                                  or_(newer.fetched_at > PageSnapshot.fetched_at,
+                                                      and_(newer.fetched_at == PageSnapshot.fetched_at, newer.id > PageSnapshot.id))))
+            return list(session.exec(stmt.order_by(PageSnapshot.id)).all())
+
+    def snapshots(self, page_types: Optional[Iterable[DataType]] = None, latest_only: bool = True) -> List[PageSnapshot]:
+        """The fetches of the pages of the types, all types by default, only the last fetch of every page if latest_only"""
+        return self.find(page_types=page_types, latest_only=latest_only)
+
+    def indexed_paths(self) -> Set[str]:
+        """the paths of the gzip files which have been indexed"""
+        with self.get_session() as session:
+            return set(session.exec(select(PageSnapshot.path).where(PageSnapshot.path != None)).all())
+
+    def add_blob(self, blob: PageBlob):
+        """Record where the html of a digest is stored, the first record of a digest is kept"""
+        stmt = insert(PageBlob.__table__).values(digest=blob.digest, page_type=blob.page_type, segment=blob.segment,
+                                                 offset=blob.offset, length=blob.length).on_conflict_do_nothing()
+        with self.get_session() as session:
+            session.exec(stmt)
+            session.commit()
+
+    def get_blob(self, digest: str) -> Optional[PageBlob]:
+        with self.get_session() as session:
+            return session.get(PageBlob, digest)
+
+    def get_blobs(self, digests: Iterable[str]) -> Dict[str, PageBlob]:
+        """where the html of the digests are stored, the digests not in the segments are left out"""
+        digests = list(set(digests))
+        blobs: Dict[str, PageBlob] = {}
+        with self.get_session() as session:
+            for i in range(0, len(digests), EXISTS_CHUNK_SIZE):
+                stmt = select(PageBlob).where(PageBlob.digest.in_(digests[i:i + EXISTS_CHUNK_SIZE]))
+                blobs.update((blob.digest, blob) for blob in session.exec(stmt).all())
+        return blobs
+
+    def close(self):
+        self.session_factory.close()
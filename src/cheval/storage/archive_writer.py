@@ -0,0 +1,129 @@
+# archive_writer.py
+
+import atexit
+import inspect
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
+
+from .html_storage import HTMLStorage
+from ..config import ARCHIVE_QUEUE_SIZE
+from ..utils.logging import get_logger
+
+class ArchiveWriter:
+    """
+    Save the pages into the archive from a background thread, so parsing and fetching do not wait on compression or disk.
+    The queue is bounded: when the writer falls behind by max_queue pages, the caller waits for a free slot (backpressure)
+    instead of the pages piling up in memory. The pages are written in the order they were given.
+    """
+
+    def __init__(self, root_dir: str, max_queue: int = ARCHIVE_QUEUE_SIZE, storage_factory: Callable[..., HTMLStorage] = HTMLStorage):
+        self.root_dir = root_dir
+        self.storage_factory = storage_factory
+        self.queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self.number_written = 0
+        self.number_errors = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.peak_depth = 0
+        self.number_blocked = 0
+        self.blocked_seconds = 0.0
+        self._lock = threading.Lock()
+        self.logger = get_logger("cheval.storage.archive_writer")
+        self._thread = threading.Thread(target=self._run, name=f"archive-writer-{os.getpid()}", daemon=True)
+        self._thread.start()
+
+    def save_html(self, **kwargs):
+        """Queue a page to save, with the arguments of HTMLStorage.save_html"""
+        self._put(("save_html", kwargs))
+
+    def mark_failed(self, **kwargs):
+        """Queue a mark of a failed page, with the arguments of HTMLStorage.mark_failed, it follows the save of the page"""
+        self._put(("mark_failed", kwargs))
+
+    def _put(self, item: Tuple[str, Dict[str, Any]]):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            start = time.monotonic()
+            self.queue.put(item)
+            with self._lock:
+                self.number_blocked += 1
+                self.blocked_seconds += time.monotonic() - start
+        with self._lock:
+            self.peak_depth = max(self.peak_depth, self.queue.qsize())
+
+    def _run(self):
+        # the storage is made in the thread which uses it, its sqlite connection stays in this thread
+        storage = self.storage_factory(root_dir=self.root_dir)
+        try:
+            while True:
+                item = self.queue.get()
+                try:
+                    if item is None:
+                        break
+                    method, kwargs = item
+                    start = time.monotonic()
+                    getattr(storage, method)(**kwargs)
+                    latency = time.monotonic() - start
+                    with self._lock:
+                        self.number_written += 1
+                        self.total_latency += latency
+                        self.max_latency = max(self.max_latency, latency)
+                except Exception:
+                    with self._lock:
+                        self.number_errors += 1
+                    self.logger.exception(f"An exception in {inspect.currentframe().f_code.co_name} of {self.__class__}!")
+                    self.logger.exception(f"Information: item={item[0]} {item[1].get('page_type')} {item[1].get('code')}")
+                finally:
+                    self.queue.task_done()
+        finally:
+            storage.close()
+
+    def flush(self):
+        """Wait until every queued page is written"""
+        self.queue.join()
+
+    def close(self):
+        """Write every queued page and stop the thread"""
+        if self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join()
+            self.logger.info(f"Close the archive writer: {self.stats()}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"depth": self.queue.qsize(), "peak_depth": self.peak_depth, "written": self.number_written, "errors": self.number_errors,
+                    "mean_latency": self.total_latency / self.number_written if self.number_written else 0.0,
+                    "max_latency": self.max_latency, "blocked": self.number_blocked, "blocked_seconds": self.blocked_seconds}
+
+# one writer per archive in every process, a process made by fork starts its own
+_writers: Dict[Tuple[int, str], ArchiveWriter] = {}
+_writers_lock = threading.Lock()
+
+def archive_writer(root_dir: str) -> ArchiveWriter:
+    """The writer of an archive in this process, started when it is first used"""
+    key = (os.getpid(), root_dir)
+    with _writers_lock:
+        if key not in _writers:
+            _writers[key] = ArchiveWriter(root_dir=root_dir)
+        return _writers[key]
+
+def flush_archive_writers():
+    """Wait until the pages queued by this process are written"""
+    with _writers_lock:
+        writers = [writer for (pid, _), writer in _writers.items() if pid == os.getpid()]
+    for writer in writers:
+        writer.flush()
+
+def close_archive_writers():
+    """Write the pages queued by this process and stop its writers, run at a clean exit"""
+    with _writers_lock:
+        keys = [key for key in _writers if key[0] == os.getpid()]
+        writers = [_writers.pop(key) for key in keys]
+    for writer in writers:
+        writer.close()
+
+atexit.register(close_archive_writers)
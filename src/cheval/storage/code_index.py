@@ -0,0 +1,112 @@
+# code_index.py
+
+import hashlib
+import math
+from collections import defaultdict
+from typing import Dict, Iterable, Set
+
+from .database import ChevalDB
+from ..models.models import DataType
+from ..config import CODE_INDEX_BLOOM, CODE_INDEX_BLOOM_ERROR_RATE
+from ..utils.logging import get_logger
+
+class BloomFilter:
+    """A Bloom filter of strings: no false negatives, false positives at about error_rate when capacity items are added"""
+
+    def __init__(self, capacity: int, error_rate: float = CODE_INDEX_BLOOM_ERROR_RATE):
+        capacity = max(1, capacity)
+        self.number_bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.number_hashes = max(1, round(self.number_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.number_bits + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.number_bits for i in range(self.number_hashes))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+class CodeIndex:
+    """
+    The codes recorded in the database, loaded once and kept in memory as a set per DataType,
+    so the check of a link costs no query. The inserted entities are added as they are stored,
+    and the hits are counted by the CodeHitCounter of the database, which writes them in batches.
+    With use_bloom, the codes in the database are kept in a Bloom filter per DataType instead, for huge histories,
+    and a positive of the filter is confirmed by a read of the database before it is trusted,
+    one read for all the links of a page when they are confirmed together.
+    """
+
+    def __init__(self, db: ChevalDB, use_bloom: bool = CODE_INDEX_BLOOM, error_rate: float = CODE_INDEX_BLOOM_ERROR_RATE):
+        self.db = db
+        self.use_bloom = use_bloom
+        self.codes: Dict[DataType, Set[str]] = defaultdict(set)
+        self.blooms: Dict[DataType, BloomFilter] = {}
+        # the false positives of the Bloom filters, known to be absent
+        self.absent: Dict[DataType, Set[str]] = defaultdict(set)
+        self.logger = get_logger("cheval.storage.code_index")
+        self._load(error_rate)
+
+    def _load(self, error_rate: float):
+        keys = self.db.get_code_keys()
+        if self.use_bloom:
+            by_type: Dict[DataType, list] = defaultdict(list)
+            for code, datetype in keys:
+                by_type[datetype].append(code)
+            for datetype, codes in by_type.items():
+                bloom = BloomFilter(capacity=2 * len(codes), error_rate=error_rate)
+                for code in codes:
+                    bloom.add(code)
+                self.blooms[datetype] = bloom
+        else:
+            for code, datetype in keys:
+                self.codes[datetype].add(code)
+        self.logger.info(f"Load {len(keys)} code(s) into the index{' (Bloom filters)' if self.use_bloom else ''}")
+
+    def contains(self, code: str, datetype: DataType) -> bool:
+        """Whether the code is recorded, without counting a hit"""
+        if code in self.codes[datetype]:
+            return True
+        bloom = self.blooms.get(datetype)
+        if (bloom is None) or (code in self.absent[datetype]) or (code not in bloom):
+            return False
+        if self.db.exists_code(code=code, datetype=datetype):
+            # confirmed, the next checks of the code are answered by the set
+            self.codes[datetype].add(code)
+            return True
+        self.absent[datetype].add(code)
+        return False
+
+    def confirm(self, codes: Iterable[str], datetype: DataType):
+        """Confirm the positives of the Bloom filter among the codes with one read, so their checks cost no query"""
+        bloom = self.blooms.get(datetype)
+        if bloom is None:
+            return
+        known, absent = self.codes[datetype], self.absent[datetype]
+        candidates = [code for code in codes if (code not in known) and (code not in absent) and (code in bloom)]
+        if candidates:
+            known.update(self.db.exists_codes(candidates, datetype))
+            # the false positives are known to be absent until they are added
+            absent.update(code for code in candidates if code not in known)
+
+    def check(self, code: str, datetype: DataType) -> bool:
+        """Whether the code is recorded, a hit is counted like check_code does"""
+        if not self.contains(code, datetype):
+            return False
+        self.db.code_hits.hit(code, datetype)
+        return True
+
+    def add(self, code: str, datetype: DataType):
+        """Record a code which has been inserted into the database"""
+        self.codes[datetype].add(code)
+        self.absent[datetype].discard(code)
+
+    def flush(self):
+        """Add the counted hits to the database"""
+        number_codes = self.db.code_hits.flush()
+        if number_codes:
+            self.logger.info(f"Flush the hits of {number_codes} code(s)")
@@ -1,26 +1,69 @@
 # database.py
 
 import os
-from typing import List, Optional, Tuple
-
-from sqlmodel import SQLModel, Field, create_engine, Session, select
+import threading
+from datetime import datetime
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, delete, or_, update
+from sqlmodel import SQLModel, Field, Session, select
 import pandas
 
+from .sqlite import sqlite_engine
 from ..models.models import DataType, CodeRecorder, Month, Match, Race, ResultOfRace, Horse, ResultOfHorse, Jockey, Trainer, SummaryOfJockeyTrainer, OddsTan
-from ..config import DIR_FOR_DATA
+from ..config import DIR_FOR_DATA, CODE_HITS_FLUSH_SIZE, CODE_HITS_FLUSH_INTERVAL, EXISTS_CHUNK_SIZE
+
+# the tables of the entities which change after they are stored, see storage.freshness
+MUTABLE_TABLES = {DataType.HORSE: Horse, DataType.JOCKEY: Jockey, DataType.TRAINER: Trainer}
+
+class CodeHitCounter:
+    """
+    Count the hits of recorded codes in memory, so a check of a code is not a write transaction.
+    The counts are added to CodeRecorder in one UPDATE after flush_size hits or flush_interval seconds, and when the database is closed.
+    """
+
+    def __init__(self, db: "ChevalDB", flush_size: int = CODE_HITS_FLUSH_SIZE, flush_interval: float = CODE_HITS_FLUSH_INTERVAL):
+        self.db = db
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.hits: Counter = Counter()
+        self.number_hits = 0
+        self.last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def hit(self, code: str, datetype: DataType):
+        with self._lock:
+            self.hits[(code, datetype)] += 1
+            self.number_hits += 1
+            due = (self.number_hits >= self.flush_size) or (time.monotonic() - self.last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write the counted hits, returns the number of codes updated"""
+        with self._lock:
+            hits: Dict[Tuple[str, DataType], int] = dict(self.hits)
+            self.hits.clear()
+            self.number_hits = 0
+            self.last_flush = time.monotonic()
+        self.db.add_code_counts(hits)
+        return len(hits)
 
 class ChevalDB:
-    def __init__(self, folder: str = DIR_FOR_DATA, filename: str = "cheval.db"):
+    def __init__(self, folder: str = DIR_FOR_DATA, filename: str = "cheval.db", hits_flush_size: int = CODE_HITS_FLUSH_SIZE):
         """Initialize database connection and engine"""
-        os.makedirs(folder, exist_ok=True)
-        path = os.path.join(folder, filename)
-        self.engine = create_engine(f"sqlite:///{path}")
+        self.engine = sqlite_engine(folder, filename)
         self.session_factory = Session(bind=self.engine)
+        self.code_hits = CodeHitCounter(self, flush_size=hits_flush_size)
         self._create_tables()
 
     def _create_tables(self):
-        """Create database table"""
-        SQLModel.metadata.create_all(self.engine)
+        """Create database table, the frontier and the archive tables are created by their own stores"""
+        SQLModel.metadata.create_all(self.engine, tables=[
+            SummaryOfJockeyTrainer.__table__, Trainer.__table__, Jockey.__table__, ResultOfHorse.__table__, Horse.__table__,
+            ResultOfRace.__table__, Race.__table__, Match.__table__, Month.__table__, CodeRecorder.__table__])
 
     def get_session(self) -> Session:
         """Obtain database session"""
@@ -38,19 +81,54 @@ class ChevalDB:
     
     def check_code(self, code: str, datetype: DataType):
         """Finds a code based on the combination of code and datetype (which, according to the table constraints, must be unique if it exists).
-        Returns the code if it exists, otherwise returns None."""
+        Returns the code if it exists, otherwise returns None. It is read only, the hit is counted in code_hits and written later."""
         with self.get_session() as session:
             stmt = select(CodeRecorder).where(
                 CodeRecorder.code == code,
                 CodeRecorder.datetype == datetype
             )
             record = session.exec(stmt).first()
-            if record:
-                record.count += 1
-                session.add(record)
-                session.commit()
-                session.refresh(record)
-            return record
+        if record:
+            self.code_hits.hit(code, datetype)
+        return record
+
+    def get_code_keys(self, datetype: Optional[DataType] = None) -> List[Tuple[str, DataType]]:
+        """Get the (code, datetype) of all recorded codes, without loading the records."""
+        with self.get_session() as session:
+            stmt = select(CodeRecorder.code, CodeRecorder.datetype)
+            if datetype is not None:
+                stmt = stmt.where(CodeRecorder.datetype == datetype)
+            return [(code, thetype) for code, thetype in session.exec(stmt).all()]
+
+    def exists_code(self, code: str, datetype: DataType) -> bool:
+        """Whether the code is recorded, read only."""
+        with self.get_session() as session:
+            stmt = select(CodeRecorder.id).where(CodeRecorder.code == code, CodeRecorder.datetype == datetype)
+            return session.exec(stmt).first() is not None
+
+    def exists_codes(self, codes: Iterable[str], datetype: DataType) -> Set[str]:
+        """The codes of a datetype which are recorded, read only, with one query per EXISTS_CHUNK_SIZE codes."""
+        codes = list(dict.fromkeys(codes))
+        found: Set[str] = set()
+        with self.get_session() as session:
+            for i in range(0, len(codes), EXISTS_CHUNK_SIZE):
+                stmt = select(CodeRecorder.code).where(CodeRecorder.datetype == datetype,
+                                                       CodeRecorder.code.in_(codes[i:i + EXISTS_CHUNK_SIZE]))
+                found.update(session.exec(stmt).all())
+        return found
+
+    def add_code_counts(self, counts: Dict[Tuple[str, DataType], int]):
+        """Add the numbers of hits to the counts of the codes, in one transaction with one executemany UPDATE."""
+        if not counts:
+            return
+        table = CodeRecorder.__table__
+        stmt = (update(table)
+                .where(table.c.code == bindparam("b_code"), table.c.datetype == bindparam("b_datetype"))
+                .values(count=table.c.count + bindparam("b_number")))
+        params = [{"b_code": code, "b_datetype": datetype.value, "b_number": number} for (code, datetype), number in counts.items()]
+        with self.get_session() as session:
+            session.connection().execute(stmt, params)
+            session.commit()
 
     def insert_month(self, themonth: Month):
         """Insert month data. Before calling this function, you must firstly call check_code to ensure that there is no Month record with the same code."""
@@ -163,19 +241,56 @@ class ChevalDB:
             return session.get(Trainer, code)
 
     def insert_jockey_trainer_summary_list(self, thesummaries: List[SummaryOfJockeyTrainer]):
-        """Insert jockey or trainer summary list."""
-        #print(thecode)
+        """
+        Insert jockey or trainer summary list.
+        The stored rows of the same tables (code, summary code and title) are replaced, so a page inserted again adds nothing.
+        """
         with self.get_session() as session:
+            for code, summary_code, title in {(summary.jockey_trainer_code, summary.summary_code, summary.title) for summary in thesummaries}:
+                session.exec(delete(SummaryOfJockeyTrainer).where(SummaryOfJockeyTrainer.jockey_trainer_code == code,
+                                                                 SummaryOfJockeyTrainer.summary_code == summary_code,
+                                                                 SummaryOfJockeyTrainer.title == title))
             for summary in thesummaries:
                 session.add(summary)
             session.commit()
 
+    def exists_summary(self, summary_code: str) -> bool:
+        """Whether the history of a summary code is stored, read only."""
+        with self.get_session() as session:
+            stmt = select(SummaryOfJockeyTrainer.id).where(SummaryOfJockeyTrainer.summary_code == summary_code)
+            return session.exec(stmt).first() is not None
+
     def get_summaries_by_jockey_trainer_code(self, code: str):
         """Get the jockey or trainer summaries by jockey or trainer code."""
         with self.get_session() as session:
             statement = select(SummaryOfJockeyTrainer).where(SummaryOfJockeyTrainer.jockey_trainer_code == code)
             return session.exec(statement).all()
 
+    def update_odds_tan(self, race_code: str, theoddstan: OddsTan):
+        """Write the odds tan into the results of a race which has been inserted."""
+        with self.get_session() as session:
+            statement = select(ResultOfRace).where(ResultOfRace.race_code == race_code)
+            for result in session.exec(statement).all():
+                result.odds_tan = theoddstan.odds.get(result.num)
+                session.add(result)
+            session.commit()
+
+    def update_odds_tan_list(self, odds_list: List[Tuple[str, OddsTan]]):
+        """Write the odds tan of many races, given as (race code, odds tan), in one transaction."""
+        with self.get_session() as session:
+            for race_code, theoddstan in odds_list:
+                statement = select(ResultOfRace).where(ResultOfRace.race_code == race_code)
+                for result in session.exec(statement).all():
+                    result.odds_tan = theoddstan.odds.get(result.num)
+                    session.add(result)
+            session.commit()
+
+    def bulk_insert(self, rows: List[SQLModel]):
+        """Insert the rows of many entities and their codes in one transaction."""
+        with self.get_session() as session:
+            session.add_all(rows)
+            session.commit()
+
     def insert_odds_tan(self, theoddstan: OddsTan):
         """The data of odds tan is saved in race, so only insert the code of odds tan. Before calling this function, you must firstly call check_code to ensure that there is no Race record with the same code."""
         thecode = CodeRecorder(code=theoddstan.code, name=None, datetype=DataType.ODDS_TAN)
@@ -184,8 +299,39 @@ class ChevalDB:
             session.add(thecode)
             session.commit()
 
+    def get_stale_codes(self, datetype: DataType, before: datetime) -> List[str]:
+        """Get the codes of the horses, jockeys or trainers updated before the time."""
+        table = MUTABLE_TABLES[datetype]
+        with self.get_session() as session:
+            stmt = select(table.code).where(or_(table.update_time == None, table.update_time < before))
+            return list(session.exec(stmt).all())
+
+    def replace_entity(self, datetype: DataType, entity):
+        """
+        Replace a stored horse, jockey or trainer by a newly parsed one, with the rows of its page, in one transaction.
+        The code in CodeRecorder is kept, and so is the history of a jockey or trainer, which has its own page.
+        """
+        table = MUTABLE_TABLES[datetype]
+        with self.get_session() as session:
+            session.exec(delete(table).where(table.code == entity.code))
+            match datetype:
+                case DataType.HORSE:
+                    session.exec(delete(ResultOfHorse).where(ResultOfHorse.horse_code == entity.code))
+                    rows = entity._result_list
+                case DataType.JOCKEY | DataType.TRAINER:
+                    # the summaries of the page have no summary code, those of the history page have one
+                    session.exec(delete(SummaryOfJockeyTrainer).where(SummaryOfJockeyTrainer.jockey_trainer_code == entity.code,
+                                                                     SummaryOfJockeyTrainer.summary_code == None))
+                    rows = entity._summary_this_year + entity._summary_total
+            entity.update_time = datetime.now()
+            session.add(entity)
+            for row in rows:
+                session.add(row)
+            session.commit()
+
     def close(self):
         """关闭数据库连接"""
+        self.code_hits.flush()
         self.session_factory.close()
 
     def export_to_excel(self):
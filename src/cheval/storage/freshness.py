@@ -0,0 +1,48 @@
+# freshness.py
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from ..models.models import DataType
+from ..config import HORSE_TTL_DAYS, JOCKEY_TTL_DAYS, TRAINER_TTL_DAYS
+
+@dataclass(frozen=True)
+class Freshness:
+    """How long a stored entity stays current: forever if ttl is None (immutable), otherwise ttl after its update_time"""
+    ttl: Optional[timedelta] = None
+
+    @property
+    def mutable(self) -> bool:
+        return self.ttl is not None
+
+    def is_stale(self, update_time: Optional[datetime], now: Optional[datetime] = None) -> bool:
+        if not self.mutable:
+            return False
+        if update_time is None:
+            return True
+        return update_time < (now or datetime.now()) - self.ttl
+
+    def stale_before(self, now: Optional[datetime] = None) -> Optional[datetime]:
+        """the update time before which an entity is stale, None if it never is"""
+        if not self.mutable:
+            return None
+        return (now or datetime.now()) - self.ttl
+
+IMMUTABLE = Freshness()
+
+# past months, matches, races and odds never change, horses gain rows and the records of jockeys and trainers, and their summaries, change weekly
+FRESHNESS: Dict[DataType, Freshness] = {
+    DataType.MONTH: IMMUTABLE,
+    DataType.MATCH: IMMUTABLE,
+    DataType.RACE: IMMUTABLE,
+    DataType.ODDS_TAN: IMMUTABLE,
+    DataType.HORSE: Freshness(ttl=timedelta(days=HORSE_TTL_DAYS)),
+    DataType.JOCKEY: Freshness(ttl=timedelta(days=JOCKEY_TTL_DAYS)),
+    DataType.JOCKEY_SUMMARY: Freshness(ttl=timedelta(days=JOCKEY_TTL_DAYS)),
+    DataType.TRAINER: Freshness(ttl=timedelta(days=TRAINER_TTL_DAYS)),
+    DataType.TRAINER_SUMMARY: Freshness(ttl=timedelta(days=TRAINER_TTL_DAYS)),
+}
+
+def mutable_types(policy: Dict[DataType, Freshness] = FRESHNESS) -> List[DataType]:
+    return [data_type for data_type, freshness in policy.items() if freshness.mutable]
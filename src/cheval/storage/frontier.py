@@ -0,0 +1,207 @@
+# frontier.py
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import aliased
+from sqlmodel import SQLModel, Session, select, func, or_
+
+from .sqlite import sqlite_engine
+from ..models.models import DataType, CodeNameLinkAction, FrontierTask, TaskState
+from ..config import DIR_FOR_DATA
+
+class CrawlFrontier:
+    """
+    SQLite-backed work queue of the crawl, one row per page to fetch.
+    A task becomes ready when its parent is done, and the ready tasks are taken depth-first,
+    so a month is crawled match by match as the old nested loops did.
+    Every state change is committed at once, so a restarted crawl continues from the exact next page.
+    """
+
+    def __init__(self, folder: str = DIR_FOR_DATA, filename: str = "cheval.db"):
+        """Initialize database connection and engine"""
+        self.engine = sqlite_engine(folder, filename)
+        self.session_factory = Session(bind=self.engine, expire_on_commit=False)
+        self._create_tables()
+
+    def _create_tables(self):
+        """
+        Create the table of the frontier only, a table which kept the pages unique over all months is rebuilt,
+        and the indexes missing on a table made before them are added.
+        """
+        with self.engine.begin() as connection:
+            row = connection.exec_driver_sql("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'frontier'").first()
+            if (row is not None) and ("UNIQUE (code, thetype)" in row[0]):
+                connection.exec_driver_sql("ALTER TABLE frontier RENAME TO frontier_old")
+                FrontierTask.__table__.create(connection)
+                columns = ", ".join(column.name for column in FrontierTask.__table__.columns)
+                connection.exec_driver_sql(f"INSERT INTO frontier ({columns}) SELECT {columns} FROM frontier_old")
+                connection.exec_driver_sql("DROP TABLE frontier_old")
+        SQLModel.metadata.create_all(self.engine, tables=[FrontierTask.__table__])
+        for index in FrontierTask.__table__.indexes:
+            index.create(self.engine, checkfirst=True)
+
+    def get_session(self) -> Session:
+        """Obtain database session"""
+        return self.session_factory
+
+    def get_task(self, thetype: DataType, code: str, root_code: Optional[str] = None) -> Optional[FrontierTask]:
+        """Get the task by its type and code, in the frontier of a month if root_code is given, else of any month."""
+        with self.get_session() as session:
+            stmt = select(FrontierTask).where(FrontierTask.thetype == thetype, FrontierTask.code == code)
+            if root_code is not None:
+                stmt = stmt.where(FrontierTask.root_code == root_code)
+            return session.exec(stmt).first()
+
+    def push(self, cnla: CodeNameLinkAction, root_code: str, parent: Optional[FrontierTask] = None,
+             skipped: bool = False) -> FrontierTask:
+        """
+        Add a page to the frontier of a month and return its task.
+        If a task with the same type and code already exists in that month, the existing task is returned unchanged.
+        A page pending in another month is added again, so every month is complete once its own tasks are done.
+        Pages found by a skipped parent are recorded as skipped too.
+        """
+        task = self.get_task(cnla.thetype, cnla.code, root_code)
+        if task is not None:
+            return task
+        if (parent is not None) and (parent.state == TaskState.SKIPPED):
+            skipped = True
+        if cnla.thetype == DataType.MATCH:
+            branch_code = cnla.code
+        else:
+            branch_code = parent.branch_code if parent else None
+        task = FrontierTask(thetype=cnla.thetype, code=cnla.code, name=cnla.name, link=cnla.link, action=cnla.action,
+                            parent_id=parent.id if parent else None, parent_code=parent.code if parent else None,
+                            root_code=root_code, branch_code=branch_code,
+                            state=TaskState.SKIPPED if skipped else TaskState.PENDING)
+        with self.get_session() as session:
+            session.add(task)
+            session.commit()
+        return task
+
+    def claim(self, root_code: Optional[str] = None, branch_codes: Optional[Iterable[str]] = None,
+              exclude_branch_codes: Optional[Iterable[str]] = None) -> Optional[FrontierTask]:
+        """
+        Take the next ready task and mark it as running. Returns None if no task is ready.
+        If root_code is given, only the tasks of that month are taken.
+        If branch_codes is given, only the tasks of those matches are taken;
+        if exclude_branch_codes is given, the tasks of those matches are left for others.
+        """
+        parent = aliased(FrontierTask)
+        with self.get_session() as session:
+            stmt = (select(FrontierTask)
+                    .outerjoin(parent, FrontierTask.parent_id == parent.id)
+                    .where(FrontierTask.state == TaskState.PENDING,
+                           or_(FrontierTask.parent_id == None, parent.state == TaskState.DONE))
+                    .order_by(FrontierTask.id.desc()))
+            if root_code is not None:
+                stmt = stmt.where(FrontierTask.root_code == root_code)
+            if branch_codes is not None:
+                stmt = stmt.where(FrontierTask.branch_code.in_(list(branch_codes)))
+            if exclude_branch_codes is not None:
+                stmt = stmt.where(or_(FrontierTask.branch_code == None, FrontierTask.branch_code.not_in(list(exclude_branch_codes))))
+            task = session.exec(stmt).first()
+            if task is None:
+                return None
+            task.state = TaskState.RUNNING
+            task.attempts += 1
+            task.update_time = datetime.now()
+            session.add(task)
+            session.commit()
+            return task
+
+    def finish(self, task: FrontierTask):
+        """Mark the task as done."""
+        self._set_state(task, TaskState.DONE, error=None)
+
+    def fail(self, task: FrontierTask, error: str):
+        """Mark the task as failed and record the error."""
+        self._set_state(task, TaskState.FAILED, error=error)
+
+    def release(self, task: FrontierTask):
+        """Put a running task back to pending, so it can be taken again."""
+        self._set_state(task, TaskState.PENDING, error=None)
+
+    def _set_state(self, task: FrontierTask, state: TaskState, error: Optional[str]):
+        with self.get_session() as session:
+            task.state = state
+            task.error = error
+            task.update_time = datetime.now()
+            session.add(task)
+            session.commit()
+
+    def reset(self, max_attempts: int = 3, root_code: Optional[str] = None) -> int:
+        """
+        Put the tasks left running by an interrupted crawl, and the failed tasks which may be tried again, back to pending.
+        Returns the number of tasks reset.
+        """
+        with self.get_session() as session:
+            stmt = select(FrontierTask).where(or_(FrontierTask.state == TaskState.RUNNING,
+                                                  (FrontierTask.state == TaskState.FAILED) & (FrontierTask.attempts < max_attempts)))
+            if root_code is not None:
+                stmt = stmt.where(FrontierTask.root_code == root_code)
+            tasks = session.exec(stmt).all()
+            for task in tasks:
+                task.state = TaskState.PENDING
+                session.add(task)
+            session.commit()
+            return len(tasks)
+
+    def count_by_state(self, root_code: Optional[str] = None) -> Dict[TaskState, int]:
+        """Count the tasks in each state."""
+        with self.get_session() as session:
+            stmt = select(FrontierTask.state, func.count()).group_by(FrontierTask.state)
+            if root_code is not None:
+                stmt = stmt.where(FrontierTask.root_code == root_code)
+            counts = {state: 0 for state in TaskState}
+            for state, count in session.exec(stmt).all():
+                counts[state] = count
+            return counts
+
+    def count_by_type(self, root_code: Optional[str] = None, state: TaskState = TaskState.DONE) -> Dict[DataType, int]:
+        """Count the tasks of each type in a state, done by default."""
+        with self.get_session() as session:
+            stmt = select(FrontierTask.thetype, func.count()).where(FrontierTask.state == state).group_by(FrontierTask.thetype)
+            if root_code is not None:
+                stmt = stmt.where(FrontierTask.root_code == root_code)
+            return {thetype: count for thetype, count in session.exec(stmt).all()}
+
+    def count_attempts(self, root_code: Optional[str] = None) -> int:
+        """Count the attempts of all tasks, that is the pages loaded."""
+        with self.get_session() as session:
+            stmt = select(func.coalesce(func.sum(FrontierTask.attempts), 0))
+            if root_code is not None:
+                stmt = stmt.where(FrontierTask.root_code == root_code)
+            return session.exec(stmt).one()
+
+    def count_unfinished(self, root_code: Optional[str] = None) -> int:
+        """Count the tasks which are neither done nor skipped."""
+        counts = self.count_by_state(root_code)
+        return counts[TaskState.PENDING] + counts[TaskState.RUNNING] + counts[TaskState.FAILED]
+
+    def get_children(self, task: FrontierTask, thetype: Optional[DataType] = None) -> List[FrontierTask]:
+        """Get the tasks found by the task."""
+        with self.get_session() as session:
+            stmt = select(FrontierTask).where(FrontierTask.parent_id == task.id)
+            if thetype is not None:
+                stmt = stmt.where(FrontierTask.thetype == thetype)
+            return list(session.exec(stmt).all())
+
+    def get_tasks(self, states: Iterable[TaskState], root_code: Optional[str] = None,
+                  thetype: Optional[DataType] = None) -> List[FrontierTask]:
+        """Get the tasks in the given states, of the given type if it is given."""
+        with self.get_session() as session:
+            stmt = select(FrontierTask).where(FrontierTask.state.in_(list(states))).order_by(FrontierTask.id)
+            if root_code is not None:
+                stmt = stmt.where(FrontierTask.root_code == root_code)
+            if thetype is not None:
+                stmt = stmt.where(FrontierTask.thetype == thetype)
+            return list(session.exec(stmt).all())
+
+    def close(self):
+        """Close the database connection"""
+        self.session_factory.close()
+
+def task_to_cnla(task: FrontierTask) -> CodeNameLinkAction:
+    """transform a task of the frontier to CodeNameLinkAction"""
+    return CodeNameLinkAction(thetype=task.thetype, code=task.code, name=task.name, link=task.link, action=task.action)
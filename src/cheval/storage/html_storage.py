@@ -1,34 +1,84 @@
 # html_storage.py
 
+import hashlib
 import os
+import re
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 import gzip
 
-from ..models.models import DataType
+from .archive_index import ArchiveIndex
+from .segments import SegmentStore
+from ..models.models import DataType, PageBlob, PageSnapshot
 from ..config import DIR_FOR_SAVE_HTML
 from ..utils.misc import safe_dir
 
+# the gzip files saved by earlier versions, <code>[_<timestamp>].html.gz, the timestamp was added when the history was kept
+FILENAME_PATTERN = re.compile(r"^(?P<code>.+?)(?:_(?P<saved_at>\d{8}_\d{6}))?\.html\.gz$")
+
+@dataclass(frozen=True)
+class ArchivedPage:
+    """a page saved by HTMLStorage, path is the file which holds it, fetched_at is the time of saved_at"""
+    page_type: DataType
+    code: str
+    path: str
+    saved_at: Optional[str] = None
+    fetched_at: Optional[datetime] = None
+    digest: Optional[str] = None
+    blob: Optional[PageBlob] = field(default=None, compare=False)
+    url: Optional[str] = None
+    failed: bool = False
+
+def restore_code(safe_code: str) -> str:
+    """the code of a file name, the reverse of safe_dir for the codes of JRA, which have one '/' and no '_'"""
+    return safe_code if safe_code.isdigit() else safe_code.replace("_", "/")
+
+def html_digest(html: str) -> str:
+    """sha256 of the html, the address of its blob in the archive"""
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
 class HTMLStorage:
     """
     Store HTML pages and automatically organizing directories and file naming.
+    The pages are stored once per digest of their content, as zstd frames appended to the segments of a SegmentStore,
+    so a page fetched again unchanged costs no disk, and every fetch is recorded in the ArchiveIndex as (type, code, fetched_at) -> digest.
+    The pages saved by earlier versions, one gzip file per fetch as <type>/<code>[_timestamp].html.gz
+    or one per digest as blobs/<2 hex>/<digest>.html.gz, are still read, the former once index_files has recorded them.
     """
 
     def __init__(self, root_dir=DIR_FOR_SAVE_HTML):
         self.root_dir = root_dir
+        self._index: Optional[ArchiveIndex] = None
+        self._segments: Optional[SegmentStore] = None
+
+    @property
+    def index(self) -> ArchiveIndex:
+        """the index of the fetches, opened when it is first used"""
+        if self._index is None:
+            self._index = ArchiveIndex(folder=self.root_dir)
+        return self._index
+
+    @property
+    def segments(self) -> SegmentStore:
+        """the segments of this writer, started when the first page is saved"""
+        if self._segments is None:
+            self._segments = SegmentStore(root_dir=self.root_dir)
+        return self._segments
     
     def save_html(self, page_type: DataType, code: str, html: str,
               url: str = None, metadata: dict = None, keep_history: Optional[bool] = None):
         """
-        Save HTML pages as gzip files and log additional information.
+        Save HTML pages into the segments once per digest of their content, and record the fetch in the index.
         Parameters:
         - page_type: page type
         - code: unique identifier of the object
         - html: string of the HTML
         - url: page source URL (optional)
         - metadata: other metadata (optional)
-        - keep_history: whether to retain historical snapshots
+        - keep_history: whether to retain historical snapshots, otherwise the earlier fetches are forgotten by the index
+        Returns the path of the segment which holds the page.
         """
         if keep_history is None:
             if page_type in [DataType.MONTH, DataType.MATCH, DataType.RACE]:
@@ -36,52 +86,144 @@ class HTMLStorage:
             else:
                 keep_history = True
 
-        #subdir = os.path.join(self.root_dir, self._map_page_type(page_type))
-        subdir = os.path.join(self.root_dir, page_type.value)
-        os.makedirs(subdir, exist_ok=True)
+        digest = html_digest(html)
+        blob = self.index.get_blob(digest)
+        if blob is None:
+            segment, offset, length = self.segments.append(page_type, digest, html)
+            blob = PageBlob(digest=digest, page_type=page_type, segment=segment, offset=offset, length=length)
+            self.index.add_blob(blob)
+        self.index.add(page_type=page_type, code=code, digest=digest, replace=not keep_history, url=url, meta=metadata)
+        filepath = os.path.join(self.root_dir, blob.segment)
+
+        return filepath
+
+    def changed(self, page_type: DataType, code: str, html: str) -> bool:
+        """Whether the html differs from the last saved fetch of the page, one comparison of digests"""
+        snapshot = self.index.latest(page_type, code)
+        return (snapshot is None) or (snapshot.digest != html_digest(html))
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root_dir, "blobs", digest[:2], f"{digest}.html.gz")
+
+    def _snapshot_to_page(self, snapshot: PageSnapshot, blob: Optional[PageBlob]) -> ArchivedPage:
+        if snapshot.path is not None:
+            path = os.path.join(self.root_dir, snapshot.path)
+        elif blob is not None:
+            path = os.path.join(self.root_dir, blob.segment)
+        else:
+            path = self._blob_path(snapshot.digest)
+        return ArchivedPage(page_type=snapshot.page_type, code=snapshot.code, path=path,
+                            saved_at=snapshot.fetched_at.strftime("%Y%m%d_%H%M%S"), fetched_at=snapshot.fetched_at, digest=snapshot.digest,
+                            blob=blob if snapshot.path is None else None, url=snapshot.url, failed=snapshot.failed)
+
+    def _to_pages(self, snapshots: List[PageSnapshot]) -> List[ArchivedPage]:
+        blobs = self.index.get_blobs(snapshot.digest for snapshot in snapshots if snapshot.digest is not None)
+        return [self._snapshot_to_page(snapshot, blobs.get(snapshot.digest)) for snapshot in snapshots]
 
-        filename = self._make_filename(safe_dir(code), keep_history)
-        filepath = os.path.join(subdir, filename)
+    def mark_failed(self, page_type: DataType, code: str, failed: bool = True) -> bool:
+        """Record whether the parser failed on the last saved fetch of a page"""
+        return self.index.mark_failed(page_type, code, failed=failed)
 
-        with gzip.open(filepath, "wt", encoding="utf-8") as f:
-            f.write(html)
+    def latest_page(self, code: str, page_type: Optional[DataType] = None) -> Optional[ArchivedPage]:
+        """The last saved fetch of the page of a code, of any type if page_type is None"""
+        snapshot = self.index.latest(page_type, code)
+        return None if snapshot is None else self._to_pages([snapshot])[0]
 
+    def pages_between(self, page_type: DataType, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[ArchivedPage]:
+        """All saved fetches of the pages of a type, fetched from start until end (not included)"""
+        return self._to_pages(self.index.find(page_types=[page_type], start=start, end=end))
+
+    def failed_pages(self, page_types: Optional[Iterable[DataType]] = None) -> List[ArchivedPage]:
+        """The pages whose last saved fetch the parser failed on, with the copies saved as failed pages"""
+        snapshots = self.index.find(page_types=page_types, failed=True, latest_only=True)
+        if (page_types is None) or (DataType.FAILED in page_types):
+            snapshots += self.index.find(page_types=[DataType.FAILED])
+        return self._to_pages(snapshots)
+
+    def read_page(self, page: ArchivedPage) -> str:
+        """Read a listed page, from its segment or from its gzip file"""
+        if page.blob is not None:
+            return self.segments.read(page.blob.segment, page.blob.offset, page.blob.length)
+        return self.load_html(page.path)
+
+    def stream_pages(self, pages: List[ArchivedPage]) -> Iterator[Tuple[ArchivedPage, str]]:
         """
-        # 预留扩展：记录索引信息
-        record = {
-            "page_type": page_type,
-            "identifier": code,
-            "filepath": filepath,
-            "url": url,
-            "metadata": metadata or {},
-            "saved_at": datetime.now().isoformat()
-        }
-        # 这里先写到控制台，未来可改写成 CSV/JSON/SQLite
-        print("Saved record:", record)
+        Read the html of many listed pages, the segments are read through once instead of seeking page by page,
+        which suits a bulk re-parse. The pages in gzip files follow. The html is None for a page whose file is missing.
         """
+        by_digest: Dict[str, List[ArchivedPage]] = {}
+        for page in pages:
+            if page.blob is not None:
+                by_digest.setdefault(page.digest, []).append(page)
+        for digest, html in self.segments.stream():
+            for page in by_digest.pop(digest, []):
+                yield page, html
+        for page in pages:
+            if (page.blob is None) or (page.digest in by_digest):
+                try:
+                    yield page, self.read_page(page)
+                except FileNotFoundError:
+                    yield page, None
 
-        return filepath
+    def close(self):
+        if self._segments is not None:
+            self._segments.close()
+        if self._index is not None:
+            self._index.close()
 
-    def _map_page_type(self, page_type: DataType) -> str:
-        """映射页面类型到子目录"""
-        mapping = {
-            DataType.MONTH: "matche_lists",
-            DataType.MATCH: "matches",
-            DataType.RACE: "races",
-            DataType.HORSE: "horses",
-            DataType.JOCKEY: "jockeys",
-            DataType.JOCKEY_SUMMARY: "jockey_histories",
-            DataType.TRAINER: "trainers",
-            DataType.TRAINER_SUMMARY: "trainer_histories",
-        }
-        if page_type not in mapping:
-            raise ValueError(f"Unknown type of html page: {page_type}")
-        return mapping[page_type]
-
-    def _make_filename(self, identifier: str, keep_history: bool) -> str:
-        """generate the file name, name with timestamp if keep_history is True"""
-        if keep_history:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            return f"{identifier}_{timestamp}.html.gz"
-        else:
-            return f"{identifier}.html.gz"
\ No newline at end of file
+    def list_pages(self, page_types: Optional[Iterable[DataType]] = None, latest_only: bool = True) -> List[ArchivedPage]:
+        """
+        List the saved pages of the types, all types by default except the failed pages.
+        If latest_only is True, only the latest snapshot of every code is listed.
+        """
+        if page_types is None:
+            page_types = [page_type for page_type in DataType if page_type != DataType.FAILED]
+        return self._to_pages(self.index.snapshots(page_types, latest_only=latest_only))
+
+    def index_files(self) -> int:
+        """
+        Record the pages saved one gzip file per fetch by earlier versions in the index, once,
+        so they are listed and queried as the others. Returns the number of files recorded.
+        """
+        indexed = self.index.indexed_paths()
+        snapshots: List[PageSnapshot] = []
+        for page in self._list_files(latest_only=False):
+            path = os.path.relpath(page.path, self.root_dir)
+            if path in indexed:
+                continue
+            fetched_at = page.fetched_at or datetime.fromtimestamp(os.path.getmtime(page.path))
+            snapshots.append(PageSnapshot(page_type=page.page_type, code=page.code, digest=html_digest(self.load_html(page.path)),
+                                          fetched_at=fetched_at, path=path))
+        self.index.add_many(snapshots)
+        return len(snapshots)
+
+    def _list_files(self, page_types: Optional[Iterable[DataType]] = None, latest_only: bool = True) -> List[ArchivedPage]:
+        """List the pages saved one gzip file per fetch, by a scan of the folders"""
+        if page_types is None:
+            page_types = [page_type for page_type in DataType
+                          if (page_type != DataType.FAILED) and os.path.isdir(os.path.join(self.root_dir, page_type.value))]
+        pages: List[ArchivedPage] = []
+        for page_type in page_types:
+            subdir = os.path.join(self.root_dir, page_type.value)
+            if not os.path.isdir(subdir):
+                continue
+            latest: Dict[str, ArchivedPage] = {}
+            for filename in sorted(os.listdir(subdir)):
+                matched = FILENAME_PATTERN.match(filename)
+                if matched is None:
+                    continue
+                saved_at = matched["saved_at"]
+                page = ArchivedPage(page_type=page_type, code=restore_code(matched["code"]), path=os.path.join(subdir, filename),
+                                    saved_at=saved_at, fetched_at=datetime.strptime(saved_at, "%Y%m%d_%H%M%S") if saved_at else None)
+                if not latest_only:
+                    pages.append(page)
+                elif (page.code not in latest) or ((page.saved_at or "") >= (latest[page.code].saved_at or "")):
+                    latest[page.code] = page
+            pages.extend(latest.values())
+        return pages
+
+    @staticmethod
+    def load_html(filepath: str) -> str:
+        """Read a page saved by save_html"""
+        with gzip.open(filepath, "rt", encoding="utf-8") as f:
+            return f.read()
@@ -0,0 +1,140 @@
+# reparse.py
+
+import inspect
+import itertools
+import multiprocessing
+import os
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlmodel import SQLModel
+
+from .database import ChevalDB
+from .frontier import CrawlFrontier
+from .html_storage import HTMLStorage, ArchivedPage
+from ..parsers.parsers import Parsers
+from ..parsers.base import ParseResult
+from ..models.models import DataType, CodeRecorder, OddsTan, TaskState
+from ..config import DIR_FOR_DATA, DIR_FOR_SAVE_HTML, REPARSE_BATCH_SIZE, REPARSE_CHUNK_SIZE, REPARSE_WINDOW_SIZE
+from ..utils.logging import get_logger
+
+REPARSED_TYPES = (DataType.MONTH, DataType.MATCH, DataType.RACE, DataType.ODDS_TAN, DataType.HORSE,
+                  DataType.JOCKEY, DataType.JOCKEY_SUMMARY, DataType.TRAINER, DataType.TRAINER_SUMMARY)
+
+# the parsers of a worker process, made once by _init_worker
+_parsers: Optional[Parsers] = None
+
+def _init_worker():
+    global _parsers
+    _parsers = Parsers()
+
+def _parse_page(job: Tuple[ArchivedPage, str, Optional[str], Optional[str], str]):
+    """Parse one page of the archive in a worker process, the page is not saved again, even as FAILED when it fails"""
+    page, html, name, parent_code, root_dir = job
+    try:
+        result = _parsers.by_type(page.page_type).parse(html=html, entity_code=page.code, entity_name=name, father_entity_code=parent_code,
+                                                        save_html=False, root_dir_for_save=root_dir, save_failed=False)
+        return page, result, None
+    except Exception as e:
+        return page, None, repr(e)
+
+def entity_rows(page_type: DataType, result: ParseResult[Any]) -> List[SQLModel]:
+    """The rows which the crawl would insert for the parse result of a page, except the odds which update the races"""
+    entity = result.entity
+    match page_type:
+        case DataType.MONTH:
+            return [entity, CodeRecorder(code=entity.code, name=entity.code, datetype=DataType.MONTH)]
+        case DataType.MATCH:
+            return [entity, CodeRecorder(code=entity.code, name=entity.name, datetype=DataType.MATCH)]
+        case DataType.RACE | DataType.HORSE:
+            return [entity, *entity._result_list, CodeRecorder(code=entity.code, name=entity.name, datetype=page_type)]
+        case DataType.JOCKEY | DataType.TRAINER:
+            return [entity, *entity._summary_this_year, *entity._summary_total, CodeRecorder(code=entity.code, name=entity.name, datetype=page_type)]
+        case DataType.JOCKEY_SUMMARY | DataType.TRAINER_SUMMARY:
+            return list(result.history)
+        case DataType.ODDS_TAN:
+            return [CodeRecorder(code=entity.code, name=None, datetype=DataType.ODDS_TAN)]
+        case _:
+            raise ValueError(f"Unknown type of page in the archive: {page_type}")
+
+def _jobs(storage: HTMLStorage, pages: List[ArchivedPage], known: Dict[Tuple[DataType, str], Tuple[Optional[str], Optional[str]]],
+          root_dir: str, report: Dict[str, Any], logger):
+    for page, html in storage.stream_pages(pages):
+        if html is None:
+            report["failed"].append(page.path)
+            logger.error(f"Failed: {page.path}, the file is missing")
+            continue
+        yield (page, html, *known.get((page.page_type, page.code), (None, None)), root_dir)
+
+def reparse_archive(root_dir: str = DIR_FOR_SAVE_HTML, folder: str = DIR_FOR_DATA, filename: str = "cheval_reparsed.db",
+                    source_folder: Optional[str] = DIR_FOR_DATA, source_filename: str = "cheval.db",
+                    number_workers: Optional[int] = None, batch_size: int = REPARSE_BATCH_SIZE, index_files: bool = True) -> Dict[str, Any]:
+    """
+    Rebuild the database from the pages saved by HTMLStorage, without fetching anything.
+    The latest snapshot of every page is read by streaming the segments through, parsed by the matching parser in a process pool,
+    and the rows are inserted into a new database in batches, the odds are written into the races at the end.
+    The names and parent codes of the pages, which some parsers need, are taken from the crawl frontier of the source database.
+    The pages the parsers fail on are marked in the index of the archive, and unmarked once they are parsed.
+    If index_files is True, the gzip files saved by earlier versions are recorded in the index first, see HTMLStorage.index_files.
+    Returns a report of the pages parsed and failed.
+    """
+    logger = get_logger("cheval.storage.reparse")
+    path = os.path.join(folder, filename)
+    if os.path.exists(path):
+        raise FileExistsError(f"The database to rebuild already exists: {path}")
+    storage = HTMLStorage(root_dir=root_dir)
+    if index_files:
+        storage.index_files()
+    pages = storage.list_pages(page_types=REPARSED_TYPES)
+    known: Dict[Tuple[DataType, str], Tuple[Optional[str], Optional[str]]] = {}
+    if (source_folder is not None) and os.path.exists(os.path.join(source_folder, source_filename)):
+        frontier = CrawlFrontier(folder=source_folder, filename=source_filename)
+        for task in frontier.get_tasks(states=list(TaskState)):
+            known[(task.thetype, task.code)] = (task.name, task.parent_code)
+        frontier.close()
+    if number_workers is None:
+        number_workers = os.cpu_count() or 1
+    logger.info(f"Re-parse {len(pages)} page(s) from {root_dir} into {path} with {number_workers} worker(s)")
+    db = ChevalDB(folder=folder, filename=filename)
+    report: Dict[str, Any] = {"pages": len(pages), "parsed": Counter(), "failed": []}
+    rows: List[SQLModel] = []
+    odds_list: List[Tuple[str, OddsTan]] = []
+    start = time.monotonic()
+    try:
+        jobs = _jobs(storage, pages, known, root_dir, report, logger)
+        with multiprocessing.get_context().Pool(processes=number_workers, initializer=_init_worker) as pool:
+            # the pool takes its whole input at once, so the html is handed over a window at a time
+            while window := list(itertools.islice(jobs, REPARSE_WINDOW_SIZE)):
+                for page, result, error in pool.imap_unordered(_parse_page, window, chunksize=REPARSE_CHUNK_SIZE):
+                    if error is not None:
+                        report["failed"].append(page.path)
+                        logger.error(f"Failed: {page.path}, error={error}")
+                        storage.mark_failed(page.page_type, page.code)
+                        continue
+                    if page.failed:
+                        # the parser has been fixed for this page
+                        storage.mark_failed(page.page_type, page.code, failed=False)
+                    rows.extend(entity_rows(page.page_type, result))
+                    if page.page_type == DataType.ODDS_TAN:
+                        _, race_code = known.get((page.page_type, page.code), (None, None))
+                        if race_code is None:
+                            logger.warning(f"No race for the odds: {page.code}")
+                        else:
+                            odds_list.append((race_code, result.entity))
+                    report["parsed"][page.page_type.value] += 1
+                    if len(rows) >= batch_size:
+                        db.bulk_insert(rows)
+                        rows = []
+        db.bulk_insert(rows)
+        db.update_odds_tan_list(odds_list)
+    except Exception as e:
+        logger.exception(f"An exception in {inspect.currentframe().f_code.co_name}!")
+        raise e
+    finally:
+        storage.close()
+        db.close()
+    report["parsed"] = dict(report["parsed"])
+    report["seconds"] = time.monotonic() - start
+    logger.info(f"Re-parse report: {report}")
+    return report
@@ -0,0 +1,169 @@
+# segments.py
+
+import os
+import struct
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+import zstandard
+
+from ..models.models import DataType
+from ..config import SEGMENT_MAX_BYTES, ZSTD_LEVEL, ZSTD_DICT_SIZE, ZSTD_DICT_SAMPLES
+from ..utils.logging import get_logger
+
+# every page is a skippable frame with its digest and the length of the next frame, then the zstd frame of its html,
+# so a segment is still a valid zstd stream and can be read through without the index
+SKIPPABLE_MAGIC = 0x184D2A50
+RECORD_HEADER = struct.Struct("<II32sI")
+RECORD_PAYLOAD_SIZE = RECORD_HEADER.size - 8
+
+class SegmentStore:
+    """
+    Append-only archive of pages: large rolling segment files of zstd frames, one folder per DataType.
+    The pages of a type are compressed with a dictionary trained on its first pages, so the boilerplate shared by
+    the pages of JRA is not stored again in every frame. Every writer appends to its own segments, so several
+    crawl processes can write at once. A page is read back by its (segment, offset, length), or all are streamed.
+    """
+
+    def __init__(self, root_dir: str, max_bytes: int = SEGMENT_MAX_BYTES, level: int = ZSTD_LEVEL,
+                 dict_size: int = ZSTD_DICT_SIZE, dict_samples: int = ZSTD_DICT_SAMPLES):
+        self.root_dir = root_dir
+        self.folder = os.path.join(root_dir, "segments")
+        self.max_bytes = max_bytes
+        self.level = level
+        self.dict_size = dict_size
+        self.dict_samples = dict_samples
+        self.writer_id = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{os.getpid()}"
+        self._files: Dict[DataType, BinaryIO] = {}
+        self._numbers: Dict[DataType, int] = {}
+        self._compressors: Dict[DataType, zstandard.ZstdCompressor] = {}
+        self._samples: Dict[DataType, List[bytes]] = {}
+        self._train_at: Dict[DataType, int] = {}
+        self._dictionaries: Dict[int, zstandard.ZstdCompressionDict] = {}
+        self._decompressors: Dict[int, zstandard.ZstdDecompressor] = {}
+        self.logger = get_logger("cheval.storage.segments")
+
+    def _type_folder(self, page_type: DataType) -> str:
+        return os.path.join(self.folder, page_type.value)
+
+    def _dictionary_folder(self, page_type: DataType) -> str:
+        return os.path.join(self._type_folder(page_type), "dictionaries")
+
+    def _compressor(self, page_type: DataType) -> zstandard.ZstdCompressor:
+        """the compressor of a type, with the latest dictionary of the type if one has been trained"""
+        if page_type not in self._compressors:
+            dictionary = None
+            folder = self._dictionary_folder(page_type)
+            if os.path.isdir(folder):
+                paths = [os.path.join(folder, name) for name in os.listdir(folder) if name.endswith(".zdict")]
+                if paths:
+                    dictionary = self._load_dictionary(max(paths, key=os.path.getmtime))
+            if dictionary is None:
+                self._samples[page_type] = []
+            self._compressors[page_type] = zstandard.ZstdCompressor(level=self.level, dict_data=dictionary)
+        return self._compressors[page_type]
+
+    def _load_dictionary(self, path: str) -> zstandard.ZstdCompressionDict:
+        with open(path, "rb") as f:
+            dictionary = zstandard.ZstdCompressionDict(f.read())
+        self._dictionaries[dictionary.dict_id()] = dictionary
+        return dictionary
+
+    def _train(self, page_type: DataType):
+        """Train the dictionary of a type on the samples, the next pages of the type are compressed with it"""
+        samples = self._samples[page_type]
+        try:
+            dictionary = zstandard.train_dictionary(self.dict_size, samples)
+        except zstandard.ZstdError:
+            # too few or too small samples, try again with more
+            self.logger.warning(f"Can not train the dictionary of {page_type.value} on {len(samples)} page(s)")
+            self._train_at[page_type] = 2 * len(samples)
+            return
+        folder = self._dictionary_folder(page_type)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{dictionary.dict_id()}.zdict")
+        temppath = f"{path}.{os.getpid()}.tmp"
+        with open(temppath, "wb") as f:
+            f.write(dictionary.as_bytes())
+        os.replace(temppath, path)
+        self._dictionaries[dictionary.dict_id()] = dictionary
+        self._compressors[page_type] = zstandard.ZstdCompressor(level=self.level, dict_data=dictionary)
+        del self._samples[page_type]
+        self.logger.info(f"Train the dictionary {dictionary.dict_id()} of {page_type.value} on {len(samples)} page(s)")
+
+    def _file(self, page_type: DataType, size: int) -> BinaryIO:
+        """the segment of the writer for the type, a new one is started when the record would make it too large"""
+        f = self._files.get(page_type)
+        if (f is not None) and (f.tell() + size > self.max_bytes) and (f.tell() > 0):
+            f.close()
+            f = None
+        if f is None:
+            self._numbers[page_type] = self._numbers.get(page_type, 0) + 1
+            os.makedirs(self._type_folder(page_type), exist_ok=True)
+            path = os.path.join(self._type_folder(page_type), f"{self.writer_id}_{self._numbers[page_type]:04d}.seg")
+            f = open(path, "ab")
+            self._files[page_type] = f
+        return f
+
+    def append(self, page_type: DataType, digest: str, html: str) -> Tuple[str, int, int]:
+        """Append a page, returns its segment relative to the root dir, and the offset and length of its frame"""
+        data = html.encode("utf-8")
+        frame = self._compressor(page_type).compress(data)
+        f = self._file(page_type, RECORD_HEADER.size + len(frame))
+        f.write(RECORD_HEADER.pack(SKIPPABLE_MAGIC, RECORD_PAYLOAD_SIZE, bytes.fromhex(digest), len(frame)))
+        offset = f.tell()
+        f.write(frame)
+        f.flush()
+        if page_type in self._samples:
+            self._samples[page_type].append(data)
+            if len(self._samples[page_type]) >= self._train_at.get(page_type, self.dict_samples):
+                self._train(page_type)
+        return os.path.relpath(f.name, self.root_dir), offset, len(frame)
+
+    def _decompress(self, segment_path: str, frame: bytes) -> str:
+        dict_id = zstandard.get_frame_parameters(frame).dict_id
+        if dict_id not in self._decompressors:
+            dictionary = self._dictionaries.get(dict_id)
+            if (dictionary is None) and dict_id:
+                path = os.path.join(os.path.dirname(segment_path), "dictionaries", f"{dict_id}.zdict")
+                dictionary = self._load_dictionary(path)
+            self._decompressors[dict_id] = zstandard.ZstdDecompressor(dict_data=dictionary)
+        return self._decompressors[dict_id].decompress(frame).decode("utf-8")
+
+    def read(self, segment: str, offset: int, length: int) -> str:
+        """Read a page by its segment relative to the root dir, and the offset and length of its frame"""
+        path = os.path.join(self.root_dir, segment)
+        with open(path, "rb") as f:
+            f.seek(offset)
+            return self._decompress(path, f.read(length))
+
+    def segments(self, page_type: Optional[DataType] = None) -> List[str]:
+        """the paths of the segments of a type, all types by default, in the order they were written"""
+        if page_type is None:
+            folders = [os.path.join(self.folder, name) for name in sorted(os.listdir(self.folder))] if os.path.isdir(self.folder) else []
+        else:
+            folders = [self._type_folder(page_type)]
+        return [os.path.join(folder, name) for folder in folders if os.path.isdir(folder)
+                for name in sorted(os.listdir(folder)) if name.endswith(".seg")]
+
+    def stream(self, page_type: Optional[DataType] = None) -> Iterator[Tuple[str, str]]:
+        """Read the segments through, yields the (digest, html) of every page, a record cut off by a crash is left out"""
+        for path in self.segments(page_type):
+            with open(path, "rb") as f:
+                while True:
+                    header = f.read(RECORD_HEADER.size)
+                    if len(header) < RECORD_HEADER.size:
+                        break
+                    magic, _, digest, length = RECORD_HEADER.unpack(header)
+                    if magic != SKIPPABLE_MAGIC:
+                        self.logger.error(f"Broken segment at {f.tell() - len(header)}: {path}")
+                        break
+                    frame = f.read(length)
+                    if len(frame) < length:
+                        break
+                    yield digest.hex(), self._decompress(path, frame)
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
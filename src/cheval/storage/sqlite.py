@@ -0,0 +1,16 @@
+# sqlite.py
+
+import os
+
+from sqlalchemy.engine import Engine
+from sqlmodel import create_engine
+
+from ..config import SQLITE_TIMEOUT
+
+def sqlite_engine(folder: str, filename: str) -> Engine:
+    """
+    The engine of a SQLite database file in the folder, the folder is made if it does not exist.
+    Several crawl processes may write at once, they wait up to SQLITE_TIMEOUT seconds for the lock instead of failing.
+    """
+    os.makedirs(folder, exist_ok=True)
+    return create_engine(f"sqlite:///{os.path.join(folder, filename)}", connect_args={"timeout": SQLITE_TIMEOUT})
@@ -124,11 +124,25 @@ def extract_doaction_code(onclick_str):
     match = re.search(r"doAction\([^,]+,\s*'([^']+)'\)", onclick_str)
     return match.group(1) if match else None
 
+def parse_doaction(action_str) -> Tuple[Optional[str], Optional[str]]:
+    """Extract the path and the cname from the doAction JS call, example:
+    "return doAction('/JRADB/accessK.html', 'pw04kmk001122/66');" -> ('/JRADB/accessK.html', 'pw04kmk001122/66')"""
+    match = re.search(r"doAction\(\s*'([^']+)'\s*,\s*'([^']+)'\s*\)", action_str)
+    return (match.group(1), match.group(2)) if match else (None, None)
+
 def extract_cname_code(link_str):
     """Extract the parameter from the href with the form /JRADB/accessS.html?CNAME="""
     match = re.search(r"CNAME=([^&]+)", link_str)
     return match.group(1) if match else None
 
+def year_month_to_code(year: int, month: int) -> str:
+    """transform year and month to the code of a month, example: (2025, 3) -> 202503"""
+    return str(year).zfill(4) + str(month).zfill(2)
+
+def code_to_year_month(code: str) -> Tuple[int, int]:
+    """transform the code of a month to year and month, example: 202503 -> (2025, 3)"""
+    return int(code[:4]), int(code[4:6])
+
 def year_month_range(start_year: int, start_month: int, end_year: int, end_month: int) -> List[Tuple[int, int]]:
     """
     Generate a list of months from the start year and month to the end year and month (not included)
@@ -0,0 +1,89 @@
+# scheduler.py
+
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from ..config import (TARGET_REQUEST_RATE, MIN_REQUEST_RATE, RATE_INCREASE, RATE_DECREASE_FACTOR, SLOW_LATENCY,
+                      LATENCY_SMOOTHING)
+from .logging import get_logger
+
+class PolitenessScheduler:
+    """
+    Pace the requests to the site by AIMD instead of fixed random sleeps.
+    The rate grows by a fixed step after every healthy response, up to the target rate,
+    and is cut by a factor after every failed or slow response, down to the minimum rate.
+    The latency and the error rate are kept as moving averages for the log.
+    """
+
+    def __init__(self, target_rate: float = TARGET_REQUEST_RATE, min_rate: float = MIN_REQUEST_RATE,
+                 increase: float = RATE_INCREASE, decrease_factor: float = RATE_DECREASE_FACTOR,
+                 slow_latency: float = SLOW_LATENCY, smoothing: float = LATENCY_SMOOTHING):
+        self.target_rate = target_rate
+        self.min_rate = min(min_rate, target_rate)
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.slow_latency = slow_latency
+        self.smoothing = smoothing
+        # start at half of the target, the healthy responses bring it up
+        self.rate = max(self.min_rate, target_rate / 2)
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.number_requests = 0
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+        self.logger = get_logger("cheval.utils.scheduler")
+
+    @property
+    def delay(self) -> float:
+        """seconds between the starts of two requests"""
+        return 1 / self.rate
+
+    def _reserve(self) -> float:
+        """take the next free start time, returns the seconds to wait for it"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.delay
+            return start - now
+
+    def wait(self):
+        """Wait until the next request may start"""
+        wait_time = self._reserve()
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+    async def wait_async(self):
+        """Wait in the event loop until the next request may start"""
+        wait_time = self._reserve()
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+
+    def record(self, latency: float, ok: bool = True):
+        """Adjust the rate by the latency and the outcome of a response"""
+        with self._lock:
+            self.number_requests += 1
+            self.latency = latency if self.latency is None else (1 - self.smoothing) * self.latency + self.smoothing * latency
+            self.error_rate = (1 - self.smoothing) * self.error_rate + self.smoothing * (0.0 if ok else 1.0)
+            if ok and (latency <= self.slow_latency):
+                self.rate = min(self.target_rate, self.rate + self.increase)
+                return
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        self.logger.info(f"Back off to {self.rate:.3f} request(s)/s: latency={latency:.2f}s, ok={ok}, {self.stats()}")
+
+    @contextmanager
+    def request(self):
+        """Wait for the turn of a request, and record its latency and whether it raised"""
+        self.wait()
+        start = time.monotonic()
+        try:
+            yield
+        except Exception:
+            self.record(time.monotonic() - start, ok=False)
+            raise
+        self.record(time.monotonic() - start, ok=True)
+
+    def stats(self) -> Dict[str, float]:
+        return {"rate": self.rate, "latency": self.latency, "error_rate": self.error_rate, "requests": self.number_requests}
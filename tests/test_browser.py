@@ -5,7 +5,14 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 import random
 
+from selenium.common.exceptions import TimeoutException
+
 from src.cheval.browser.JRA import parse_JRA
+from src.cheval.browser.navigator import Navigator
+from src.cheval.browser.browser import build_options
+from src.cheval.browser.pool import BrowserPool
+from src.cheval.browser.readiness import ReadinessEngine, ActionTimings, PageReadiness, READINESS
+from src.cheval.models.models import DataType
 
 '''
 def test_browser():
@@ -98,6 +105,139 @@ def test_browser():
     db.close()
 '''
 
+class ScriptedDriver:
+    """return the states of the page one poll after another, the last one is kept"""
+
+    def __init__(self, states):
+        self.states = states
+        self.polls = 0
+
+    def execute_script(self, script, *args):
+        state = self.states[min(self.polls, len(self.states) - 1)]
+        self.polls += 1
+        return state
+
+def state(complete=True, count=0, resources=0, size=0):
+    return {"complete": complete, "count": count, "resources": resources, "size": size}
+
+def test_readiness_engine():
+    engine = ReadinessEngine(poll_interval=0)
+    # the old document, no rows yet, the rows still growing, then stable
+    driver = ScriptedDriver([state(complete=False, count=9, size=300), state(count=0, size=50), state(count=5, size=100),
+                             state(count=12, size=180), state(count=12, size=180)])
+    engine.wait(driver, READINESS[DataType.MATCH])
+    assert driver.polls == 5
+    # the odds also wait until no resource is loaded any more
+    driver = ScriptedDriver([state(count=18, resources=3, size=200), state(count=18, resources=4, size=200), state(count=18, resources=4, size=200)])
+    engine.wait(driver, READINESS[DataType.ODDS_TAN])
+    assert driver.polls == 3
+    # without stability conditions the first usable poll is enough
+    driver = ScriptedDriver([state(count=1, size=10)])
+    engine.wait(driver, PageReadiness(selector="td.date", stable_dom=False))
+    assert driver.polls == 1
+    try:
+        engine.wait(ScriptedDriver([state(complete=False)]), READINESS[DataType.RACE], time_out=0)
+        assert False
+    except TimeoutException:
+        pass
+    timings = ActionTimings()
+    timings.record("get", 1.0)
+    timings.record("get", 2.0)
+    assert timings.summary()["get"] == {"count": 2, "total": 3.0, "mean": 1.5}
+
+class TabBrowser:
+    """record the calls of the navigator, the pages are opened in tabs"""
+
+    def __init__(self):
+        self.calls = []
+        self.tabs = 1
+
+    def open_tab(self, url):
+        self.tabs += 1
+        self.calls.append(f"open_tab {url}")
+
+    def open_tab_by_action(self, action):
+        self.tabs += 1
+        self.calls.append(f"open_tab_by_action {action}")
+
+    def wait_until_ready(self, data_type):
+        self.calls.append(f"ready {data_type.value}")
+
+    def get_html(self):
+        return f"tab {self.tabs}"
+
+    def close_tab(self):
+        self.tabs -= 1
+        self.calls.append("close_tab")
+
+def test_navigator_tabs():
+    browser = TabBrowser()
+    navigator = Navigator(browser, use_tabs=True)
+    assert navigator.get_match_html("doAction('/JRADB/accessS.html', 'pw01srl10012025020520250906/A8')") == "tab 2"
+    assert navigator.get_horse_html("https://jra.jp/JRADB/accessU.html?CNAME=pw01dud102014102254/C6") == "tab 2"
+    # the first tab is never left, nor reloaded by going back
+    assert browser.tabs == 1
+    assert browser.calls == ["open_tab_by_action doAction('/JRADB/accessS.html', 'pw01srl10012025020520250906/A8')", "ready match", "close_tab",
+                             "open_tab https://jra.jp/JRADB/accessU.html?CNAME=pw01dud102014102254/C6", "ready horse", "close_tab"]
+
+def test_build_options():
+    options = build_options(lean=True)
+    assert "--headless=new" in options.arguments
+    assert "--disable-gpu" in options.arguments
+    assert "--disable-extensions" in options.arguments
+    assert "--start-maximized" not in options.arguments
+    assert options.experimental_options["prefs"]["profile.managed_default_content_settings.images"] == 2
+    assert "--start-maximized" in build_options(lean=False).arguments
+
+class PooledBrowser:
+    def __init__(self):
+        self.alive = True
+        self.number_pages = 0
+        self.memory = 10.0
+
+    def is_alive(self):
+        return self.alive
+
+    def memory_mb(self):
+        return self.memory
+
+class PooledNavigator:
+    def __init__(self):
+        self.browser = PooledBrowser()
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+def test_browser_pool():
+    pool = BrowserPool(size=1, max_pages=100, max_memory_mb=500, navigator_factory=PooledNavigator)
+    with pool.lease() as first:
+        first.browser.number_pages = 40
+    # the warm browser is lent again for the next month
+    with pool.lease() as second:
+        assert second is first
+        second.browser.number_pages = 100
+    # worn out after max_pages
+    assert first.closed
+    with pool.lease() as third:
+        assert third is not first
+        third.browser.memory = 800
+    assert third.closed
+    fourth = pool.acquire()
+    try:
+        pool.acquire()
+        assert False
+    except RuntimeError:
+        pass
+    pool.release(fourth)
+    # a dead session is replaced when it is lent
+    fourth.browser.alive = False
+    with pool.lease() as fifth:
+        assert fifth is not fourth
+    assert pool.stats() == {"idle": 1, "lent": 0, "started": 4, "recycled": 3}
+    pool.close()
+    assert fifth.closed
+
 if __name__ == "__main__":
     year = 2025 #random.choice(range(2020, 2025))
     month = 8 #random.choice(range(1, 13))
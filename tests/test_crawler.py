@@ -0,0 +1,461 @@
+# test_crawler.py
+
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from functools import partial
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs
+
+import pytest
+from bs4 import BeautifulSoup
+
+from examples import html
+from src.cheval.browser.crawler import FrontierCrawler, seed_month
+from src.cheval.browser.parallel import ParallelCrawler
+from src.cheval.browser.async_crawler import AsyncCrawler, AsyncFetcher
+from src.cheval.browser import JRA
+from src.cheval.browser.JRA import parse_JRA, parse_JRA_range
+from src.cheval.browser.refresh import RefreshCrawler
+from src.cheval.browser.replay import ReplayNavigator
+from src.cheval.models.models import DataType, CodeNameLinkAction, SummaryOfJockeyTrainer, TaskState
+from src.cheval.storage.database import ChevalDB
+from src.cheval.storage.code_index import CodeIndex
+from src.cheval.storage.frontier import CrawlFrontier
+from src.cheval.storage.freshness import FRESHNESS, Freshness
+from src.cheval.storage.html_storage import HTMLStorage
+from src.cheval.utils.scheduler import PolitenessScheduler
+from tests.test_fetcher import start_server
+
+HTML_MONTH = """<div class="past_result_line_unit"><div class="link_list multi div3 mid center narrow">
+<a href="#" onclick="return doAction('/JRADB/accessS.html', 'pw01srl10012025020520250906/A8');">2回札幌5日</a>
+</div></div>"""
+
+HTML_MONTH_TWO_MATCHES = """<div class="past_result_line_unit"><div class="link_list multi div3 mid center narrow">
+<a href="#" onclick="return doAction('/JRADB/accessS.html', 'pw01srl10012025020520250906/A8');">2回札幌5日</a>
+<a href="#" onclick="return doAction('/JRADB/accessS.html', 'pw01srl10042025030520250906/B2');">3回新潟5日</a>
+</div></div>"""
+
+def trim_rows(the_html: str, selector: str, number: int) -> str:
+    """keep only the first rows of a table to make the crawl small"""
+    soup = BeautifulSoup(the_html, "html.parser")
+    for row in soup.select(selector)[number:]:
+        row.decompose()
+    return str(soup)
+
+class Interrupted(BaseException):
+    pass
+
+class FakeNavigator:
+    """serve the example pages instead of the site, and record every page loaded"""
+
+    def __init__(self, interrupt_at: int = None, month_html: str = HTML_MONTH):
+        self.loaded = []
+        self.interrupt_at = interrupt_at
+        self.month_html = month_html
+        self.match_html = trim_rows(html.html_match_1, "tbody tr", 1)
+        self.race_html = trim_rows(html.html_race_1, "table.basic.narrow-xy.striped tbody tr", 2)
+
+    def _load(self, page: str):
+        if (self.interrupt_at is not None) and (len(self.loaded) == self.interrupt_at):
+            raise Interrupted(page)
+        self.loaded.append(page)
+
+    def go_to_search_page(self):
+        pass
+
+    def search_by_year_month(self, year: int, month: int):
+        self._load(f"month {year}{month}")
+
+    def get_html(self):
+        return self.month_html
+
+    def get_match_html(self, action: str):
+        self._load(action)
+        return self.match_html
+
+    def get_race_html(self, link: str):
+        self._load(link)
+        return self.race_html
+
+    def get_horse_html(self, link: str):
+        self._load(link)
+        return html.html_horse_2
+
+    def get_jockey_trainer_html(self, action: str):
+        self._load(action)
+        if "accessK" in action:
+            return html.html_jockey_summary_1 if "kps" in action else html.html_jockey_1
+        return html.html_trainer_summary_1 if "cps" in action else html.html_trainer_1
+
+    def get_odds_tan_html(self, action: str):
+        self._load(action)
+        return html.html_odds_tan_1
+
+    def close(self):
+        pass
+
+class SlowJRA(BaseHTTPRequestHandler):
+    """serve the pages of FakeNavigator by HTTP, every response takes a while, and record the most requests at once"""
+    protocol_version = "HTTP/1.1"
+    pages = FakeNavigator()
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+    requests = []
+
+    def do_GET(self):
+        link = self.path
+        self.send_page(self.pages.get_race_html(link) if "accessS" in link else self.pages.get_horse_html(link))
+
+    def do_POST(self):
+        form = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode("ascii"))
+        action = f"doAction('{self.path}', '{form['cname'][0]}')"
+        if "accessS" in self.path:
+            self.send_page(self.pages.get_match_html(action))
+        elif "accessO" in self.path:
+            self.send_page(self.pages.get_odds_tan_html(action))
+        else:
+            self.send_page(self.pages.get_jockey_trainer_html(action))
+
+    def send_page(self, page: str):
+        with SlowJRA.lock:
+            SlowJRA.active += 1
+            SlowJRA.peak = max(SlowJRA.peak, SlowJRA.active)
+            SlowJRA.requests.append(self.path)
+        time.sleep(0.2)
+        with SlowJRA.lock:
+            SlowJRA.active -= 1
+        body = page.encode("cp932", errors="xmlcharrefreplace")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=Shift_JIS")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def open_fake_navigator():
+    return FakeNavigator(month_html=HTML_MONTH_TWO_MATCHES)
+
+def test_frontier_order(tmp_path):
+    frontier = CrawlFrontier(folder=str(tmp_path))
+    month = frontier.push(CodeNameLinkAction(thetype=DataType.MONTH, code="202509"), root_code="202509")
+    assert frontier.claim().id == month.id
+    race = frontier.push(CodeNameLinkAction(thetype=DataType.RACE, code="r1"), root_code="202509", parent=month)
+    odds = frontier.push(CodeNameLinkAction(thetype=DataType.ODDS_TAN, code="o1"), root_code="202509", parent=race)
+    # children wait until their parent is done
+    assert frontier.claim() is None
+    frontier.finish(month)
+    assert frontier.claim().id == race.id
+    assert frontier.claim() is None
+    frontier.finish(race)
+    assert frontier.claim().id == odds.id
+    # the same page is only pushed once
+    assert frontier.push(CodeNameLinkAction(thetype=DataType.RACE, code="r1"), root_code="202509").id == race.id
+    # a task left running by an interrupted crawl is taken again
+    assert frontier.reset() == 1
+    assert frontier.claim().id == odds.id
+    # a page pending in another month is crawled by this month too, so the month is only complete with it
+    other_month = frontier.push(CodeNameLinkAction(thetype=DataType.MONTH, code="202510"), root_code="202510")
+    frontier.finish(frontier.claim("202510"))
+    other_race = frontier.push(CodeNameLinkAction(thetype=DataType.RACE, code="r1"), root_code="202510", parent=other_month)
+    assert (other_race.id != race.id) and (frontier.claim("202510").id == other_race.id)
+    frontier.close()
+
+def test_frontier_migration(tmp_path):
+    # a frontier made when the pages were unique over all months is rebuilt with its tasks
+    connection = sqlite3.connect(str(tmp_path / "cheval.db"))
+    connection.execute("CREATE TABLE frontier (id INTEGER NOT NULL, thetype VARCHAR, code VARCHAR, name VARCHAR, link VARCHAR, "
+                       "action VARCHAR, parent_id INTEGER, parent_code VARCHAR, root_code VARCHAR, branch_code VARCHAR, "
+                       "state VARCHAR, attempts INTEGER NOT NULL, error VARCHAR, update_time DATETIME, PRIMARY KEY (id), "
+                       "CONSTRAINT uq_frontier_code_thetype UNIQUE (code, thetype))")
+    connection.execute("INSERT INTO frontier (id, thetype, code, root_code, state, attempts) VALUES (1, 'race', 'r1', '202509', 'pending', 0)")
+    connection.commit()
+    connection.close()
+    frontier = CrawlFrontier(folder=str(tmp_path))
+    assert frontier.get_task(DataType.RACE, "r1", "202509").id == 1
+    assert frontier.push(CodeNameLinkAction(thetype=DataType.RACE, code="r1"), root_code="202510").id != 1
+    frontier.close()
+    # the indexes of the claim and of the counts are added to the rebuilt table
+    connection = sqlite3.connect(str(tmp_path / "cheval.db"))
+    indexes = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'frontier'")}
+    plan = connection.execute("EXPLAIN QUERY PLAN SELECT state, count(*) FROM frontier WHERE root_code = '202509' GROUP BY state").fetchall()
+    connection.close()
+    assert {"ix_frontier_root_state", "ix_frontier_parent_id"} <= indexes
+    assert "ix_frontier_root_state" in plan[0][3]
+
+def test_crawler_resume(tmp_path):
+    db = ChevalDB(folder=str(tmp_path))
+    frontier = CrawlFrontier(folder=str(tmp_path))
+    seed_month(db, frontier, 2025, 9)
+    root_dir = str(tmp_path / "html")
+    first = FakeNavigator(interrupt_at=5)
+    try:
+        FrontierCrawler(navigator=first, db=db, frontier=frontier, root_dir_for_save=root_dir).run(root_code="202509")
+    except Interrupted:
+        pass
+    assert db.get_month_by_code("202509") is None
+    print(f"\nbefore the interruption: {frontier.count_by_state('202509')}")
+    second = FakeNavigator()
+    FrontierCrawler(navigator=second, db=db, frontier=frontier, root_dir_for_save=root_dir).run(root_code="202509")
+    print(f"\nafter the restart: {frontier.count_by_state('202509')}")
+    # no page finished before the interruption is loaded again
+    assert not (set(first.loaded) & set(second.loaded))
+    assert max(Counter(first.loaded + second.loaded).values()) == 1
+    assert frontier.count_unfinished("202509") == 0
+    assert db.get_month_by_code("202509").number_races == 1
+    report = FrontierCrawler(navigator=None, db=db, frontier=frontier).navigation_report("202509")
+    print(f"\nnavigation: {report}")
+    # the interrupted page was claimed twice, and no page is reloaded by going back
+    assert report["pages"] == 12
+    assert report["page_loads"] == 13
+    # the nested crawl loaded the 12 pages and went back after each of them
+    assert report["nested_page_loads"] == 24
+    assert report["page_loads_saved"] == 11
+    race_code = "pw01sde1001202502050120250906/8B"
+    results = db.get_results_by_race_code(race_code)
+    assert len(results) == 2
+    assert all(result.odds_tan is not None for result in results)
+    assert frontier.get_task(DataType.ODDS_TAN, frontier.get_children(frontier.get_task(DataType.RACE, race_code), DataType.ODDS_TAN)[0].code).state == TaskState.DONE
+    frontier.close()
+    db.close()
+
+def count_summaries(db: ChevalDB) -> int:
+    codes = db.get_code_keys(DataType.JOCKEY) + db.get_code_keys(DataType.TRAINER)
+    return sum(len(db.get_summaries_by_jockey_trainer_code(code)) for code, _ in codes)
+
+def test_concurrent_crawls(tmp_path):
+    db = ChevalDB(folder=str(tmp_path))
+    root_dir = str(tmp_path / "html")
+    # the second crawl loads its index before the first one stores anything, as a concurrent month worker would
+    late = CodeIndex(db)
+    first = CrawlFrontier(folder=str(tmp_path / "first"))
+    seed_month(db, first, 2025, 9)
+    FrontierCrawler(navigator=FakeNavigator(), db=db, frontier=first, root_dir_for_save=root_dir).run(root_code="202509")
+    number_summaries = count_summaries(db)
+    assert number_summaries > 0
+    second = CrawlFrontier(folder=str(tmp_path / "second"))
+    second.push(CodeNameLinkAction(thetype=DataType.MONTH, code="202509", name="202509"), root_code="202509")
+    FrontierCrawler(navigator=FakeNavigator(), db=db, frontier=second, code_index=late, root_dir_for_save=root_dir).run(root_code="202509")
+    # the jockeys and trainers are stored by the first crawl, so their summaries are skipped by the second
+    assert count_summaries(db) == number_summaries
+    assert second.get_tasks([TaskState.SKIPPED], thetype=DataType.JOCKEY_SUMMARY)
+    assert not second.get_tasks([TaskState.DONE], thetype=DataType.JOCKEY_SUMMARY)
+    # a summary claimed again after a crash, before its task was marked as done, is not inserted again
+    summary_task = first.get_tasks([TaskState.DONE], thetype=DataType.JOCKEY_SUMMARY)[0]
+    crawler = FrontierCrawler(navigator=FakeNavigator(), db=db, frontier=first, root_dir_for_save=root_dir)
+    assert crawler._is_stored(summary_task)
+    first.release(summary_task)
+    crawler.run(root_code="202509")
+    assert crawler.navigator.loaded == [summary_task.action]
+    assert count_summaries(db) == number_summaries
+    # a page of summaries inserted again adds nothing
+    jockey_code = db.get_code_keys(DataType.JOCKEY)[0][0]
+    rows = db.get_summaries_by_jockey_trainer_code(jockey_code)
+    db.insert_jockey_trainer_summary_list([SummaryOfJockeyTrainer(**row.model_dump(exclude={"id"})) for row in rows])
+    assert len(db.get_summaries_by_jockey_trainer_code(jockey_code)) == len(rows)
+    first.close()
+    second.close()
+    db.close()
+
+def test_parallel_crawler(tmp_path):
+    db = ChevalDB(folder=str(tmp_path))
+    frontier = CrawlFrontier(folder=str(tmp_path))
+    seed_month(db, frontier, 2025, 9)
+    crawler = ParallelCrawler(db=db, frontier=frontier, number_workers=2, navigator_factory=open_fake_navigator,
+                              root_dir_for_save=str(tmp_path / "html"))
+    number_done = crawler.run(root_code="202509")
+    print(f"\nparallel crawl: {frontier.count_by_state('202509')}")
+    # the second match serves the same race, which is only crawled once
+    assert number_done == 13
+    assert frontier.count_unfinished("202509") == 0
+    assert db.get_month_by_code("202509").number_races == 2
+    assert len(db.get_results_by_race_code("pw01sde1001202502050120250906/8B")) == 2
+    # the pages of the workers are saved under the given folder
+    assert any((tmp_path / "html").iterdir())
+    frontier.close()
+    db.close()
+
+class DyingNavigator(FakeNavigator):
+    """the first navigator which loads a race kills its worker process"""
+
+    def __init__(self, marker: str):
+        super().__init__(month_html=HTML_MONTH_TWO_MATCHES)
+        self.marker = marker
+
+    def get_race_html(self, link: str):
+        try:
+            os.close(os.open(self.marker, os.O_CREAT | os.O_EXCL))
+        except FileExistsError:
+            return super().get_race_html(link)
+        os._exit(1)
+
+def open_dying_navigator(marker: str):
+    return DyingNavigator(marker)
+
+def test_parallel_crawler_dead_worker(tmp_path):
+    db = ChevalDB(folder=str(tmp_path))
+    frontier = CrawlFrontier(folder=str(tmp_path))
+    seed_month(db, frontier, 2025, 9)
+    crawler = ParallelCrawler(db=db, frontier=frontier, number_workers=2, poll_interval=0.5,
+                              navigator_factory=partial(open_dying_navigator, str(tmp_path / "died")),
+                              root_dir_for_save=str(tmp_path / "html"))
+    number_done = crawler.run(root_code="202509")
+    print(f"\nparallel crawl with a dead worker: {frontier.count_by_state('202509')}")
+    # the matches and the race of the dead worker are taken by the other worker
+    assert (tmp_path / "died").exists()
+    assert number_done == 13
+    assert frontier.count_unfinished("202509") == 0
+    assert db.get_month_by_code("202509").number_races == 2
+    frontier.close()
+    db.close()
+
+def test_async_crawler(tmp_path):
+    server, base_url = start_server(SlowJRA)
+    db = ChevalDB(folder=str(tmp_path))
+    frontier = CrawlFrontier(folder=str(tmp_path))
+    seed_month(db, frontier, 2025, 9)
+    crawler = AsyncCrawler(db=db, frontier=frontier, fetcher=AsyncFetcher(concurrency=8, per_host=8, scheduler=PolitenessScheduler(target_rate=1000), base_url=base_url),
+                           month_navigator_factory=FakeNavigator, root_dir_for_save=str(tmp_path / "html"))
+    parse, threads = crawler.crawler.parse, set()
+    def record_thread(task, html):
+        threads.add(threading.get_ident())
+        return parse(task, html)
+    crawler.crawler.parse = record_thread
+    number_done = crawler.run(root_code="202509")
+    print(f"\nasync crawl: {frontier.count_by_state('202509')}, at most {SlowJRA.peak} request(s) at once")
+    assert number_done == 12
+    # the month is searched by the browser, the other 11 pages by HTTP
+    assert len(SlowJRA.requests) == 11
+    assert SlowJRA.peak > 1
+    # the pages are parsed off the thread of the event loop
+    assert threads and threading.get_ident() not in threads
+    assert frontier.count_unfinished("202509") == 0
+    assert db.get_month_by_code("202509").number_races == 1
+    results = db.get_results_by_race_code("pw01sde1001202502050120250906/8B")
+    assert len(results) == 2
+    assert all(result.odds_tan is not None for result in results)
+    assert any((tmp_path / "html").iterdir())
+    frontier.close()
+    db.close()
+    server.shutdown()
+
+def test_refresh_crawler(tmp_path):
+    db = ChevalDB(folder=str(tmp_path))
+    frontier = CrawlFrontier(folder=str(tmp_path))
+    seed_month(db, frontier, 2025, 9)
+    root_dir = str(tmp_path / "html")
+    FrontierCrawler(navigator=FakeNavigator(), db=db, frontier=frontier, root_dir_for_save=root_dir).run(root_code="202509")
+    jockeys, trainers = db.get_code_keys(DataType.JOCKEY), db.get_code_keys(DataType.TRAINER)
+    horse_code = db.get_code_keys(DataType.HORSE)[0][0]
+    jockey_code = jockeys[0][0]
+    summaries = len(db.get_summaries_by_jockey_trainer_code(jockey_code))
+    # nothing is stale right after the crawl
+    navigator = FakeNavigator()
+    assert RefreshCrawler(navigator=navigator, db=db, frontier=frontier, root_dir_for_save=root_dir).run()["stale"] == 0
+    assert not navigator.loaded
+    # after ten days only the jockeys and trainers are stale, the immutable races are never fetched again
+    report = RefreshCrawler(navigator=navigator, db=db, frontier=frontier, root_dir_for_save=root_dir).run(now=datetime.now() + timedelta(days=10))
+    print(f"\nrefresh: {report}")
+    assert report["stale"] == report["refreshed"] == len(jockeys) + len(trainers)
+    assert len(navigator.loaded) == report["refreshed"]
+    assert all("accessK" in page or "accessC" in page for page in navigator.loaded)
+    # the summaries of the page are replaced, not added again, and the history is kept
+    assert len(db.get_summaries_by_jockey_trainer_code(jockey_code)) == summaries
+    assert db.get_jockey_by_code(jockey_code).update_time > datetime.now() - timedelta(minutes=1)
+    # after forty days the horses are stale too
+    before = len(db.get_results_by_horse_code(horse_code))
+    navigator = FakeNavigator()
+    report = RefreshCrawler(navigator=navigator, db=db, frontier=frontier, root_dir_for_save=root_dir).run(now=datetime.now() + timedelta(days=40))
+    assert report["refreshed"] == report["stored"] == report["stale"]
+    assert len(db.get_results_by_horse_code(horse_code)) == before
+    # without the frontier of the crawl, the pages are reached by the stored codes
+    empty_frontier = CrawlFrontier(folder=str(tmp_path / "empty"))
+    navigator = FakeNavigator()
+    report = RefreshCrawler(navigator=navigator, db=db, frontier=empty_frontier, root_dir_for_save=root_dir).run(now=datetime.now() + timedelta(days=40))
+    assert report["refreshed"] == report["stored"] == report["stale"]
+    assert f"https://jra.jp/JRADB/accessU.html?CNAME={horse_code}" in navigator.loaded
+    assert f"return doAction('/JRADB/accessK.html', '{jockey_code}');" in navigator.loaded
+    empty_frontier.close()
+    frontier.close()
+    db.close()
+
+def test_replay_navigator(tmp_path):
+    root_dir = str(tmp_path / "html")
+    db = ChevalDB(folder=str(tmp_path / "live"))
+    frontier = CrawlFrontier(folder=str(tmp_path / "live"))
+    seed_month(db, frontier, 2025, 9)
+    FrontierCrawler(navigator=FakeNavigator(), db=db, frontier=frontier, root_dir_for_save=root_dir).run(root_code="202509")
+    storage = HTMLStorage(root_dir=root_dir)
+    number_snapshots = len(storage.list_pages(latest_only=False))
+    # the re-run of the archived month is served by the archive, the live navigator is never started
+    replay_db = ChevalDB(folder=str(tmp_path / "replay"))
+    replay_frontier = CrawlFrontier(folder=str(tmp_path / "replay"))
+    seed_month(replay_db, replay_frontier, 2025, 9)
+    navigator = ReplayNavigator(live_factory=FakeNavigator, root_dir=root_dir)
+    start = time.monotonic()
+    number_done = FrontierCrawler(navigator=navigator, db=replay_db, frontier=replay_frontier, root_dir_for_save=root_dir).run(root_code="202509")
+    print(f"\nreplay: {navigator.stats()} in {time.monotonic() - start:.2f}s")
+    assert number_done == 12
+    assert navigator.live is None
+    assert sum(navigator.hits.values()) == 12 and not navigator.misses
+    assert sorted(replay_db.get_code_keys(), key=str) == sorted(db.get_code_keys(), key=str)
+    # the replayed pages are not saved again, so they do not look fetched now
+    assert len(storage.list_pages(latest_only=False)) == number_snapshots
+    navigator.close()
+    # with a policy where horses go stale at once, only the horses go to the site
+    policy = {**FRESHNESS, DataType.HORSE: Freshness(ttl=timedelta(0))}
+    navigator = ReplayNavigator(live_factory=FakeNavigator, storage=storage, policy=policy)
+    fetcher = FrontierCrawler(navigator=navigator, db=None, frontier=None)
+    for task in replay_frontier.get_tasks(states=[TaskState.DONE]):
+        fetcher.fetch(task)
+        assert navigator.replayed == (task.thetype != DataType.HORSE)
+    assert navigator.misses == Counter({DataType.HORSE.value: len(db.get_code_keys(DataType.HORSE))})
+    assert all("accessU" in page for page in navigator.live.loaded)
+    # the summaries of the jockeys go stale with the jockeys
+    summary_task = replay_frontier.get_tasks(states=[TaskState.DONE], thetype=DataType.JOCKEY_SUMMARY)[0]
+    assert navigator._lookup([DataType.JOCKEY_SUMMARY], summary_task.code) is not None
+    assert navigator._lookup([DataType.JOCKEY_SUMMARY], summary_task.code, now=datetime.now() + timedelta(days=30)) is None
+    storage.close()
+    for each in (frontier, db, replay_frontier, replay_db):
+        each.close()
+
+def test_parse_JRA_closes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    navigator, closed = FakeNavigator(interrupt_at=3), []
+    navigator.close = lambda: closed.append("navigator")
+    monkeypatch.setattr(JRA, "open_navigator", lambda **options: navigator)
+    monkeypatch.setattr(CrawlFrontier, "close", lambda self: closed.append("frontier"))
+    monkeypatch.setattr(ChevalDB, "close", lambda self: closed.append("db"))
+    # the navigator and the databases are closed even when the crawl of the month raises
+    with pytest.raises(Interrupted):
+        parse_JRA(2025, 9)
+    assert closed == ["navigator", "frontier", "db"]
+
+def fake_month_crawler(year: int, month: int, pool=None, **options):
+    if (year, month) == (2025, 2):
+        raise ValueError("the search page is down")
+    if (year, month) == (2025, 3):
+        # the crawl of the month returns, but its page is left pending
+        frontier = CrawlFrontier()
+        frontier.push(CodeNameLinkAction(thetype=DataType.MONTH, code="202503", name="202503"), root_code="202503")
+        frontier.close()
+    return {"pages": month, "page_loads": month, "nested_page_loads": 2 * month, "page_loads_saved": month}
+
+def test_range_crawl(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    summary = parse_JRA_range(2024, 11, 2025, 4, number_workers=2, month_crawler=fake_month_crawler, use_http=True)
+    print(f"\nrange crawl: {summary}")
+    # 2024-11, 2024-12, 2025-01, 2025-02 and 2025-03
+    assert summary["months"] == 5
+    assert summary["done"] == 3
+    assert sorted(summary["failed"]) == ["202502", "202503"]
+    assert summary["pages"] == 11 + 12 + 1 + 3
+    assert summary["page_loads_saved"] == 11 + 12 + 1 + 3
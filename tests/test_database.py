@@ -3,7 +3,261 @@
 import sys, os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
+import gzip
+import sqlite3
+import time
+from datetime import datetime
+
+import zstandard
+
+from src.cheval.browser.crawler import FrontierCrawler, seed_month
 from src.cheval.storage.database import ChevalDB
+from src.cheval.storage.code_index import CodeIndex, BloomFilter
+from src.cheval.storage.frontier import CrawlFrontier
+from src.cheval.storage.html_storage import HTMLStorage
+from src.cheval.storage.reparse import reparse_archive
+from src.cheval.storage.segments import SegmentStore
+from src.cheval.storage.archive_index import ArchiveIndex
+from src.cheval.storage.archive_writer import ArchiveWriter
+from src.cheval.parsers.jockey_parser import JockeyParser
+from src.cheval.models.models import DataType, Month, TaskState, ResultOfRace, OddsTan
+from tests.test_crawler import FakeNavigator, trim_rows
+from examples import html
+
+def test_code_index(tmp_path):
+    db = ChevalDB(folder=str(tmp_path), hits_flush_size=3)
+    for code in ("202501", "202502", "202503"):
+        db.insert_month(Month(code=code, number_races=1))
+    for use_bloom in (False, True):
+        index = CodeIndex(db, use_bloom=use_bloom)
+        assert index.check("202501", DataType.MONTH)
+        assert index.check("202501", DataType.MONTH)
+        assert not index.check("202504", DataType.MONTH)
+        assert not index.check("202501", DataType.MATCH)
+        index.add("202504", DataType.MONTH)
+        # the third hit flushes the counts in one batch
+        assert index.check("202504", DataType.MONTH)
+        assert not db.code_hits.hits
+    index.confirm(["202502", "202503", "202505"], DataType.MONTH)
+    assert {"202502", "202503"} <= index.codes[DataType.MONTH]
+    index.flush()
+    counts = {record.code: record.count for record in db.get_all_codes()}
+    assert counts == {"202501": 5, "202502": 1, "202503": 1}
+    db.close()
+
+def test_entity_tables(tmp_path):
+    db = ChevalDB(folder=str(tmp_path))
+    db.close()
+    with sqlite3.connect(tmp_path / "cheval.db") as connection:
+        tables = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    # the frontier and the archive tables are only made by CrawlFrontier and ArchiveIndex
+    assert "month" in tables and "code" in tables
+    assert not tables & {"frontier", "page_snapshot", "page_blob"}
+
+def test_update_odds_tan_scratched(tmp_path):
+    # a scratched horse (取消) has no odds, its result keeps odds None
+    db = ChevalDB(folder=str(tmp_path))
+    race_code = "pw01sde1001202502050120250906/8B"
+    db.insert_race_result_list([ResultOfRace(race_code=race_code, num=1), ResultOfRace(race_code=race_code, num=2)])
+    db.update_odds_tan(race_code=race_code, theoddstan=OddsTan(code="odds", odds={1: 2.6}))
+    assert {result.num: result.odds_tan for result in db.get_results_by_race_code(race_code)} == {1: 2.6, 2: None}
+    db.close()
+
+def test_read_only_check(tmp_path):
+    db = ChevalDB(folder=str(tmp_path), hits_flush_size=1000)
+    codes = [f"2025{i:02d}" for i in range(1, 13)]
+    for code in codes:
+        db.insert_month(Month(code=code, number_races=1))
+    assert db.exists_code("202501", DataType.MONTH)
+    assert not db.exists_code("202501", DataType.MATCH)
+    # the bulk probe takes many codes at once, repeated ones are probed once
+    probe = codes + [f"2024{i:02d}" for i in range(1, 13)]
+    assert db.exists_codes(probe * 50, DataType.MONTH) == set(codes)
+    assert db.exists_codes([], DataType.MONTH) == set()
+    # a check is a read, the hits are only written when they are flushed
+    for _ in range(3):
+        assert db.check_code("202501", DataType.MONTH) is not None
+    assert db.check_code("202401", DataType.MONTH) is None
+    assert {record.code: record.count for record in db.get_all_codes()}["202501"] == 1
+    assert db.code_hits.flush() == 1
+    assert {record.code: record.count for record in db.get_all_codes()}["202501"] == 4
+    # the hits left are written when the database is closed
+    db.check_code("202502", DataType.MONTH)
+    db.close()
+    db = ChevalDB(folder=str(tmp_path))
+    assert {record.code: record.count for record in db.get_all_codes()}["202502"] == 2
+    db.close()
+
+def test_bloom_filter():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"pw04kmk{i:06d}")
+    assert all(f"pw04kmk{i:06d}" in bloom for i in range(1000))
+    false_positives = sum(f"pw05cmk{i:06d}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+def test_content_addressed_archive(tmp_path):
+    storage = HTMLStorage(root_dir=str(tmp_path))
+    code = "pw01dud102022104401/B0"
+    html = "<html><body>馬</body></html>"
+    paths = {storage.save_html(page_type=DataType.HORSE, code=code, html=html) for _ in range(3)}
+    # the unchanged page is stored once, every fetch is recorded
+    assert len(paths) == 1
+    assert len(list(storage.segments.stream())) == 1
+    assert [storage.read_page(page) for page in storage.list_pages(latest_only=False)] == [html] * 3
+    assert not storage.changed(DataType.HORSE, code, html)
+    assert storage.changed(DataType.HORSE, code, html + "<p></p>")
+    assert storage.changed(DataType.JOCKEY, code, html)
+    storage.save_html(page_type=DataType.HORSE, code=code, html=html + "<p></p>")
+    assert len(list(storage.segments.stream())) == 2
+    pages = storage.list_pages()
+    assert [(page.code, storage.read_page(page)) for page in pages] == [(code, html + "<p></p>")]
+    # a race keeps no history
+    for i in range(2):
+        storage.save_html(page_type=DataType.RACE, code="pw01sde1001202502050120250906/8B", html=f"<html>{i}</html>")
+    assert len(storage.list_pages([DataType.RACE], latest_only=False)) == 1
+    # the pages saved one file per fetch are listed and read once they are indexed
+    storage_of_files = os.path.join(tmp_path, DataType.JOCKEY.value)
+    os.makedirs(storage_of_files)
+    with gzip.open(os.path.join(storage_of_files, "pw04kmk001234_5B_20250101_120000.html.gz"), "wt", encoding="utf-8") as f:
+        f.write(html)
+    assert storage.index_files() == 1
+    assert storage.index_files() == 0
+    pages = storage.list_pages()
+    assert {(page.page_type, page.code) for page in pages} == {
+        (DataType.HORSE, code), (DataType.RACE, "pw01sde1001202502050120250906/8B"), (DataType.JOCKEY, "pw04kmk001234/5B")}
+    assert sorted(html for _, html in storage.stream_pages(pages)) == sorted(storage.read_page(page) for page in pages)
+    storage.close()
+
+def test_archive_queries(tmp_path):
+    root_dir = str(tmp_path)
+    storage = HTMLStorage(root_dir=root_dir)
+    code = "pw04kmk001234/5B"
+    storage.save_html(page_type=DataType.JOCKEY, code=code, html="<html>1</html>", url="https://www.jra.go.jp/JRADB/accessK.html")
+    start = datetime.now()
+    storage.save_html(page_type=DataType.JOCKEY, code=code, html="<html>2</html>")
+    storage.save_html(page_type=DataType.HORSE, code="pw01dud102022104401/B0", html="<html>3</html>")
+    assert storage.read_page(storage.latest_page(code)) == "<html>2</html>"
+    assert storage.latest_page(code, DataType.HORSE) is None
+    assert storage.latest_page("pw04kmk999999/00") is None
+    assert [page.url for page in storage.pages_between(DataType.JOCKEY, end=start)] == ["https://www.jra.go.jp/JRADB/accessK.html"]
+    assert [storage.read_page(page) for page in storage.pages_between(DataType.JOCKEY, start=start)] == ["<html>2</html>"]
+    # a page the parser fails on is marked where it is saved, a page not saved is kept as a failed page
+    parser = JockeyParser()
+    for save_html in (True, False):
+        try:
+            parser.parse(html="<html></html>", entity_code=code, save_html=save_html, root_dir_for_save=root_dir)
+        except Exception:
+            pass
+    # the pages are written by the background writer
+    parser.flush()
+    failed = storage.failed_pages()
+    assert [(page.page_type, page.code) for page in failed] == [(DataType.JOCKEY, code), (DataType.FAILED, code)]
+    assert storage.failed_pages([DataType.HORSE]) == []
+    storage.close()
+    # an archive written before the columns were added is upgraded when it is opened
+    path = tmp_path / "old" / "archive.db"
+    os.makedirs(path.parent)
+    with sqlite3.connect(path) as connection:
+        connection.execute("CREATE TABLE page_snapshot (id INTEGER PRIMARY KEY, page_type VARCHAR, code VARCHAR, digest VARCHAR, fetched_at DATETIME)")
+        connection.execute("INSERT INTO page_snapshot (page_type, code, digest, fetched_at) VALUES ('horse', 'h', 'd', '2025-01-01 00:00:00')")
+    index = ArchiveIndex(folder=str(path.parent))
+    assert not index.latest(DataType.HORSE, "h").failed
+    index.close()
+
+def test_segment_store(tmp_path):
+    store = SegmentStore(root_dir=str(tmp_path), max_bytes=20000, dict_size=4096, dict_samples=20)
+    pages = [trim_rows(html.html_horse_2, "tbody tr", i % 7) + f"<!-- {i} -->" for i in range(60)]
+    locations = [store.append(DataType.HORSE, f"{i:064x}", page) for i, page in enumerate(pages)]
+    # the first pages train the dictionary, the next ones are compressed with it
+    dictionaries = os.listdir(tmp_path / "segments" / "horse" / "dictionaries")
+    assert len(dictionaries) == 1
+    assert zstandard.get_frame_parameters(open(tmp_path / locations[-1][0], "rb").read()[locations[-1][1]:]).dict_id == int(dictionaries[0].split(".")[0])
+    assert len(store.segments(DataType.HORSE)) > 1
+    before, after = [location[2] for location in locations[:21]], [location[2] for location in locations[21:42]]
+    print(f"\nframes without the dictionary: {sum(before) / len(before):.0f} bytes, with it: {sum(after) / len(after):.0f} bytes")
+    assert sum(after) < sum(before)
+    # random access by offset, and a read through by another reader
+    assert [store.read(*location) for location in locations] == pages
+    store.close()
+    reader = SegmentStore(root_dir=str(tmp_path))
+    assert list(reader.stream()) == [(f"{i:064x}", page) for i, page in enumerate(pages)]
+    # a record cut off by a crash is left out
+    last = reader.segments(DataType.HORSE)[-1]
+    with open(last, "r+b") as f:
+        f.truncate(os.path.getsize(last) - 1)
+    assert len(list(reader.stream())) == len(pages) - 1
+
+class SlowStorage(HTMLStorage):
+    """an archive on a slow disk"""
+
+    def save_html(self, **kwargs):
+        time.sleep(0.02)
+        return super().save_html(**kwargs)
+
+def test_archive_writer(tmp_path):
+    root_dir = str(tmp_path)
+    writer = ArchiveWriter(root_dir=root_dir, max_queue=2, storage_factory=SlowStorage)
+    for i in range(10):
+        writer.save_html(page_type=DataType.HORSE, code=f"h{i}", html=f"<html>{i}</html>")
+    writer.mark_failed(page_type=DataType.HORSE, code="h9")
+    # the writer falls behind, the queue stays bounded and the caller waits
+    stats = writer.stats()
+    assert stats["peak_depth"] <= 2
+    assert stats["blocked"] > 0
+    writer.flush()
+    stats = writer.stats()
+    print(f"\narchive writer: {stats}")
+    assert stats["depth"] == 0 and stats["written"] == 11 and stats["errors"] == 0
+    assert stats["max_latency"] >= 0.02
+    storage = HTMLStorage(root_dir=root_dir)
+    assert storage.read_page(storage.latest_page("h3", DataType.HORSE)) == "<html>3</html>"
+    assert [page.code for page in storage.failed_pages()] == ["h9"]
+    # the pages still queued are written when the writer is closed
+    writer.save_html(page_type=DataType.HORSE, code="h10", html="<html>10</html>")
+    writer.close()
+    assert storage.latest_page("h10", DataType.HORSE) is not None
+    storage.close()
+
+def test_reparse_archive(tmp_path):
+    source = str(tmp_path / "source")
+    db = ChevalDB(folder=source)
+    frontier = CrawlFrontier(folder=source)
+    seed_month(db, frontier, 2025, 9)
+    FrontierCrawler(navigator=FakeNavigator(), db=db, frontier=frontier, root_dir_for_save=str(tmp_path / "crawl")).run(root_code="202509")
+    # archive every page of the crawl, the horse twice to keep a history
+    storage = HTMLStorage(root_dir=str(tmp_path / "html"))
+    fetcher = FrontierCrawler(navigator=FakeNavigator(), db=None, frontier=None)
+    for task in frontier.get_tasks(states=[TaskState.DONE]):
+        storage.save_html(page_type=task.thetype, code=task.code, html=fetcher.fetch(task))
+    horse_code = db.get_code_keys(DataType.HORSE)[0][0]
+    storage.save_html(page_type=DataType.HORSE, code=horse_code, html=fetcher.fetch(frontier.get_task(DataType.HORSE, horse_code)))
+    assert len(storage.list_pages(latest_only=False)) == len(storage.list_pages()) + 1
+    assert {(page.page_type, page.code) for page in storage.list_pages()} == {(task.thetype, task.code) for task in frontier.get_tasks(states=[TaskState.DONE])}
+    frontier.close()
+    report = reparse_archive(root_dir=str(tmp_path / "html"), folder=str(tmp_path), filename="rebuilt.db",
+                             source_folder=source, number_workers=2)
+    print(f"\nre-parse: {report}")
+    assert not report["failed"]
+    assert sum(report["parsed"].values()) == report["pages"]
+    rebuilt = ChevalDB(folder=str(tmp_path), filename="rebuilt.db")
+    assert sorted(rebuilt.get_code_keys(), key=str) == sorted(db.get_code_keys(), key=str)
+    race_code = "pw01sde1001202502050120250906/8B"
+    assert rebuilt.get_race_by_code(race_code).match_code == db.get_race_by_code(race_code).match_code
+    assert [result.odds_tan for result in rebuilt.get_results_by_race_code(race_code)] == [result.odds_tan for result in db.get_results_by_race_code(race_code)]
+    assert len(rebuilt.get_results_by_horse_code(horse_code)) == len(db.get_results_by_horse_code(horse_code))
+    jockey_code = db.get_code_keys(DataType.JOCKEY)[0][0]
+    assert len(rebuilt.get_summaries_by_jockey_trainer_code(jockey_code)) == len(db.get_summaries_by_jockey_trainer_code(jockey_code))
+    rebuilt.close()
+    # a page the parser fails on is only marked in the index, no copy of it is written to the archive
+    storage.save_html(page_type=DataType.HORSE, code=horse_code, html="<html><body></body></html>")
+    report = reparse_archive(root_dir=str(tmp_path / "html"), folder=str(tmp_path), filename="rebuilt_again.db",
+                             source_folder=source, number_workers=2)
+    assert len(report["failed"]) == 1
+    assert [(page.page_type, page.code) for page in storage.failed_pages()] == [(DataType.HORSE, horse_code)]
+    assert not storage.list_pages(page_types=[DataType.FAILED], latest_only=False)
+    storage.close()
+    db.close()
 
 def export_to_excel():
     db = ChevalDB()
@@ -0,0 +1,198 @@
+# test_fetcher.py
+
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from examples import html
+from src.cheval.browser.fetcher import HTTPFetcher, decode_html
+from src.cheval.browser.http_navigator import HTTPNavigator
+from src.cheval.parsers.parsers import Parsers
+from src.cheval.utils.scheduler import PolitenessScheduler
+
+class StandInJRA(BaseHTTPRequestHandler):
+    """serve the example pages in Shift_JIS like the site, without charset in the header"""
+    protocol_version = "HTTP/1.1"
+    pages = {
+        "/JRADB/accessS.html": html.html_race_1,
+        "/JRADB/accessU.html": html.html_horse_2,
+    }
+    # pages of the doAction scripts, by the path and the head of the cname posted
+    actions = {
+        ("/JRADB/accessS.html", "pw01srl"): html.html_match_1,
+        ("/JRADB/accessO.html", "pw151ou"): html.html_odds_tan_1,
+        ("/JRADB/accessK.html", "pw04kmk"): html.html_jockey_1,
+        ("/JRADB/accessK.html", "pw04kps"): html.html_jockey_summary_1,
+        ("/JRADB/accessC.html", "pw05cmk"): html.html_trainer_1,
+        ("/JRADB/accessC.html", "pw05cps"): html.html_trainer_summary_1,
+    }
+    connections = set()
+    requests = []
+
+    def do_GET(self):
+        StandInJRA.connections.add(self.client_address)
+        StandInJRA.requests.append(self.path)
+        self.send_page(self.pages.get(self.path.split("?")[0]))
+
+    def do_POST(self):
+        StandInJRA.connections.add(self.client_address)
+        form = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode("ascii"))
+        cname = form.get("cname", [""])[0]
+        StandInJRA.requests.append(f"{self.path} {cname}")
+        self.send_page(self.actions.get((self.path, cname[:7])))
+
+    def send_page(self, page):
+        if page is None:
+            self.send_error(404)
+            return
+        body = page.encode("cp932")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_server(handler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def test_decode_html():
+    text = "<html><head><meta charset=\"Shift_JIS\"></head><body>ダート ① ㈱</body></html>"
+    assert decode_html(text.encode("cp932")) == text
+    assert decode_html(text.encode("cp932"), "text/html; charset=Shift_JIS") == text
+    assert decode_html(text.replace("Shift_JIS", "UTF-8").encode("utf-8")) == text.replace("Shift_JIS", "UTF-8")
+
+def test_politeness_scheduler():
+    scheduler = PolitenessScheduler(target_rate=4, min_rate=0.5, increase=1, decrease_factor=0.5, slow_latency=1)
+    assert scheduler.rate == 2
+    # additive increase up to the target while healthy
+    for rate in (3, 4, 4):
+        scheduler.record(0.1)
+        assert scheduler.rate == rate
+    # multiplicative decrease on slow or failed responses, down to the minimum
+    scheduler.record(2.0)
+    assert scheduler.rate == 2
+    for rate in (1, 0.5, 0.5):
+        scheduler.record(0.1, ok=False)
+        assert scheduler.rate == rate
+    try:
+        with scheduler.request():
+            raise ValueError("an error page")
+    except ValueError:
+        pass
+    assert scheduler.number_requests == 8
+    assert scheduler.error_rate > 0
+    # the starts of the requests keep the delay of the rate
+    scheduler = PolitenessScheduler(target_rate=20, min_rate=20)
+    start = time.monotonic()
+    for _ in range(5):
+        scheduler.wait()
+    assert time.monotonic() - start >= 4 * scheduler.delay - 0.01
+    print(f"\nscheduler: {scheduler.stats()}")
+
+def test_http_fetcher():
+    server, base_url = start_server(StandInJRA)
+    fetcher = HTTPFetcher(scheduler=PolitenessScheduler(target_rate=1000))
+    race_html = fetcher.get_race_html(base_url + "/JRADB/accessS.html?CNAME=pw01sde1005201703010420170603/1A")
+    horse_html = fetcher.get_horse_html(base_url + "/JRADB/accessU.html?CNAME=pw01dud102014102254/C6")
+    fetcher.get_horse_html(base_url + "/JRADB/accessU.html?CNAME=pw01dud102014102254/C6")
+    assert race_html == html.html_race_1
+    assert horse_html == html.html_horse_2
+    # all requests go through one kept-alive connection
+    assert len(StandInJRA.requests) == 3
+    assert len(StandInJRA.connections) == 1
+    parsers = Parsers()
+    pr = parsers.race.parse(html=race_html, entity_code="pw01sde1005201703010420170603/1A", entity_name="障害3歳以上オープン（混合）", save_html=False)
+    expected = parsers.race.parse(html=html.html_race_1, entity_code="pw01sde1005201703010420170603/1A", entity_name="障害3歳以上オープン（混合）", save_html=False)
+    assert pr.entity.model_dump(exclude={"update_time"}) == expected.entity.model_dump(exclude={"update_time"})
+    print(f"\nrace by HTTP: {pr.entity}")
+    fetcher.close()
+    server.shutdown()
+
+class BusyJRA(StandInJRA):
+    """answer 503 to the first request, like a busy server"""
+    busy = 1
+
+    def do_POST(self):
+        if BusyJRA.busy > 0:
+            BusyJRA.busy -= 1
+            self.rfile.read(int(self.headers["Content-Length"]))
+            BusyJRA.requests.append("busy")
+            self.send_error(503)
+            return
+        super().do_POST()
+
+def test_http_fetcher_retry():
+    server, base_url = start_server(BusyJRA)
+    scheduler = PolitenessScheduler(target_rate=1000)
+    fetcher = HTTPFetcher(scheduler=scheduler, base_url=base_url)
+    match_html = fetcher.get_match_html("return doAction('/JRADB/accessS.html', 'pw01srl10062025020520250906/F1');")
+    assert match_html == html.html_match_1
+    # the POST answered by 503 is sent again by the fetcher, and both attempts are recorded by the scheduler
+    assert BusyJRA.requests[-2:] == ["busy", "/JRADB/accessS.html pw01srl10062025020520250906/F1"]
+    assert scheduler.number_requests == 2
+    assert scheduler.error_rate > 0
+    fetcher.close()
+    server.shutdown()
+
+class FallbackNavigator:
+    """record the pages asked of the browser"""
+
+    def __init__(self):
+        self.loaded = []
+
+    def go_to_search_page(self):
+        self.loaded.append("search")
+
+    def search_by_year_month(self, year: int, month: int):
+        self.loaded.append(f"month {year}{month}")
+
+    def get_html(self):
+        return "<div class=\"past_result_line_unit\"></div>"
+
+    def get_odds_tan_html(self, action: str):
+        self.loaded.append(action)
+        return html.html_odds_tan_1
+
+    def close(self):
+        pass
+
+def test_http_navigator():
+    server, base_url = start_server(StandInJRA)
+    fallback = FallbackNavigator()
+    navigator = HTTPNavigator(fetcher=HTTPFetcher(scheduler=PolitenessScheduler(target_rate=1000), base_url=base_url), fallback_factory=lambda: fallback)
+    StandInJRA.requests.clear()
+    # the doAction scripts are replayed as form POSTs
+    assert navigator.get_match_html("return doAction('/JRADB/accessS.html', 'pw01srl10012025020520250906/A8');") == html.html_match_1
+    assert navigator.get_jockey_trainer_html("return doAction('/JRADB/accessK.html', 'pw04kmk001122/66');") == html.html_jockey_1
+    assert navigator.get_jockey_trainer_html("return doAction('/JRADB/accessC.html', 'pw05cps01157/5E');") == html.html_trainer_summary_1
+    assert navigator.get_odds_tan_html("return doAction('/JRADB/accessO.html', 'pw151ou1001202502050120250906Z/A5');") == html.html_odds_tan_1
+    assert navigator.get_html() == html.html_odds_tan_1
+    assert StandInJRA.requests[0] == "/JRADB/accessS.html pw01srl10012025020520250906/A8"
+    assert len(StandInJRA.requests) == 4
+    assert fallback.loaded == []
+    # the browser is only used for the search of a month and for the pages which HTTP can not get
+    navigator.go_to_search_page()
+    navigator.search_by_year_month(2025, 9)
+    assert "past_result_line_unit" in navigator.get_html()
+    action = "return doAction('/JRADB/accessO.html', 'pw159ou0000/00');"
+    assert navigator.get_odds_tan_html(action) == html.html_odds_tan_1
+    assert fallback.loaded == ["search", "month 20259", action]
+    navigator.close()
+    # without a browser the error is raised
+    navigator = HTTPNavigator(fetcher=HTTPFetcher(scheduler=PolitenessScheduler(target_rate=1000), base_url=base_url), fallback_factory=None)
+    try:
+        navigator.get_odds_tan_html(action)
+        assert False
+    except Exception as e:
+        print(f"\nwithout a browser: {e!r}")
+    navigator.close()
+    server.shutdown()
@@ -3,11 +3,23 @@
 import sys, os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
+import dataclasses
+import re
+import time
+
+import pytest
+
+from bs4 import BeautifulSoup
+from pydantic import BaseModel
 from sqlmodel import select
 
 from examples import html
 from src.cheval.parsers.parsers import Parsers
-from src.cheval.models.models import DataType, CodeRecorder, Match, Race, Horse, Jockey, Trainer, add_odds_tan_to_race
+from src.cheval.parsers.base import PARSER_BACKENDS
+from src.cheval.parsers.race_parser import RaceParser
+from src.cheval.parsers.selectors import SELECTORS, SelectorRegistry, Regions
+from src.cheval.utils.misc import extract_cname_code, extract_doaction_code, parse_float, parse_int, parse_minsec
+from src.cheval.models.models import DataType, CodeRecorder, Match, Race, Horse, Jockey, Trainer, ResultOfRace, add_odds_tan_to_race
 from src.cheval.storage.html_storage import HTMLStorage
 from src.cheval.storage.database import ChevalDB
 
@@ -238,6 +250,185 @@ def test_odds_tan():
     print(f"\nodds: {theodds}")
     print(f"\nrace: {therace}")
 
+# the example pages of every type of page
+EXAMPLES = {
+    DataType.MONTH: [html.html_month_0, html.html_month_1],
+    DataType.MATCH: [html.html_match_1],
+    DataType.RACE: [html.html_race_1, html.html_race_2],
+    DataType.ODDS_TAN: [html.html_odds_tan_1],
+    DataType.HORSE: [html.html_horse_1, html.html_horse_2],
+    DataType.JOCKEY: [html.html_jockey_1],
+    DataType.JOCKEY_SUMMARY: [html.html_jockey_summary_1],
+    DataType.TRAINER: [html.html_trainer_1],
+    DataType.TRAINER_SUMMARY: [html.html_trainer_summary_1],
+}
+
+def plain(value):
+    """the content of a parse result as plain values to compare, with the private lists of the entities,
+    and without the times of the parse, the backend and the path"""
+    if isinstance(value, BaseModel):
+        fields = value.model_dump()
+        fields.update((key, plain(item)) for key, item in (value.__pydantic_private__ or {}).items())
+        return plain(fields)
+    if dataclasses.is_dataclass(value):
+        return plain(dataclasses.asdict(value))
+    if isinstance(value, dict):
+        return {key: plain(item) for key, item in value.items() if key not in ("update_time", "backend", "path")}
+    if isinstance(value, (list, tuple)):
+        return [plain(item) for item in value]
+    return value
+
+def parse_example(parsers: Parsers, data_type: DataType, test_html: str):
+    return parsers.by_type(data_type).parse(html=test_html, entity_code="code", entity_name="name", father_entity_code="parent", save_html=False)
+
+def test_backends():
+    by_backend = {backend: Parsers(backend=backend, fast_path=False) for backend in PARSER_BACKENDS}
+    seconds = dict.fromkeys(PARSER_BACKENDS, 0.0)
+    for data_type, pages in EXAMPLES.items():
+        for test_html in pages:
+            results = {}
+            for backend, parsers in by_backend.items():
+                start = time.perf_counter()
+                results[backend] = plain(parse_example(parsers, data_type, test_html))
+                seconds[backend] += time.perf_counter() - start
+            expected = results["html.parser"]
+            assert all(result == expected for result in results.values()), data_type
+    print(f"\nparse time of the examples: { {backend: round(value, 3) for backend, value in seconds.items()} }")
+
+def test_regions():
+    # the parse results are the same when only the regions of the pages are built
+    seconds = {True: 0.0, False: 0.0}
+    for backend in PARSER_BACKENDS:
+        by_regions = {regions_only: Parsers(backend=backend, regions_only=regions_only, fast_path=False) for regions_only in seconds}
+        for data_type, pages in EXAMPLES.items():
+            for test_html in pages:
+                results = {}
+                for regions_only, parsers in by_regions.items():
+                    start = time.perf_counter()
+                    results[regions_only] = plain(parse_example(parsers, data_type, test_html))
+                    seconds[regions_only] += time.perf_counter() - start
+                assert results[True] == results[False], (backend, data_type)
+    print(f"\nparse time of the examples, regions only and whole pages: {round(seconds[True], 3)}, {round(seconds[False], 3)}")
+    # the tree of the regions is a small part of the page
+    parser = Parsers().jockey
+    whole = len(BeautifulSoup(html.html_jockey_1, parser.backend).find_all(True))
+    regions = len(parser.make_soup(html.html_jockey_1).find_all(True))
+    print(f"tags of the page of a jockey, regions only and whole page: {regions}, {whole}")
+    assert regions < whole / 2
+    with pytest.raises(ValueError):
+        Regions("div > table")
+
+def test_fast_path():
+    # the pages of races, odds and lists of matches are read without a tree, with the same results
+    fast, tree = Parsers(fast_path=True), Parsers(fast_path=False)
+    seconds = {"fast": 0.0, "tree": 0.0}
+    for data_type in (DataType.MONTH, DataType.MATCH, DataType.RACE, DataType.ODDS_TAN):
+        for test_html in EXAMPLES[data_type]:
+            start = time.perf_counter()
+            result = parse_example(fast, data_type, test_html)
+            seconds["fast"] += time.perf_counter() - start
+            start = time.perf_counter()
+            expected = parse_example(tree, data_type, test_html)
+            seconds["tree"] += time.perf_counter() - start
+            assert result._meta["path"] == "fast", data_type
+            assert plain(result) == plain(expected), data_type
+    print(f"\nparse time of the examples, fast path and tree: {round(seconds['fast'], 3)}, {round(seconds['tree'], 3)}")
+    # a page the fast path can not read as expected falls back to the tree
+    broken_html = html.html_race_1.replace("450<span>(-2)</span>", "<span>450</span><span>(-2)</span>", 1)
+    assert broken_html != html.html_race_1
+    result = parse_example(fast, DataType.RACE, broken_html)
+    assert result._meta["path"] == "tree" and fast.race.fallbacks == 1
+    assert plain(result) == plain(parse_example(tree, DataType.RACE, broken_html))
+    # the corners are read from every corner_list, and a blinker is a div of both the classes icon and blinker
+    odd_html = (html.html_race_1
+                .replace('</ul></div></td><td class="f_time">', '</ul></div><div class="corner_list"><ul><li>9</li></ul></div></td><td class="f_time">', 1)
+                .replace('</a></td><td class="age">', '</a><div class="blinker"></div></td><td class="age">', 1)
+                .replace('</a></td><td class="age">', '</a><div class="icon blinker"></div></td><td class="age">', 1))
+    result = parse_example(fast, DataType.RACE, odd_html)
+    results = result.entity._result_list
+    assert result._meta["path"] == "fast"
+    assert results[0]._corner_list == [3, 4, 4, 3, 9]
+    assert (not results[0].blinker) and results[1].blinker
+    assert plain(result) == plain(parse_example(tree, DataType.RACE, odd_html))
+    rows = BeautifulSoup(odd_html, "lxml").select("table.basic.narrow-xy.striped tbody > tr")
+    assert plain(results) == plain([read_result_by_queries(row, "code") for row in rows])
+    # the pages without a fast path are read by the tree
+    assert parse_example(fast, DataType.HORSE, html.html_horse_1)._meta["path"] == "tree" and fast.horse.fallbacks == 0
+
+def read_result_by_queries(result_tag, race_code: str) -> ResultOfRace:
+    """the former reading of a row of the race table, one CSS query per cell, kept to compare with RaceParser._read_result"""
+    def text(selector):
+        temp = result_tag.select_one(selector)
+        return temp.get_text(strip=True) if temp else None
+    temp = result_tag.select_one("td.waku img[alt]")
+    waku_str = str(re.findall(r"\d+", str(temp.get("alt")))[0]) if temp else None
+    horse = result_tag.select_one("td.horse a")
+    jockey = result_tag.select_one("td.jockey a")
+    trainer = result_tag.select_one("td.trainer a")
+    h_weight = result_tag.select_one("td.h_weight")
+    icon = result_tag.select_one("td.horse span.horse_icon img[alt]")
+    return ResultOfRace(race_code=race_code, arrival_order_str=text("td.place"), waku=parse_int(waku_str) if temp else None,
+                        waku_color=str(temp.get("alt")).replace("枠", "").replace(waku_str, "") if temp else None,
+                        num=parse_int(text("td.num")), horse_code=extract_cname_code(str(horse["href"])) if horse else None,
+                        horse_name=horse.get_text(strip=True) if horse else None, horse_icon=icon["alt"] if icon else None,
+                        blinker=result_tag.select_one("td.horse div.icon.blinker") is not None, sex_and_age=text("td.age"),
+                        weight=parse_float(text("td.weight")), jockey_code=extract_doaction_code(jockey["onclick"]) if jockey else None,
+                        jockey_name=jockey.get_text(strip=True) if jockey else None, time=parse_minsec(text("td.time")),
+                        margin=text("td.margin"), f_time=parse_float(text("td.f_time")),
+                        horse_weight=parse_float(h_weight.contents[0]) if h_weight and len(h_weight.contents) > 0 else None,
+                        horse_weight_delta=parse_float(re.sub(r"\(|\)", "", h_weight.contents[1].text)) if h_weight and len(h_weight.contents) > 1 else None,
+                        trainer_code=extract_doaction_code(trainer["onclick"]) if trainer else None,
+                        trainer_name=trainer.get_text(strip=True) if trainer else None, pop=parse_int(text("td.pop")),
+                        _corner_list=[parse_int(li.get_text(strip=True)) for li in result_tag.select("div.corner_list li")])
+
+def test_race_table():
+    # a field of 18 horses, the rows of the example repeated
+    soup = BeautifulSoup(html.html_race_1, "lxml")
+    tbody = soup.select_one("table.basic.narrow-xy.striped tbody")
+    rows = tbody.find_all("tr", recursive=False)
+    for i in range(18 - len(rows)):
+        tbody.append(BeautifulSoup(str(rows[i % len(rows)]), "lxml").tr)
+    rows = tbody.find_all("tr", recursive=False)
+    assert len(rows) == 18
+    results = [RaceParser._read_result(row, "code", [], [], []) for row in rows]
+    assert plain(results) == plain([read_result_by_queries(row, "code") for row in rows])
+    number_repeats = 20
+    start = time.perf_counter()
+    for _ in range(number_repeats):
+        for row in rows:
+            read_result_by_queries(row, "code")
+    by_queries = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(number_repeats):
+        for row in rows:
+            RaceParser._read_result(row, "code", [], [], [])
+    by_row = time.perf_counter() - start
+    print(f"\nrace table of 18 horses: {by_queries / number_repeats * 1000:.1f}ms by queries, {by_row / number_repeats * 1000:.1f}ms row at once")
+    # the weight of the race is the text of its conditions, not the weight carried by the last horse
+    race: Race = parse_example(Parsers(), DataType.RACE, html.html_race_1).entity
+    assert isinstance(race.weight, str)
+
+def test_selector_registry():
+    # the selectors are compiled once and the same pattern serves every parse
+    pattern = SELECTORS.get(DataType.RACE, "results").pattern
+    SELECTORS.reset()
+    parsers = Parsers(fast_path=False)
+    for data_type, pages in EXAMPLES.items():
+        for test_html in pages:
+            parse_example(parsers, data_type, test_html)
+    assert SELECTORS.get(DataType.RACE, "results").pattern is pattern
+    stats = SELECTORS.stats()
+    print(f"\nthe slowest selectors: {list(stats.items())[:3]}")
+    print(f"dead selectors on the examples: {SELECTORS.dead()}")
+    assert stats["race.results"] == {**stats["race.results"], "hits": 2, "misses": 0}
+    assert stats["horse.deleted"]["hits"] == 1 and stats["horse.deleted"]["misses"] == 1
+    # a selector which finds nothing on the pages shows up as dead
+    registry = SelectorRegistry({DataType.ODDS_TAN: {"table": "table.tanpuku", "old_table": "table.odds_old"}})
+    soup = BeautifulSoup(html.html_odds_tan_1, "lxml")
+    assert registry.select_one(DataType.ODDS_TAN, "table", soup) is not None
+    assert registry.select(DataType.ODDS_TAN, "old_table", soup) == []
+    assert registry.dead() == ["odds_tan.old_table"]
+
 if __name__ == "__main__":
     print("Hello")
     test_month()